@@ -0,0 +1,221 @@
+"""
+Group-by and aggregation over `Elements`.
+
+    by_state = elements.group_by(Element.state)
+    by_state.mean(Element.thermal_conductivity, 'W/(m K)')
+    by_state.aggregate(Element.thermal_conductivity, 'min', 'max', 'p90')
+
+Keys and values are taken from the columns of frozen element sets, so
+every aggregate is computed with NumPy over all of the elements at once,
+in canonical units, and converted to the requested unit. Attributes
+without a column, and the elements of unfrozen sets, are evaluated
+element by element first.
+
+Missing values are skipped. Aggregates of a group without any values
+are None, except for counts.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from oniref import expressions as ex
+from oniref import vectorized
+from oniref.elements import Element, Elements, State
+from oniref.units import Q, parse_unit
+
+AGGREGATES = ('count', 'sum', 'mean', 'min', 'max', 'argmin', 'argmax')
+
+
+def _node(attr: Any) -> ex.Node:
+    node = getattr(attr, '_node', None)
+    return node if isinstance(node, ex.Node) else ex.Opaque(attr)
+
+
+def _key(name: str, value: Any, unit: Any, columns: Any) -> Hashable:
+    if name == 'state':
+        return State(int(value))
+    if name == 'name':
+        return columns.names[int(value)]
+    if np.isnan(value):
+        return None
+
+    if unit is None:
+        return float(value)
+    return Q(float(value), parse_unit(unit))
+
+
+class GroupBy:
+    """
+    The elements of an `Elements` set, or those matching 'where', split
+    into groups by the value of 'key'. Groups are ordered by key where
+    the key has a column, and by first appearance otherwise.
+    """
+    def __init__(self, elements: Elements, key: Any, where: Any = None):
+        self._elements = elements
+        if where is None:
+            self._positions = np.arange(len(elements))
+        else:
+            self._positions = np.fromiter(
+                elements._positions(where),  # pylint: disable=W0212
+                dtype=np.intp
+            )
+
+        self._codes, self.keys = self._factorize(_node(key))
+
+    def _column(self, node: ex.Node) -> Any:
+        if not self._elements.frozen:
+            return None
+
+        col = vectorized.column(node, self._elements.columns)
+        if col is None or col.raising[self._positions].any():
+            return None
+
+        return col
+
+    def _factorize(self, node: ex.Node) -> Tuple[np.ndarray, List[Any]]:
+        col = self._column(node)
+        if col is not None:
+            uniques, codes = np.unique(col.values[self._positions],
+                                       return_inverse=True)
+            return codes, [_key(col.name, value, col.unit,
+                                self._elements.columns)
+                           for value in uniques]
+
+        evaluate = ex.compile_shared(node)
+        groups: Dict[Any, int] = {}
+        codes = np.array([groups.setdefault(evaluate(self._elements[i]),
+                                            len(groups))
+                          for i in self._positions.tolist()], dtype=np.intp)
+        return codes, list(groups)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def groups(self) -> Dict[Any, List[Element]]:
+        """
+        The elements in each group, in order.
+        """
+        result: Dict[Any, List[Element]] = {key: [] for key in self.keys}
+        for code, position in zip(self._codes, self._positions):
+            result[self.keys[code]].append(self._elements[int(position)])
+
+        return result
+
+    def aggregate(self, attr: Any, *names: str, unit: Any = None) \
+            -> Dict[Any, Dict[str, Any]]:
+        """
+        Compute the aggregates 'names' of 'attr' for each group, with
+        quantities in 'unit'. Names are those in `AGGREGATES`, or 'p'
+        followed by a percentile, as in 'p90'.
+        """
+        for name in names:
+            if name not in AGGREGATES and not _is_percentile(name):
+                raise ValueError(f'Unknown aggregate {name!r}')
+
+        values, unit = vectorized.attribute_values(
+            self._elements, _node(attr), unit, self._positions
+        )
+        ngroups = len(self.keys)
+        present = ~np.isnan(values)
+
+        # Sorting by group and then value puts each group's values in a
+        # contiguous, ascending run with missing values at its end.
+        order = np.lexsort((values, self._codes))
+        ordered = values[order]
+        starts = np.searchsorted(self._codes[order], np.arange(ngroups))
+        counts = np.bincount(self._codes, weights=present,
+                             minlength=ngroups).astype(int)
+        sums = np.bincount(self._codes, weights=np.where(present, values, 0),
+                           minlength=ngroups)
+
+        units = parse_unit(unit)
+
+        def quantity(value):
+            return Q(float(value), units)
+
+        result: Dict[Any, Dict[str, Any]] = {}
+        for code, key in enumerate(self.keys):
+            start, count = starts[code], counts[code]
+            run = ordered[start:start + count]
+            row: Dict[str, Any] = {}
+            for name in names:
+                if name == 'count':
+                    row[name] = int(count)
+                elif name == 'sum':
+                    row[name] = quantity(sums[code])
+                elif not count:
+                    row[name] = None
+                elif name == 'mean':
+                    row[name] = quantity(sums[code] / count)
+                elif name == 'min':
+                    row[name] = quantity(run[0])
+                elif name == 'max':
+                    row[name] = quantity(run[-1])
+                elif name == 'argmin':
+                    row[name] = self._element(order[start])
+                elif name == 'argmax':
+                    first = np.searchsorted(run, run[-1])
+                    row[name] = self._element(order[start + first])
+                else:
+                    row[name] = quantity(np.percentile(run, float(name[1:])))
+
+            result[key] = row
+
+        return result
+
+    def _element(self, i: int) -> Element:
+        return self._elements[int(self._positions[i])]
+
+    def _single(self, name: str, attr: Any, unit: Any) -> Dict[Any, Any]:
+        return {key: row[name]
+                for key, row in self.aggregate(attr, name,
+                                               unit=unit).items()}
+
+    def count(self, attr: Any = None) -> Dict[Any, int]:
+        """
+        Number of elements in each group, or if 'attr' is given, number
+        of elements for which it isn't None.
+        """
+        if attr is None:
+            counts = np.bincount(self._codes, minlength=len(self.keys))
+            return dict(zip(self.keys, counts.tolist()))
+
+        return self._single('count', attr, None)
+
+    def sum(self, attr: Any, unit: Any = None) -> Dict[Any, Any]:
+        return self._single('sum', attr, unit)
+
+    def mean(self, attr: Any, unit: Any = None) -> Dict[Any, Any]:
+        return self._single('mean', attr, unit)
+
+    def min(self, attr: Any, unit: Any = None) -> Dict[Any, Any]:
+        return self._single('min', attr, unit)
+
+    def max(self, attr: Any, unit: Any = None) -> Dict[Any, Any]:
+        return self._single('max', attr, unit)
+
+    def argmin(self, attr: Any) -> Dict[Any, Optional[Element]]:
+        """
+        The element with the smallest value of 'attr' in each group,
+        taking the first in order on ties.
+        """
+        return self._single('argmin', attr, None)
+
+    def argmax(self, attr: Any) -> Dict[Any, Optional[Element]]:
+        return self._single('argmax', attr, None)
+
+    def percentile(self, attr: Any, q: float, unit: Any = None) \
+            -> Dict[Any, Any]:
+        return self._single(f'p{q:g}', attr, unit)
+
+
+def _is_percentile(name: str) -> bool:
+    try:
+        return name.startswith('p') and 0 <= float(name[1:]) <= 100
+    except ValueError:
+        return False
+
+
+def group_by(elements: Elements, key: Any, where: Any = None) -> GroupBy:
+    return GroupBy(elements, key, where)
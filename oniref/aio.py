@@ -0,0 +1,133 @@
+"""
+Asyncio counterparts of the loaders for crawling many installs at once.
+
+File contents are read without blocking the event loop and parsing is
+handed to an executor. A semaphore bounds the number of files being
+processed at any one time, so gathering hundreds of loads doesn't flood
+the executor:
+
+    limit = asyncio.Semaphore(8)
+    results = await asyncio.gather(
+        *(load_klei_definitions(p, semaphore=limit) for p in paths)
+    )
+
+Every load builds its quantities from the shared `oniref.units.registry`,
+so results from different installs can be compared freely. Executors
+other than thread pools must be able to pickle the parsed elements.
+"""
+from __future__ import annotations
+import asyncio
+from concurrent.futures import Executor
+from contextlib import AsyncExitStack
+from functools import partial
+from os import PathLike
+from pathlib import Path
+from typing import (Callable,
+                    Iterable,
+                    List,
+                    Mapping,
+                    Optional,
+                    TypeVar,
+                    Union)
+
+from oniref.elements import (Element,
+                             Elements,
+                             asset_paths,
+                             load_klei_definitions_from_file)
+from oniref.instrumentation import span
+from oniref.strings import KleiStrings, find_catalogs, parse_strings
+
+T = TypeVar('T')
+
+DEFAULT_LIMIT = 8
+
+
+async def _run(executor: Optional[Executor], func: Callable[..., T],
+               *args) -> T:
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, func, *args
+    )
+
+
+async def _load_file(path: Path,
+                     parse: Callable[[str], T],
+                     executor: Optional[Executor],
+                     semaphore: Optional[asyncio.Semaphore]) -> T:
+    async with AsyncExitStack() as stack:
+        if semaphore is not None:
+            await stack.enter_async_context(semaphore)
+
+        # Reads always go to the default executor so a process pool
+        # passed for parsing doesn't have to ship file contents twice.
+        contents = await _run(None, path.read_text)
+        return await _run(executor, parse, contents)
+
+
+async def load_strings(path: Union[str, PathLike],
+                       *,
+                       executor: Optional[Executor] = None,
+                       semaphore: Optional[asyncio.Semaphore] = None,
+                       catalogs: Optional[Mapping[str, Path]] = None) \
+        -> KleiStrings:
+    return await _load_file(Path(path), partial(parse_strings,
+                                                catalogs=catalogs),
+                            executor, semaphore)
+
+
+async def load_klei_definitions_from_path(
+        path: Union[str, PathLike],
+        *,
+        executor: Optional[Executor] = None,
+        semaphore: Optional[asyncio.Semaphore] = None) -> List[Element]:
+    return await _load_file(Path(path), load_klei_definitions_from_file,
+                            executor, semaphore)
+
+
+async def load_klei_definitions(
+        oni_path: Union[PathLike, str],
+        *,
+        executor: Optional[Executor] = None,
+        semaphore: Optional[asyncio.Semaphore] = None,
+        frozen: bool = False) -> Elements:
+    elements_paths, strings_path = asset_paths(oni_path)
+
+    with span('load'):
+        loads = asyncio.gather(
+            *(load_klei_definitions_from_path(path,
+                                              executor=executor,
+                                              semaphore=semaphore)
+              for path in elements_paths)
+        )
+        try:
+            catalogs = await _run(None, find_catalogs, strings_path.parent)
+        except BaseException:
+            loads.cancel()
+            raise
+
+        definitions, strings = await asyncio.gather(
+            loads,
+            load_strings(strings_path, executor=executor,
+                         semaphore=semaphore, catalogs=catalogs)
+        )
+
+        # Resolution links the elements together, so it has to happen in
+        # this process regardless of the executor used for parsing.
+        return await _run(
+            None, Elements, [d for defs in definitions for d in defs], strings,
+            frozen
+        )
+
+
+async def load_many(oni_paths: Iterable[Union[PathLike, str]],
+                    *,
+                    limit: int = DEFAULT_LIMIT,
+                    executor: Optional[Executor] = None) -> List[Elements]:
+    """
+    Load every installation in 'oni_paths' concurrently, processing at
+    most 'limit' files at a time. Results are returned in input order.
+    """
+    semaphore = asyncio.Semaphore(limit)
+    return list(await asyncio.gather(
+        *(load_klei_definitions(path, executor=executor, semaphore=semaphore)
+          for path in oni_paths)
+    ))
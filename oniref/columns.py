@@ -0,0 +1,530 @@
+"""
+Columnar view of an `Elements` set.
+
+Every numeric property is stored as a NumPy array of magnitudes in the
+canonical units listed in `QUANTITY_COLUMNS`, with NaN standing in for
+missing optional values. Transition targets and ores are stored as
+indices into the element order (-1 when absent) and the state as its
+enum value. Element names and pretty names are kept as string tables.
+
+Columns can be packed into a flat, self-describing buffer and read back
+from one without copying the numeric data, which is what the shared
+memory and file backed element sets are built on.
+"""
+from __future__ import annotations
+import copy
+from dataclasses import FrozenInstanceError
+from functools import cached_property
+import struct
+import sys
+import threading
+from typing import (Any,
+                    Dict,
+                    Iterable,
+                    Iterator,
+                    List,
+                    Mapping,
+                    Optional,
+                    Sequence,
+                    TYPE_CHECKING,
+                    Tuple,
+                    Union,
+                    cast)
+
+import numpy as np
+
+from oniref.elements import (CANONICAL_UNITS,
+                             TEMPERATURE_UNIT,
+                             Element,
+                             Elements,
+                             State,
+                             Transition)
+from oniref.strings import KleiStrings
+from oniref.units import Q, convert, parse_unit
+
+if TYPE_CHECKING:
+    from oniref.derived import DerivedAttribute
+
+QUANTITY_COLUMNS: Mapping[str, str] = {
+    **CANONICAL_UNITS,
+    'low_transition.temperature': TEMPERATURE_UNIT,
+    'high_transition.temperature': TEMPERATURE_UNIT,
+}
+
+INDEX_COLUMNS = ('low_transition.target',
+                 'low_transition.ore',
+                 'high_transition.target',
+                 'high_transition.ore')
+
+RATIO_COLUMNS = ('low_transition.ore_ratio',
+                 'high_transition.ore_ratio')
+
+STRING_COLUMNS = ('name', 'pretty_name')
+
+COLUMN_DTYPES: Mapping[str, np.dtype] = {
+    'state': np.dtype('u1'),
+    **{name: np.dtype('<f8') for name in QUANTITY_COLUMNS},
+    **{name: np.dtype('<i4') for name in INDEX_COLUMNS},
+    **{name: np.dtype('<f8') for name in RATIO_COLUMNS},
+}
+
+_missing = {'u': 0, 'i': -1, 'f': np.nan}
+
+MAGIC = b'ONIREFC\0'
+FORMAT_VERSION = 1
+
+_header = struct.Struct('<8sIII')
+_entry = struct.Struct('<48s8sQQ')
+_ALIGN = 8
+
+
+class FormatError(Exception):
+    pass
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _encode_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [v.encode() for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype='u1')
+
+
+class _StringTable(Sequence[str]):
+    """
+    Strings packed as UTF-8 data plus offsets, decoded on access.
+    """
+    def __init__(self, offsets: np.ndarray, data: np.ndarray):
+        self._offsets = offsets
+        self._data = data
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    @property
+    def buffers(self) -> Tuple[np.ndarray, np.ndarray]:
+        return self._offsets, self._data
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        start, end = self._offsets[i:i + 2]
+        return sys.intern(self._data[start:end].tobytes().decode())
+
+
+class ElementColumns:
+    """
+    Numeric columns and string tables for a sequence of elements.
+    """
+    def __init__(self,
+                 arrays: Mapping[str, np.ndarray],
+                 names: Sequence[str],
+                 pretty_names: Sequence[str]):
+        self._arrays = dict(arrays)
+        self.names = names
+        self.pretty_names = pretty_names
+        self._encoded: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        # Derived attributes registered on the set, by name. They are
+        # not part of the packed buffer.
+        self.derived: Dict[str, DerivedAttribute] = {}
+
+        for array in self._arrays.values():
+            array.flags.writeable = False
+
+    @cached_property
+    def index(self) -> Dict[str, int]:
+        """
+        Position of each element by name.
+        """
+        return {name: i for i, name in enumerate(self.names)}
+
+    @staticmethod
+    def from_elements(elements: Union[Elements, Sequence[Element]]) \
+            -> ElementColumns:
+        elems: List[Element] = list(cast(Iterable[Element], elements))
+        index = {elem.name: i for i, elem in enumerate(elems)}
+        count = len(elems)
+
+        arrays = {name: np.full(count, _missing[dtype.kind], dtype=dtype)
+                  for name, dtype in COLUMN_DTYPES.items()}
+
+        def ref(value: Optional[Union[str, Element]]) -> int:
+            if value is None:
+                return -1
+            return index.get(value if isinstance(value, str)
+                             else value.name, -1)
+
+        for i, elem in enumerate(elems):
+            arrays['state'][i] = elem.state.value
+            for name, unit in QUANTITY_COLUMNS.items():
+                prefix, _, field = name.partition('.')
+                value = getattr(elem, prefix)
+                if field and value is not None:
+                    value = getattr(value, field)
+                if value is not None:
+                    arrays[name][i] = convert(value.m, value.units, unit)
+
+            for prefix in ('low_transition', 'high_transition'):
+                transition = getattr(elem, prefix)
+                if transition is None:
+                    continue
+
+                arrays[f'{prefix}.target'][i] = ref(transition.target)
+                arrays[f'{prefix}.ore'][i] = ref(transition.ore)
+                if transition.ore_ratio is not None:
+                    arrays[f'{prefix}.ore_ratio'][i] = transition.ore_ratio
+
+        return ElementColumns(arrays,
+                              [elem.name for elem in elems],
+                              [elem.pretty_name for elem in elems])
+
+    @staticmethod
+    def of(elements: Union[Elements, Sequence[Element]]) -> ElementColumns:
+        """
+        Up-to-date columns for 'elements': those of a frozen set, or
+        freshly built ones, since the columns of unfrozen sets may be
+        out of date.
+        """
+        if isinstance(elements, Elements) and elements.frozen:
+            return elements.columns
+        return ElementColumns.from_elements(elements)
+
+    def positions(self, values: Any) -> np.ndarray:
+        """
+        Positions of the elements in the array 'values', of element
+        names or positions, as an array of the same shape.
+        """
+        array = np.asarray(values)
+        if array.dtype.kind in 'iu':
+            if array.size and not ((array >= 0)
+                                   & (array < len(self))).all():
+                raise IndexError('Element position out of range')
+            return array.astype(np.intp)
+
+        return np.vectorize(self.index.__getitem__, otypes=[np.intp])(array)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self._arrays[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._arrays
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._arrays)
+
+    def string_buffers(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The string table 'name' ('name' or 'pretty_name') as int64
+        offsets and UTF-8 data, the layout of Arrow's large strings.
+        Packed columns return views of their buffer.
+        """
+        values = {'name': self.names, 'pretty_name': self.pretty_names}[name]
+        if isinstance(values, _StringTable):
+            return values.buffers
+
+        encoded = self._encoded.get(name)
+        if encoded is None:
+            encoded = self._encoded[name] = _encode_strings(values)
+            for array in encoded:
+                array.flags.writeable = False
+        return encoded
+
+    def quantity(self, name: str) -> Any:
+        """
+        Return the column 'name' as a quantity array in canonical units.
+        """
+        return Q(self._arrays[name], parse_unit(QUANTITY_COLUMNS[name]))
+
+    def _tables(self) -> Dict[str, np.ndarray]:
+        tables = dict(self._arrays)
+        for name in STRING_COLUMNS:
+            tables[f'{name}:offsets'], tables[f'{name}:data'] = \
+                self.string_buffers(name)
+
+        return tables
+
+    def _layout(self) -> Tuple[Dict[str, np.ndarray], List[int], int]:
+        tables = self._tables()
+        offset = _align(_header.size + _entry.size * len(tables))
+        offsets = []
+        for array in tables.values():
+            offsets.append(offset)
+            offset = _align(offset + array.nbytes)
+
+        return tables, offsets, offset
+
+    def nbytes(self) -> int:
+        """
+        Size of the buffer written by `write_into`.
+        """
+        return self._layout()[2]
+
+    def write_into(self, buffer: Any):
+        """
+        Pack the columns into 'buffer', which must be a writable object
+        supporting the buffer protocol of at least `nbytes()` bytes.
+        """
+        tables, offsets, total = self._layout()
+        view = memoryview(buffer).cast('B')
+        if len(view) < total:
+            raise ValueError(f'Buffer too small: {len(view)} < {total}')
+
+        _header.pack_into(view, 0, MAGIC, FORMAT_VERSION, len(self),
+                          len(tables))
+        for i, ((name, array), offset) in enumerate(zip(tables.items(),
+                                                        offsets)):
+            _entry.pack_into(view, _header.size + i * _entry.size,
+                             name.encode(), array.dtype.str.encode(),
+                             offset, len(array))
+            view[offset:offset + array.nbytes] = array.tobytes()
+
+    def to_bytes(self) -> bytes:
+        result = bytearray(self.nbytes())
+        self.write_into(result)
+        return bytes(result)
+
+    @staticmethod
+    def from_buffer(buffer: Any) -> ElementColumns:
+        """
+        Read columns packed by `write_into`. Numeric columns are views of
+        'buffer', so it has to stay alive as long as the result does.
+        """
+        view = memoryview(buffer).cast('B')
+        if len(view) < _header.size:
+            raise FormatError('Buffer too small for header')
+
+        magic, version, count, ntables = _header.unpack_from(view, 0)
+        if magic != MAGIC:
+            raise FormatError('Not an element column buffer')
+        if version != FORMAT_VERSION:
+            raise FormatError(f'Unsupported format version {version}')
+        if len(view) < _header.size + ntables * _entry.size:
+            raise FormatError('Buffer too small for column directory')
+
+        tables = {}
+        for i in range(ntables):
+            name, dtype, offset, length = _entry.unpack_from(
+                view, _header.size + i * _entry.size
+            )
+            try:
+                name = name.rstrip(b'\0').decode()
+                dtype = np.dtype(dtype.rstrip(b'\0').decode())
+            except (UnicodeDecodeError, TypeError, ValueError) as e:
+                raise FormatError(f'Bad column directory entry {i}') from e
+            if dtype.kind not in 'biuf':
+                raise FormatError(f'Bad type {dtype} for column {name!r}')
+            if offset + dtype.itemsize * length > len(view):
+                raise FormatError(f'Column {name!r} exceeds the buffer')
+            tables[name] = np.frombuffer(view, dtype=dtype, count=length,
+                                         offset=offset)
+
+        for name, dtype in COLUMN_DTYPES.items():
+            array = tables.get(name)
+            if array is None or array.dtype != dtype or len(array) != count:
+                raise FormatError(f'Missing or bad column {name!r}')
+
+        # Checked once here, so decoding an element can't index out of
+        # range or meet an unknown state.
+        if not np.isin(tables['state'], [s.value for s in State]).all():
+            raise FormatError("Unknown state in column 'state'")
+        for name in INDEX_COLUMNS:
+            if not ((tables[name] >= -1) & (tables[name] < count)).all():
+                raise FormatError(f'Element position out of range in '
+                                  f'column {name!r}')
+
+        strings: Dict[str, _StringTable] = {}
+        for name in STRING_COLUMNS:
+            offsets = tables.pop(f'{name}:offsets', None)
+            data = tables.pop(f'{name}:data', None)
+            if (offsets is None or data is None or len(offsets) != count + 1
+                    or offsets.dtype.kind != 'i' or data.dtype != np.uint8
+                    or (count and (offsets[0] < 0
+                                   or np.any(np.diff(offsets) < 0)
+                                   or offsets[-1] > len(data)))):
+                raise FormatError(f'Missing or bad string table {name!r}')
+            strings[name] = _StringTable(offsets, data)
+
+        return ElementColumns(tables, strings['name'], strings['pretty_name'])
+
+    def _transition(self, prefix: str, i: int,
+                    link: Optional[Elements]) -> Optional[Transition]:
+        target = int(self._arrays[f'{prefix}.target'][i])
+        if target < 0:
+            return None
+
+        temperature = self.quantity_at(f'{prefix}.temperature', i)
+        ore = int(self._arrays[f'{prefix}.ore'][i])
+        ratio: Optional[float] = float(self._arrays[f'{prefix}.ore_ratio'][i])
+        if ratio is not None and np.isnan(ratio):
+            ratio = None
+
+        if link is not None:
+            return _LinkedTransition(link, temperature, target, ore, ratio)
+
+        return Transition(temperature,
+                          self.names[target],
+                          self.names[ore] if ore >= 0 else None,
+                          ratio)
+
+    def quantity_at(self, name: str, i: int) -> Any:
+        value = float(self._arrays[name][i])
+        if np.isnan(value):
+            return None
+        return Q(value, parse_unit(QUANTITY_COLUMNS[name]))
+
+    def element(self, i: int, link: Optional[Elements] = None) -> Element:
+        """
+        Decode the element at position 'i'. Transition targets and ores
+        are looked up by position in 'link' when they are accessed, or
+        left as names if no 'link' is given.
+        """
+        return Element(
+            name=self.names[i],
+            pretty_name=self.pretty_names[i],
+            state=State(int(self._arrays['state'][i])),
+            specific_heat_capacity=self.quantity_at('specific_heat_capacity',
+                                                    i),
+            thermal_conductivity=self.quantity_at('thermal_conductivity', i),
+            molar_mass=self.quantity_at('molar_mass', i),
+            radiation_absorption=self.quantity_at('radiation_absorption', i),
+            radioactivity=self.quantity_at('radioactivity', i),
+            mass_per_tile=self.quantity_at('mass_per_tile', i),
+            low_transition=self._transition('low_transition', i, link),
+            high_transition=self._transition('high_transition', i, link)
+        )
+
+
+class _LinkedTransition(Transition):
+    """
+    Transition whose target and ore are fetched from an `Elements` by
+    position on access, so decoding one element doesn't decode the
+    elements it transitions to.
+    """
+    def __init__(self,
+                 elements: Elements,
+                 temperature: Any,
+                 target: int,
+                 ore: int,
+                 ore_ratio: Optional[float]):
+        # pylint: disable=super-init-not-called
+        self._elements = elements
+        self._target = target
+        self._ore = ore
+        self.temperature = temperature
+        self.ore_ratio = ore_ratio
+
+    def __deepcopy__(self, memo):
+        # A plain transition, so that copies don't share the set.
+        result = Transition.__new__(Transition)
+        memo[id(self)] = result
+        result.__dict__.update(
+            temperature=copy.deepcopy(self.temperature, memo),
+            target=copy.deepcopy(self.target, memo),
+            ore=copy.deepcopy(self.ore, memo),
+            ore_ratio=self.ore_ratio,
+            _frozen=self._frozen,
+        )
+        return result
+
+    # Decoded elements are frozen, so the setters are never reached;
+    # they only keep the attributes writable as declared on Transition.
+    @property
+    def target(self) -> Element:
+        return self._elements[self._target]
+
+    @target.setter
+    def target(self, value: Union[str, Element]):
+        raise FrozenInstanceError("cannot assign to field 'target'")
+
+    @property
+    def ore(self) -> Optional[Element]:
+        return self._elements[self._ore] if self._ore >= 0 else None
+
+    @ore.setter
+    def ore(self, value: Optional[Union[str, Element]]):
+        raise FrozenInstanceError("cannot assign to field 'ore'")
+
+
+class _LazyElements(Sequence[Element]):
+    def __init__(self, columns: ElementColumns, link: Elements):
+        self._columns = columns
+        self._link = link
+        self._cache: List[Optional[Element]] = [None] * len(columns)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(self[j] for j in range(*i.indices(len(self))))
+
+        elem = self._cache[i]
+        if elem is None:
+            with self._lock:
+                elem = self._cache[i]
+                if elem is None:
+                    elem = self._columns.element(i, self._link)
+                    elem._freeze()  # pylint: disable=protected-access
+                    self._cache[i] = elem
+
+        return elem
+
+
+class _NameMap(Mapping[str, Element]):
+    def __init__(self, columns: ElementColumns, elements: _LazyElements):
+        self._columns = columns
+        self._elements = elements
+
+    def __getitem__(self, name: str) -> Element:
+        return self._elements[self._columns.index[name]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._columns.names)
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+
+class ColumnarElements(Elements):
+    """
+    Read-only `Elements` over an `ElementColumns`. Elements are decoded
+    the first time they are accessed, and text searches run against the
+    string tables without decoding anything but the matches.
+
+    'owner' is kept alive with the view; pass whatever object owns the
+    buffer the columns were read from.
+    """
+    def __init__(self, columns: ElementColumns, owner: Any = None):
+        # pylint: disable=super-init-not-called
+        self.__dict__['columns'] = columns
+        self._defs = _LazyElements(columns, self)  # type: ignore[assignment]
+        self._id_map = _NameMap(columns, self._defs)  # type: ignore
+        self._localization_ids = {}
+        self._strings = KleiStrings({})
+        self._strings.freeze()
+        self._plans = {}
+        self._frozen = True
+        self._owner = owner
+
+    def __reduce__(self):
+        return (_unpickle_columnar, (self.columns.to_bytes(),))
+
+    def _text_fields(self) -> Iterator[Tuple[str, str]]:
+        return zip(self.columns.names, self.columns.pretty_names)
+
+
+def _unpickle_columnar(data: bytes) -> ColumnarElements:
+    return ColumnarElements(ElementColumns.from_buffer(data))
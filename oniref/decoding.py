@@ -0,0 +1,171 @@
+"""
+Table-driven decoding of Klei asset definitions.
+
+Each kind of definition is described by a table of `Field`s, naming the
+Klei key, the attribute it fills and how its value is converted. A
+`Decoder` compiles the table once into a reader per field, with units
+parsed up front, so decoding a definition is a plain sequence of dict
+lookups and conversions:
+
+    decoder = Decoder(Geyser, [
+        Field('id', 'name'),
+        Field('temperature', 'temperature', unit='K'),
+        Field('maxPressure', 'max_pressure', unit='kg', required=False),
+    ], name_key='id')
+    geysers = decoder.decode_all(definitions)
+
+`decode_all` checks every definition and reports all of the bad ones
+together in a single `BadDefinitionsError`.
+"""
+from __future__ import annotations
+from typing import (Any,
+                    Callable,
+                    Generic,
+                    Iterable,
+                    List,
+                    Mapping,
+                    NamedTuple,
+                    Optional,
+                    Sequence,
+                    Tuple,
+                    TypeVar,
+                    Union)
+
+from oniref.units import Q, parse_unit
+
+T = TypeVar('T')
+
+Reader = Callable[[Mapping[str, Any]], Any]
+
+
+class BadDefinitionError(Exception):
+    def __init__(self, elem, inner):
+        super().__init__(
+            self, f'Encountered bad definition for {elem}: {inner!r}'
+        )
+        self.elem = elem
+        self.inner = inner
+
+
+class BadDefinitionsError(BadDefinitionError):
+    """
+    Every bad definition found by `Decoder.decode_all`, as 'errors'.
+    'elem' and 'inner' are those of the first.
+    """
+    def __init__(self, errors: Sequence[BadDefinitionError]):
+        super().__init__(errors[0].elem, errors[0].inner)
+        self.errors = list(errors)
+        details = '; '.join(f'{e.elem}: {e.inner!r}' for e in self.errors)
+        self.args = (
+            self,
+            f'Encountered {len(self.errors)} bad definitions: {details}'
+        )
+
+
+class Field(NamedTuple):
+    """
+    How the attribute 'attr' is read from a definition.
+
+    'key' is the Klei key holding the value. With 'unit' given, the value
+    becomes a quantity of that unit. 'convert' is applied to the value
+    first; it defaults to `float` for quantities. A field that isn't
+    'required' is 'default' where the key is missing or null.
+
+    With a tuple of keys, 'convert' is called with the value of each, or
+    None for those that are missing, and 'required' is ignored.
+    """
+    key: Union[str, Tuple[str, ...]]
+    attr: str
+    unit: Optional[str] = None
+    required: bool = True
+    convert: Optional[Callable[..., Any]] = None
+    default: Any = None
+
+
+def _reader(field: Field) -> Reader:
+    key, convert, default = field.key, field.convert, field.default
+    if isinstance(key, tuple):
+        keys = key
+        combine = convert or (lambda *values: values)
+
+        def read_many(definition):
+            return combine(*(definition.get(k) for k in keys))
+
+        return read_many
+
+    if field.unit is not None:
+        unit = parse_unit(field.unit)
+        magnitude = convert or float
+
+        def convert_quantity(value):
+            return Q(magnitude(value), unit)
+
+        convert = convert_quantity
+
+    if field.required:
+        if convert is None:
+            def read_required(definition):
+                return definition[key]
+            return read_required
+
+        def read_converted(definition):
+            return convert(definition[key])
+        return read_converted
+
+    def read_optional(definition):
+        value = definition.get(key)
+        if value is None:
+            return default
+        return convert(value) if convert is not None else value
+
+    return read_optional
+
+
+class Decoder(Generic[T]):
+    """
+    Decoder of definitions into objects built by 'factory', which is
+    called with each field's 'attr' as a keyword argument. 'name_key'
+    is the key naming a definition in error reports.
+    """
+    def __init__(self,
+                 factory: Callable[..., T],
+                 fields: Sequence[Field],
+                 name_key: str):
+        self.fields = tuple(fields)
+        self._factory = factory
+        self._name_key = name_key
+        self._readers = [(field.attr, _reader(field)) for field in fields]
+
+    def _name(self, definition: Any) -> Any:
+        if isinstance(definition, Mapping):
+            return definition.get(self._name_key, '<unknown>')
+        return '<unknown>'
+
+    def decode(self, definition: Mapping[str, Any]) -> T:
+        """
+        Decode one definition. Raises `BadDefinitionError` for a missing
+        required key or a value which can't be converted.
+        """
+        try:
+            return self._factory(**{attr: read(definition)
+                                    for attr, read in self._readers})
+        except (KeyError, ValueError, TypeError) as e:
+            raise BadDefinitionError(self._name(definition), e) from e
+
+    def decode_all(self, definitions: Iterable[Mapping[str, Any]]) -> List[T]:
+        """
+        Decode every definition, checking all of them before raising a
+        `BadDefinitionsError` listing each one that is bad.
+        """
+        results: List[T] = []
+        errors: List[BadDefinitionError] = []
+        for definition in definitions:
+            try:
+                results.append(self.decode(definition))
+            except BadDefinitionError as e:
+                errors.append(e)
+
+        if errors:
+            raise BadDefinitionsError(errors)
+
+        return results
@@ -0,0 +1,284 @@
+"""
+Derived attributes of elements, computed once per element set.
+
+`Elements.derive` registers a named attribute defined by a predicate
+attribute or any callable, evaluates it for every element of the set,
+and stores the results as a column of magnitudes:
+
+    heat = elements.derive(
+        'tile_heat_capacity',
+        lambda e: e.specific_heat_capacity * e.mass_per_tile,
+        unit='DTU/°C')
+    elements.find(heat > Q(1e6, 'DTU/°C'))
+    elements.find(Element.tile_heat_capacity > Q(1e6, 'DTU/°C'))
+    sorted(elements, key=Element.tile_heat_capacity)
+
+The attribute is then read from its column wherever the columns of
+built-in attributes are: vectorized predicates, aggregates and joins.
+The elements of the set gain it too, so predicates and sort keys which
+are evaluated element by element find the stored value rather than
+computing it again. An element's value is None where the definition
+gave None or NaN, and evaluating it raises the exception the definition
+raised, if any.
+
+Each attribute has a sorted index for range queries, built with the
+attribute when 'index' is set and on first use otherwise:
+
+    elements.derived.between('tile_heat_capacity',
+                             Q(1e6, 'DTU/°C'), Q(5e6, 'DTU/°C'))
+
+Only frozen sets have derived attributes, so values computed when the
+attribute is registered can't go out of date. The columns of the set
+hold them, so views sharing those columns, such as localized sets, see
+them too. Registrations are not pickled with the set, but copies of its
+elements keep their values, and so do elements pickled on their own.
+"""
+from __future__ import annotations
+from functools import cached_property
+from typing import (Any,
+                    Callable,
+                    Dict,
+                    Iterator,
+                    List,
+                    Mapping,
+                    Optional,
+                    Tuple,
+                    Union)
+
+import numpy as np
+from pint import Quantity as BaseQ
+
+from oniref import expressions as ex
+from oniref.elements import Element, Elements
+from oniref.predicates import Attribute
+from oniref.units import Q, UnitSpec, convert, parse_unit
+
+Definition = Union[Attribute, Callable[[Element], Any]]
+
+
+def _tile_heat_capacity(e: Element) -> Any:
+    if e.mass_per_tile is None:
+        return None
+    return e.specific_heat_capacity * e.mass_per_tile
+
+
+def _volumetric_heat_capacity(e: Element) -> Any:
+    if e.density is None:
+        return None
+    return e.specific_heat_capacity * e.density
+
+
+def _transition_span(e: Element) -> Any:
+    if e.low_transition is None or e.high_transition is None:
+        return None
+    high: Any = e.high_transition.temperature
+    return high - e.low_transition.temperature
+
+
+# Commonly used derived attributes, with the unit of each, for
+# `derive_standard`.
+STANDARD: Mapping[str, Tuple[Callable[[Element], Any], str]] = {
+    'tile_heat_capacity': (_tile_heat_capacity, 'DTU/°C'),
+    'volumetric_heat_capacity': (_volumetric_heat_capacity, 'DTU/m^3/°C'),
+    'transition_span': (_transition_span, 'delta_degC'),
+}
+
+
+class DerivedAttribute:
+    """
+    The value of the derived attribute 'name' for every element, as
+    magnitudes in 'unit', or plain numbers if 'unit' is None. 'missing'
+    marks the elements whose value is None and 'raising' those for which
+    the definition raised, with the exceptions in 'errors' by position.
+    """
+    def __init__(self,
+                 name: str,
+                 definition: Attribute,
+                 values: np.ndarray,
+                 unit: Optional[UnitSpec],
+                 missing: np.ndarray,
+                 raising: np.ndarray,
+                 errors: Dict[int, Exception]):
+        self.name = name
+        self.definition = definition
+        self.values = values
+        self.unit = unit
+        self.missing = missing
+        self.raising = raising
+        self.errors = errors
+
+        for array in (values, missing, raising):
+            array.flags.writeable = False
+
+    def __repr__(self):
+        return f'DerivedAttribute({self.name!r}, unit={self.unit!r})'
+
+    def value(self, position: int) -> Any:
+        """
+        The value for the element at 'position', as the definition gave
+        it, converted to `unit`.
+        """
+        if self.raising[position]:
+            raise self.errors[position]
+        if self.missing[position]:
+            return None
+
+        value = float(self.values[position])
+        return (Q(value, parse_unit(self.unit)) if self.unit is not None
+                else value)
+
+    @cached_property
+    def order(self) -> np.ndarray:
+        """
+        Positions of the elements which have a value, sorted by value.
+        """
+        present = np.flatnonzero(~(self.missing | self.raising))
+        return present[np.argsort(self.values[present], kind='stable')]
+
+    @cached_property
+    def _sorted(self) -> np.ndarray:
+        return self.values[self.order]
+
+    def _magnitude(self, bound: Any) -> float:
+        if isinstance(bound, BaseQ):
+            if self.unit is None:
+                raise TypeError(f'{self.name} is not a quantity')
+            return float(convert(bound.m, bound.units, self.unit))
+        if self.unit is not None \
+                and not parse_unit(self.unit).dimensionless:
+            raise TypeError(f'{self.name} is a quantity')
+        return float(bound)
+
+    def range(self, low: Any = None, high: Any = None) -> np.ndarray:
+        """
+        Positions of the elements with values between 'low' and 'high'
+        inclusive, sorted by value. Either bound can be None.
+        """
+        start, stop = 0, len(self.order)
+        if low is not None:
+            start = int(np.searchsorted(self._sorted, self._magnitude(low),
+                                        side='left'))
+        if high is not None:
+            stop = int(np.searchsorted(self._sorted, self._magnitude(high),
+                                       side='right'))
+
+        return self.order[start:max(start, stop)]
+
+
+class DerivedAttributes(Mapping[str, DerivedAttribute]):
+    """
+    The derived attributes registered on 'elements', by name.
+    """
+    def __init__(self, elements: Elements):
+        self._elements = elements
+        self._attributes: Dict[str, DerivedAttribute] = {}
+
+    def __getitem__(self, name: str) -> DerivedAttribute:
+        return self._attributes[name]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._attributes)
+
+    def __len__(self) -> int:
+        return len(self._attributes)
+
+    def register(self,
+                 name: str,
+                 definition: Definition,
+                 unit: Optional[UnitSpec] = None,
+                 index: bool = False) -> Attribute:
+        """
+        See `Elements.derive`.
+        """
+        if (not name.isidentifier() or name.startswith('_')
+                or hasattr(Element, name)
+                or name in Element.__dataclass_fields__):
+            raise ValueError(f'Bad derived attribute name {name!r}')
+
+        if not self._elements.frozen:
+            raise ValueError('Derived attributes need a frozen set, whose '
+                             'values stay up to date')
+        if not isinstance(definition, Attribute):
+            definition = Attribute(definition, name)
+
+        elements = self._elements
+        defs = elements._defs  # pylint: disable=protected-access
+        evaluate = definition._attr  # pylint: disable=protected-access
+        count = len(defs)
+        values = np.full(count, np.nan)
+        missing = np.zeros(count, dtype=bool)
+        raising = np.zeros(count, dtype=bool)
+        errors: Dict[int, Exception] = {}
+        results: List[Any] = []
+        for i, elem in enumerate(defs):
+            try:
+                results.append(evaluate(elem))
+            except Exception as e:  # pylint: disable=broad-except
+                results.append(None)
+                raising[i] = True
+                errors[i] = e
+
+        if unit is None:
+            unit = next((r.units for r in results
+                         if isinstance(r, BaseQ)), None)
+        for i, result in enumerate(results):
+            if raising[i]:
+                continue
+            if result is None:
+                missing[i] = True
+            elif isinstance(result, BaseQ):
+                if unit is None:
+                    raise TypeError(f'{name} mixes quantities and numbers')
+                values[i] = convert(result.m, result.units, unit)
+            elif isinstance(result, (int, float, np.number)):
+                values[i] = float(result)
+            else:
+                raise TypeError(
+                    f'{name} is {result!r} for {defs[i]!r}; derived '
+                    'attributes must be numbers or quantities'
+                )
+        missing |= np.isnan(values) & ~raising
+
+        attribute = DerivedAttribute(name, definition, values, unit,
+                                     missing, raising, errors)
+        if index:
+            _ = attribute.order
+
+        self._attributes[name] = attribute
+        elements.columns.derived[name] = attribute
+        for elem in defs:
+            elem._attach(name, self)  # pylint: disable=protected-access
+
+        return Attribute(ex.GetAttr(ex.ROOT, name))
+
+    def value(self, name: str, elem: Element) -> Any:
+        """
+        The value of the derived attribute 'name' for 'elem'.
+        """
+        position = self._elements.columns.index[elem.name]
+        return self._attributes[name].value(position)
+
+    def between(self, name: str, low: Any = None,
+                high: Any = None) -> List[Element]:
+        """
+        The elements whose value of 'name' is between 'low' and 'high'
+        inclusive, in order of that value, found with its index.
+        """
+        defs = self._elements._defs  # pylint: disable=protected-access
+        return [defs[i] for i in self._attributes[name].range(low, high)]
+
+    def sorted(self, name: str, reverse: bool = False) -> List[Element]:
+        """
+        The elements which have a value of 'name', in order of it.
+        """
+        order = self._attributes[name].order
+        defs = self._elements._defs  # pylint: disable=protected-access
+        return [defs[i] for i in (order[::-1] if reverse else order)]
+
+
+def derive_standard(elements: Elements, index: bool = False):
+    """
+    Register the attributes in `STANDARD` on 'elements'.
+    """
+    for name, (definition, unit) in STANDARD.items():
+        elements.derive(name, definition, unit, index)
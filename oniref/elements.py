@@ -1,25 +1,57 @@
 from __future__ import annotations
-from dataclasses import dataclass
+from concurrent.futures import Executor
+import copy
+from dataclasses import dataclass, FrozenInstanceError
 from enum import Enum
+from functools import cached_property
 from os import PathLike
 from pathlib import Path
+from types import MappingProxyType
 import re
+import time
 from typing import (Any,
                     Callable,
                     IO,
+                    Iterable,
+                    Iterator,
+                    Mapping,
                     Optional,
                     Sequence,
+                    TYPE_CHECKING,
                     Union,
                     cast)
 import yaml
 
-from oniref.units import Q, maybeQ
-from oniref.strings import load_strings, KleiStrings
+from oniref.decoding import (BadDefinitionError,
+                             BadDefinitionsError,
+                             Decoder,
+                             Field)
+from oniref.instrumentation import emit, enabled, span
+from oniref.units import Q, convert, parse_unit, to_units
+from oniref.strings import find_catalogs, load_strings, KleiStrings
+
+if TYPE_CHECKING:
+    from oniref.aggregate import GroupBy
+    from oniref.columns import ElementColumns
+    from oniref.derived import Definition, DerivedAttributes
+    from oniref.predicates import Attribute
 
 #  pylint: disable=protected-access
 
 Predicate = Callable[['Element'], bool]
 
+# Units element quantities are stored in when packed into columns or
+# pickled, which are also the units of the game's definitions.
+CANONICAL_UNITS: Mapping[str, str] = {
+    'specific_heat_capacity': 'DTU/g/°C',
+    'thermal_conductivity': 'DTU/(m s)/°C',
+    'molar_mass': 'g/mol',
+    'radiation_absorption': 'dimensionless',
+    'radioactivity': 'rads/kg',
+    'mass_per_tile': 'kg',
+}
+TEMPERATURE_UNIT = '°C'
+
 
 class State(Enum):
     Vacuum = 0
@@ -28,7 +60,41 @@ class State(Enum):
     Gas = 3
 
 
-class Transition:
+class _Freezable:
+    """
+    Mixin which rejects attribute assignment once `_freeze` is called.
+    """
+    _frozen = False
+
+    def _freeze(self):
+        object.__setattr__(self, '_frozen', True)
+
+    def __setattr__(self, name, value):
+        if self._frozen:
+            raise FrozenInstanceError(f'cannot assign to field {name!r}')
+        super().__setattr__(name, value)
+
+    def __delattr__(self, name):
+        if self._frozen:
+            raise FrozenInstanceError(f'cannot delete field {name!r}')
+        super().__delattr__(name)
+
+    # Copies keep quantities in their own units and transitions linked
+    # to elements; only pickling uses the compact form of `__reduce__`.
+    def __copy__(self):
+        result = object.__new__(type(self))
+        result.__dict__.update(self.__dict__)
+        return result
+
+    def __deepcopy__(self, memo):
+        result = object.__new__(type(self))
+        memo[id(self)] = result
+        for name, value in self.__dict__.items():
+            result.__dict__[name] = copy.deepcopy(value, memo)
+        return result
+
+
+class Transition(_Freezable):
     temperature: Q
     target: Union[str, 'Element']
     ore: Optional[Union[str, 'Element']]
@@ -56,6 +122,12 @@ class Transition:
         self.target = mapping[self._name()]
         self.ore = mapping.get(self._ore_name(), None)
 
+    def __reduce__(self):
+        return (_unpickle_transition,
+                (_magnitude(self.temperature, TEMPERATURE_UNIT),
+                 self._name(), self._ore_name(), self.ore_ratio,
+                 self._frozen))
+
     def __eq__(self, o):
         return (o.temperature == self.temperature
                 and o._name() == self._name()
@@ -63,17 +135,24 @@ class Transition:
 
     @staticmethod
     def read(klei_dict: dict[str, Any], prefix: str) -> Optional[Transition]:
-        temp = klei_dict.get(f'{prefix}Temp')
-        target = klei_dict.get(f'{prefix}TempTransitionTarget')
-        ore = klei_dict.get(f'{prefix}TempTransitionOreId')
-        ore_ratio = klei_dict.get(f'{prefix}TempTransitionOreMassConversion')
-        ore_ratio = float(ore_ratio) if ore_ratio is not None else None
+        return Transition.from_klei(
+            *(klei_dict.get(key) for key in _transition_keys(prefix))
+        )
 
+    @staticmethod
+    def from_klei(temp: Any, target: Any, ore: Any = None,
+                  ore_ratio: Any = None) -> Optional[Transition]:
+        """
+        The transition given by the values of the Klei keys named by
+        `_transition_keys`, or None if it has no temperature or target.
+        """
         if temp is None or target is None:
             return None
 
         return Transition(
-            Q(float(temp), '°K').to('°C'), target, ore, ore_ratio
+            Q(convert(float(temp), '°K', TEMPERATURE_UNIT),
+              parse_unit(TEMPERATURE_UNIT)),
+            target, ore, float(ore_ratio) if ore_ratio is not None else None
         )
 
     def __str__(self):
@@ -88,17 +167,8 @@ class MissingElementsError(Exception):
         )
 
 
-class BadDefinitionError(Exception):
-    def __init__(self, elem, inner):
-        super().__init__(
-            self, f'Encountered bad definition for {elem}: {inner!r}'
-        )
-        self.elem = elem
-        self.inner = inner
-
-
 @dataclass
-class Element:
+class Element(_Freezable):
     name: str
     pretty_name: str
     state: State
@@ -119,34 +189,7 @@ class Element:
 
     @staticmethod
     def from_klei(klei_dict: dict) -> Element:
-        try:
-            return Element(
-                name=klei_dict['elementId'],
-                pretty_name=klei_dict['localizationID'],
-                state=State[klei_dict['state']],
-                specific_heat_capacity=Q(
-                    klei_dict['specificHeatCapacity'], 'DTU/g/°C'
-                ),
-                thermal_conductivity=Q(
-                    klei_dict['thermalConductivity'], 'DTU/(m s)/°C'
-                ),
-                molar_mass=Q(
-                    klei_dict['molarMass'], 'g/mol'
-                ),
-                radiation_absorption=Q(
-                    klei_dict['radiationAbsorptionFactor'], 'dimensionless'
-                ),
-                radioactivity=Q(
-                    klei_dict['radiationPer1000Mass'], 'rads/kg'
-                ),
-                mass_per_tile=maybeQ(klei_dict.get('maxMass'), 'kg'),
-                low_transition=Transition.read(klei_dict, 'low'),
-                high_transition=Transition.read(klei_dict, 'high')
-            )
-        except KeyError as e:
-            raise BadDefinitionError(
-                klei_dict.get('elementId', '<unknown>'), e
-            ) from e
+        return ELEMENT_DECODER.decode(klei_dict)
 
     @property
     def thermal_diffusivity(self) -> Optional[Q]:
@@ -162,6 +205,55 @@ class Element:
         return (self.mass_per_tile / Q(1, 'm^3')
                 if self.mass_per_tile is not None else None)
 
+    def __getattr__(self, name):
+        # Only reached for names which aren't fields or properties.
+        derived = self.__dict__.get('_derived')
+        if derived is None or name not in derived:
+            raise AttributeError(
+                f"'Element' object has no attribute {name!r}"
+            )
+        return derived[name].value(name, self)
+
+    def _attach(self, name: str, registry: Any):
+        """
+        Make the derived attribute 'name' in 'registry', anything with a
+        `value(name, elem)` method, readable on this element, which is
+        allowed even once it is frozen.
+        """
+        if '_derived' not in self.__dict__:
+            object.__setattr__(self, '_derived', {})
+        self.__dict__['_derived'][name] = registry
+
+    def __copy__(self):
+        result = super().__copy__()
+        if '_derived' in self.__dict__:
+            result.__dict__['_derived'] = dict(self.__dict__['_derived'])
+        return result
+
+    def __deepcopy__(self, memo):
+        # Copies read derived values from the registries of the set,
+        # which isn't copied along with the element.
+        derived = self.__dict__.get('_derived')
+        if derived is not None:
+            memo[id(derived)] = dict(derived)
+        return super().__deepcopy__(memo)
+
+    def _stored_derived(self) -> Optional[dict[str, _StoredValue]]:
+        """
+        The derived values of this element, for pickling it on its own.
+        """
+        derived = self.__dict__.get('_derived')
+        if not derived:
+            return None
+
+        result = {}
+        for name, registry in derived.items():
+            try:
+                result[name] = _StoredValue(registry.value(name, self))
+            except Exception as e:  # pylint: disable=broad-except
+                result[name] = _StoredValue(error=e)
+        return result
+
     def _resolve(self, mapping, strings):
         if self.low_transition:
             self.low_transition._resolve(mapping)
@@ -171,38 +263,274 @@ class Element:
 
         self.pretty_name = strings.get(self.pretty_name, self.pretty_name)
 
+    def _freeze(self):
+        for transition in (self.low_transition, self.high_transition):
+            if transition is not None:
+                transition._freeze()
+
+        super()._freeze()
+
+    def __reduce__(self):
+        return (_unpickle_element,
+                (self.name, self.pretty_name, self.state.value,
+                 tuple(_magnitude(getattr(self, field), unit)
+                       for field, unit in CANONICAL_UNITS.items()),
+                 self.low_transition, self.high_transition, self._frozen,
+                 self._stored_derived()))
+
     def ΔQ(self, ΔT: Q, mass: Q):
         """
         Compute the heat energy gained or lost when changing the temperature of
         'mass' units of this element by 'ΔT' degrees.
         """
         return (self.specific_heat_capacity
-                * ΔT.to('delta_degC')
-                * mass.to('g')).to_compact()
+                * to_units(ΔT, 'delta_degC')
+                * to_units(mass, 'g')).to_compact()
 
     def ΔT(self, ΔQ: Q, mass: Q):
         """
         Compute the temperature change when heating 'mass' units of
         this element with 'ΔQ' units of heat.
         """
-        return (ΔQ.to('DTU') / (self.specific_heat_capacity
-                                * mass.to('g')))
+        return (to_units(ΔQ, 'DTU') / (self.specific_heat_capacity
+                                       * to_units(mass, 'g')))
 
     def __eq__(self, o):
+        if not isinstance(o, Element):
+            return NotImplemented
         return self.name == o.name
 
+    def __hash__(self):
+        # Elements are identified by name, which must not change while
+        # the element is in a set or used as a key.
+        return hash(self.name)
+
+
+def _transition_keys(prefix: str) -> tuple[str, ...]:
+    return (f'{prefix}Temp',
+            f'{prefix}TempTransitionTarget',
+            f'{prefix}TempTransitionOreId',
+            f'{prefix}TempTransitionOreMassConversion')
+
+
+ELEMENT_FIELDS = (
+    Field('elementId', 'name'),
+    Field('localizationID', 'pretty_name'),
+    Field('state', 'state', convert=lambda name: State[name]),
+    Field('specificHeatCapacity', 'specific_heat_capacity',
+          CANONICAL_UNITS['specific_heat_capacity']),
+    Field('thermalConductivity', 'thermal_conductivity',
+          CANONICAL_UNITS['thermal_conductivity']),
+    Field('molarMass', 'molar_mass', CANONICAL_UNITS['molar_mass']),
+    Field('radiationAbsorptionFactor', 'radiation_absorption',
+          CANONICAL_UNITS['radiation_absorption']),
+    Field('radiationPer1000Mass', 'radioactivity',
+          CANONICAL_UNITS['radioactivity']),
+    Field('maxMass', 'mass_per_tile', CANONICAL_UNITS['mass_per_tile'],
+          required=False),
+    Field(_transition_keys('low'), 'low_transition',
+          convert=Transition.from_klei),
+    Field(_transition_keys('high'), 'high_transition',
+          convert=Transition.from_klei),
+)
+
+ELEMENT_DECODER = Decoder(Element, ELEMENT_FIELDS, name_key='elementId')
+
+
+def _magnitude(quantity: Optional[Q], unit: str) -> Optional[float]:
+    if quantity is None:
+        return None
+    return float(convert(quantity.m, quantity.units, unit))
+
+
+def _quantity(magnitude: Optional[float], unit: str) -> Optional[Q]:
+    return Q(magnitude, parse_unit(unit)) if magnitude is not None else None
+
+
+def _unpickle_transition(temperature, target, ore, ore_ratio, frozen):
+    result = Transition(_quantity(temperature, TEMPERATURE_UNIT),
+                        target, ore, ore_ratio)
+    if frozen:
+        result._freeze()
+    return result
+
+
+class _StoredValue:
+    """
+    A derived value, or the error evaluating it raised, carried by a
+    pickled element in place of the registry of its set.
+    """
+    __slots__ = ('stored', 'error')
+
+    def __init__(self, stored: Any = None,
+                 error: Optional[Exception] = None):
+        self.stored = stored
+        self.error = error
+
+    def __reduce__(self):
+        return (_StoredValue, (self.stored, self.error))
+
+    def value(self, name: str, elem: Element) -> Any:
+        # pylint: disable=unused-argument
+        if self.error is not None:
+            raise self.error
+        return self.stored
+
+
+def _unpickle_element(name, pretty_name, state, quantities,
+                      low_transition, high_transition, frozen,
+                      derived=None):
+    fields = dict(zip(CANONICAL_UNITS,
+                      (_quantity(magnitude, unit) for magnitude, unit
+                       in zip(quantities, CANONICAL_UNITS.values()))))
+    result = Element(name, pretty_name, State(state),
+                     low_transition=low_transition,
+                     high_transition=high_transition,
+                     **fields)
+    for attribute, value in (derived or {}).items():
+        result._attach(attribute, value)
+    if frozen:
+        result._freeze()
+    return result
+
 
 class Elements:
+    """
+    The set of element definitions, indexed by position and by name.
+
+    Constructing an `Elements` links the transitions of every element to
+    their targets and replaces localization IDs with pretty names.
+    'definitions' can be any iterable, such as the elements streamed by
+    `iter_klei_definitions`, which makes this the deferred resolution
+    step of a streaming load. With
+    'frozen' set, the strings and every element and transition are made
+    read-only once that is done, so the instance can be shared between
+    threads without locking.
+    """
     def __init__(self,
-                 definitions: Sequence[Element],
-                 strings: KleiStrings):
+                 definitions: Iterable[Element],
+                 strings: KleiStrings,
+                 frozen: bool = False):
+        self._setup(definitions, strings)
+
+        # Resolution replaces each localization ID with its string in
+        # 'strings', so keep them for looking up other locales.
+        self._localization_ids = {elem.name: elem.pretty_name
+                                  for elem in self._defs}
+
+        if frozen:
+            strings.freeze()
+
+        with span('load.resolve', elements=len(self._id_map)):
+            for elem in self._id_map.values():
+                elem._resolve(self, strings)
+
+        self._frozen = frozen
+        if frozen:
+            self._finalize()
+
+    def _setup(self, definitions: Iterable[Element], strings: KleiStrings):
         self._defs = tuple(definitions)
-        self._id_map = {}
+        self._strings = strings
+        self._plans: dict[Any, Callable[[Element], Any]] = {}
+        self._id_map: Mapping[str, Element] = {}
         for elem in self._defs:
             self._id_map[elem.name] = elem
 
-        for elem in self._id_map.values():
-            elem._resolve(self, strings)
+    def __reduce__(self):
+        # Packed as columns: quantities become floats in canonical units
+        # and transitions become indices, without any pint objects.
+        # pylint: disable=import-outside-toplevel
+        from oniref.columns import ElementColumns
+        columns = ElementColumns.of(self)
+        return (_unpickle_elements,
+                (columns.to_bytes(),
+                 [self._localization_ids.get(elem.name)
+                  for elem in self._defs],
+                 self._strings, self._frozen))
+
+    @classmethod
+    def _restore(cls,
+                 columns: ElementColumns,
+                 localization_ids: Sequence[Optional[str]],
+                 strings: KleiStrings,
+                 frozen: bool) -> Elements:
+        """
+        Rebuild a set pickled by `__reduce__`. The pretty names are
+        already resolved, so only the transitions are linked.
+        """
+        result = cls.__new__(cls)
+        result._setup([columns.element(i) for i in range(len(columns))],
+                      strings)
+        result._localization_ids = {
+            name: key for name, key in zip(result._id_map, localization_ids)
+            if key is not None
+        }
+        for elem in result._defs:
+            for transition in (elem.low_transition, elem.high_transition):
+                if transition is not None:
+                    transition._resolve(result)
+
+        result._frozen = frozen
+        if frozen:
+            result.__dict__['columns'] = columns
+            result._finalize()
+
+        return result
+
+    def _finalize(self):
+        for elem in self._defs:
+            elem._freeze()
+
+        self._id_map = MappingProxyType(self._id_map)
+        _ = self.columns
+
+    @cached_property
+    def columns(self) -> ElementColumns:
+        """
+        Columnar snapshot of the element data in canonical units, built
+        on first access. Changes made to the elements afterwards are not
+        reflected, which is only a concern for unfrozen sets.
+        """
+        # pylint: disable=import-outside-toplevel
+        from oniref.columns import ElementColumns
+        return ElementColumns.from_elements(self)
+
+    @cached_property
+    def derived(self) -> DerivedAttributes:
+        """
+        The derived attributes registered with `derive`, by name.
+        """
+        # pylint: disable=import-outside-toplevel
+        from oniref.derived import DerivedAttributes
+        return DerivedAttributes(self)
+
+    def derive(self,
+               name: str,
+               definition: Definition,
+               unit: Any = None,
+               index: bool = False) -> Attribute:
+        """
+        Register the derived attribute 'name', defined by an `Attribute`
+        or a function of an element, and compute it for every element.
+        Values are stored as magnitudes in 'unit', by default the unit
+        of the first quantity, and the elements read them back as
+        `elem.<name>`, as do predicates on `Element.<name>`. With
+        'index' set, the sorted index used for range queries is built
+        straight away. Returns the attribute; see `oniref.derived`.
+
+        Only frozen sets, whose values can't go out of date, have derived
+        attributes. Raises ValueError for others.
+        """
+        return self.derived.register(name, definition, unit, index)
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    @property
+    def strings(self) -> KleiStrings:
+        return self._strings
 
     def __len__(self):
         return len(self._defs)
@@ -219,54 +547,374 @@ class Elements:
         except KeyError:
             return default
 
-    def find(self, needle: Union[str, re.Pattern, Predicate]):
-        match: Predicate
+    def __contains__(self, key: Union[Element, str]) -> bool:
+        name = key.name if isinstance(key, Element) else key
+        return isinstance(name, str) and name in self._id_map
+
+    def intern(self, elem: Union[Element, str]) -> Element:
+        """
+        Return the element of this set equal to 'elem', or named 'elem'.
+        Each set holds a single instance per name, so elements from
+        elsewhere, such as unpickled copies, can be interned and then
+        compared by identity.
+        """
+        return self[elem.name if isinstance(elem, Element) else elem]
+
+    def pretty_name(self, elem: Union[Element, str]) -> str:
+        """
+        The pretty name of 'elem', or of the element named 'elem', from
+        the strings of this set.
+        """
+        element: Element = self[elem] if isinstance(elem, str) else elem
+        key = self._localization_ids.get(element.name)
+        if key is None:
+            return element.pretty_name
+
+        return self._strings.get(key, element.pretty_name)
+
+    def localized(self, locale: str) -> LocalizedElements:
+        """
+        Return a view of these elements using the strings of 'locale'.
+        """
+        return LocalizedElements(self, self._strings.locale(locale))
+
+    def _text_fields(self) -> Iterator[tuple[str, str]]:
+        """
+        The name and pretty name of every element, in order.
+        """
+        return ((elem.name, elem.pretty_name) for elem in self._defs)
+
+    def _mask(self, needle: Any) -> Any:
+        """
+        Boolean array of which elements satisfy the predicate 'needle',
+        if it can be evaluated over `columns`. Only frozen sets are, as
+        the columns of others may be out of date.
+        """
+        node = getattr(needle, '_node', None)
+        if not self._frozen or node is None:
+            return None
+
+        # pylint: disable=import-outside-toplevel
+        from oniref.vectorized import mask
+        if not enabled():
+            return mask(node, self.columns)
+
+        start = time.perf_counter()
+        result = mask(node, self.columns)
+        if result is not None:
+            emit('elements.match.vectorized', time.perf_counter() - start,
+                 needle=type(needle).__name__,
+                 scanned=len(self._defs),
+                 matched=int(result.sum()))
+        return result
+
+    def _measured(self, positions: Iterator[int], path: str,
+                  needle: Any) -> Iterator[int]:
+        """
+        Pass 'positions' through, reporting the time spent finding them
+        as an 'elements.match.<path>' event once they are done with.
+        """
+        if not enabled():
+            return positions
+
+        def measure():
+            elapsed = 0.0
+            scanned = matched = 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    position = next(positions, None)
+                    elapsed += time.perf_counter() - start
+                    if position is None:
+                        scanned = len(self._defs)
+                        return
+                    scanned, matched = position + 1, matched + 1
+                    yield position
+            finally:
+                emit(f'elements.match.{path}', elapsed,
+                     needle=type(needle).__name__,
+                     scanned=scanned,
+                     matched=matched)
+
+        return measure()
+
+    def _positions(self, needle: Union[str, re.Pattern, Predicate]) \
+            -> Iterator[int]:
+        """
+        Positions of the elements matching 'needle', in order.
+        """
+        match_text: Callable[[str, str], Any]
         if isinstance(needle, str):
             needlestr = cast(str, needle)
 
-            def match_str(elem):
-                return needlestr in elem.name or needlestr in elem.pretty_name
+            def match_str(name, pretty_name):
+                return needlestr in name or needlestr in pretty_name
 
-            match = match_str
+            match_text = match_str
         elif isinstance(needle, re.Pattern):
             pattern = cast(re.Pattern, needle)
 
-            def match_re(elem):
-                return (pattern.search(elem.name)
-                        or pattern.search(elem.pretty_name))
+            def match_re(name, pretty_name):
+                return pattern.search(name) or pattern.search(pretty_name)
 
-            match = match_re
+            match_text = match_re
 
         elif callable(needle):
-            match = cast(Predicate, needle)
+            mask = self._mask(needle)
+            if mask is not None:
+                return iter(mask.nonzero()[0].tolist())
+
+            # pylint: disable=import-outside-toplevel
+            from oniref.planner import plan
+            match = plan(needle, self)
+            return self._measured(
+                (i for i, elem in enumerate(self._defs) if match(elem)),
+                'elements', needle
+            )
 
         else:
             raise TypeError(needle)
 
-        return [elem for elem in self._defs if match(elem)]
+        return self._measured(
+            (i for i, (name, pretty_name) in enumerate(self._text_fields())
+             if match_text(name, pretty_name)),
+            'text', needle
+        )
+
+    def iter_find(self, needle: Union[str, re.Pattern, Predicate]) \
+            -> Iterator[Element]:
+        """
+        Like `find`, but yield the matches as they are found.
+        """
+        return (self._defs[i] for i in self._positions(needle))
+
+    def find(self,
+             needle: Union[str, re.Pattern, Predicate],
+             *,
+             executor: Optional[Executor] = None,
+             chunk_size: Optional[int] = None):
+        """
+        Return the elements matching 'needle', in order.
+
+        With an 'executor', a predicate is evaluated in parallel on its
+        workers, in chunks of 'chunk_size' elements or of a size chosen
+        from timing the predicate; see `oniref.parallel`.
+        """
+        if executor is None or not callable(needle):
+            return list(self.iter_find(needle))
+
+        mask = self._mask(needle)
+        if mask is not None:
+            return [self._defs[i] for i in mask.nonzero()[0].tolist()]
+
+        # pylint: disable=import-outside-toplevel
+        from oniref.parallel import find_positions
+        start = time.perf_counter()
+        positions = find_positions(self, needle, executor, chunk_size)
+        emit('elements.match.parallel', time.perf_counter() - start,
+             needle=type(needle).__name__,
+             scanned=len(self._defs),
+             matched=len(positions))
+        return [self._defs[i] for i in positions]
+
+    def count(self, needle: Union[str, re.Pattern, Predicate]) -> int:
+        mask = self._mask(needle) if callable(needle) else None
+        if mask is not None:
+            return int(mask.sum())
+
+        return sum(1 for _ in self._positions(needle))
+
+    def first(self,
+              needle: Union[str, re.Pattern, Predicate],
+              default: Optional[Element] = None) -> Optional[Element]:
+        """
+        Return the first element matching 'needle', or 'default' if none
+        does.
+        """
+        return next(self.iter_find(needle), default)
+
+    def any(self, needle: Union[str, re.Pattern, Predicate]) -> bool:
+        return next(self._positions(needle), None) is not None
+
+    def group_by(self, key: Any, where: Any = None) -> GroupBy:
+        """
+        Group the elements, or those matching 'where', by the value of
+        the attribute 'key' for aggregation.
+        """
+        # pylint: disable=import-outside-toplevel
+        from oniref.aggregate import GroupBy
+        return GroupBy(self, key, where)
+
+
+class LocalizedElements(Elements):
+    """
+    View of an `Elements` set with the strings of another locale. The
+    elements are shared with the set and left unchanged, so their own
+    `pretty_name` stays in the original language; `pretty_name` on the
+    view gives the localized one, and text searches match it.
+    """
+    def __init__(self, elements: Elements, strings: KleiStrings):
+        # pylint: disable=super-init-not-called
+        self._base = elements
+        self._defs = elements._defs
+        self._id_map = elements._id_map
+        self._localization_ids = elements._localization_ids
+        self._strings = strings
+        self._plans = elements._plans
+        self._frozen = elements._frozen
+
+    def __reduce__(self):
+        return (LocalizedElements, (self._base, self._strings))
+
+    @property
+    def columns(self) -> ElementColumns:  # type: ignore[override]
+        return self._base.columns
+
+    @property
+    def derived(self) -> DerivedAttributes:  # type: ignore[override]
+        return self._base.derived
+
+    def localized(self, locale: str) -> LocalizedElements:
+        return self._base.localized(locale)
 
+    @cached_property
+    def _pretty_names(self) -> list[str]:
+        return [self.pretty_name(elem) for elem in self._defs]
+
+    def _text_fields(self) -> Iterator[tuple[str, str]]:
+        return zip((elem.name for elem in self._defs), self._pretty_names)
+
+
+def _unpickle_elements(data: bytes,
+                       localization_ids: Sequence[Optional[str]],
+                       strings: KleiStrings,
+                       frozen: bool) -> Elements:
+    # pylint: disable=import-outside-toplevel
+    from oniref.columns import ElementColumns
+    return Elements._restore(ElementColumns.from_buffer(data),
+                             localization_ids, strings, frozen)
+
+
+def load_klei_definitions_from_file(
+        yaml_in: Union[IO, str, bytes]) -> list[Element]:
+    with span('load.yaml'):
+        contents = yaml.safe_load(yaml_in)
 
-def load_klei_definitions_from_file(yaml_in: IO) -> list[Element]:
     try:
-        return [Element.from_klei(d) for d
-                in yaml.safe_load(yaml_in)['elements']]
+        definitions = contents['elements']
     except KeyError as e:
         raise MissingElementsError from e
 
+    with span('load.decode', elements=len(definitions)):
+        return ELEMENT_DECODER.decode_all(definitions)
+
+
+def iter_klei_definitions(
+        yaml_in: Union[IO, str, bytes]) -> Iterator[Element]:
+    """
+    Decode the elements of 'yaml_in' one at a time as they are parsed,
+    without holding the whole file. Every document in the stream, as in
+    concatenated mod-pack files, needs an "elements" list.
 
-def load_klei_definitions(oni_path: Union[PathLike, str]) -> Elements:
+    Transition targets and ores are left as names. Pass the elements to
+    `Elements` to resolve them once they have all been read.
+
+    Bad definitions are skipped and reported together in a
+    `BadDefinitionsError` at the end of the stream.
+    """
+    loader = yaml.SafeLoader(yaml_in)
+    errors: list[BadDefinitionError] = []
+    try:
+        loader.get_event()
+        while not loader.check_event(yaml.StreamEndEvent):
+            loader.get_event()
+            yield from _iter_document(loader, errors)
+            loader.get_event()
+            loader.anchors = {}
+    finally:
+        loader.dispose()
+
+    if errors:
+        raise BadDefinitionsError(errors)
+
+
+def _compose(loader: yaml.SafeLoader) -> Optional[yaml.Node]:
+    return loader.compose_node(None, None)  # type: ignore[arg-type]
+
+
+def _iter_document(loader: yaml.SafeLoader,
+                   errors: list[BadDefinitionError]) -> Iterator[Element]:
+    if not loader.check_event(yaml.MappingStartEvent):
+        raise MissingElementsError
+
+    found = False
+    loader.get_event()
+    while not loader.check_event(yaml.MappingEndEvent):
+        key = loader.construct_object(_compose(loader))
+        if key != 'elements' or not loader.check_event(
+                yaml.SequenceStartEvent):
+            _compose(loader)
+            continue
+
+        found = True
+        loader.get_event()
+        while not loader.check_event(yaml.SequenceEndEvent):
+            definition = loader.construct_object(_compose(loader), deep=True)
+            # Forget constructed objects so memory doesn't grow with the
+            # number of elements.
+            loader.constructed_objects = {}
+            try:
+                elem = ELEMENT_DECODER.decode(definition)
+            except BadDefinitionError as e:
+                errors.append(e)
+                continue
+            yield elem
+        loader.get_event()
+
+    loader.get_event()
+    if not found:
+        raise MissingElementsError
+
+
+def iter_klei_definition_files(
+        paths: Iterable[Union[PathLike, str]]) -> Iterator[Element]:
+    """
+    Stream the elements of each file in 'paths' in turn, opening each
+    file only when the previous one has been read.
+    """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as yaml_in:
+            yield from iter_klei_definitions(yaml_in)
+
+
+ELEMENT_FILES = ('gas.yaml', 'liquid.yaml', 'solid.yaml')
+
+
+def asset_paths(oni_path: Union[PathLike, str]) -> tuple[list[Path], Path]:
+    """
+    Return the paths of the element definition files and of the string
+    template within the game installation at 'oni_path'.
+    """
     assets_path: Path = (Path(oni_path) / 'OxygenNotIncluded_Data'
                          / 'StreamingAssets')
 
-    elements_path = assets_path / 'elements'
-    strings_path = assets_path / 'strings'
+    return ([assets_path / 'elements' / name for name in ELEMENT_FILES],
+            assets_path / 'strings' / 'strings_template.pot')
 
-    def load_one(name):
-        return load_klei_definitions_from_file(
-            (elements_path / name).open('r')
-        )
 
-    return Elements(load_one('gas.yaml')
-                    + load_one('liquid.yaml')
-                    + load_one('solid.yaml'),
-                    load_strings(strings_path / 'strings_template.pot'))
+def load_klei_definitions(oni_path: Union[PathLike, str],
+                          frozen: bool = False) -> Elements:
+    elements_paths, strings_path = asset_paths(oni_path)
+
+    def load_one(path):
+        with path.open('r') as yaml_in:
+            return load_klei_definitions_from_file(yaml_in)
+
+    with span('load'):
+        definitions: list[Element] = []
+        for path in elements_paths:
+            definitions += load_one(path)
+
+        strings = load_strings(strings_path,
+                               find_catalogs(strings_path.parent))
+        return Elements(definitions, strings, frozen)
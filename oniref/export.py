@@ -0,0 +1,193 @@
+"""
+Export of element columns to NumPy, pandas and Arrow without copying.
+
+`export` hands out the columns of an element set as NumPy arrays in
+canonical units, which are the set's own read-only arrays rather than
+copies:
+
+    table = export(elements)
+    table.numeric['thermal_conductivity']   # float64, DTU/(m s)/°C
+    table.units['thermal_conductivity']
+    table.state.codes, table.state.categories
+
+The state is exported as categorical codes into the `State` names, and
+element names, transition targets and ores as codes into the table of
+element names, with -1 where there is no value. Names are also
+available as Arrow-style offset and UTF-8 data buffers.
+
+`to_pandas` and `to_arrow` wrap those arrays in a DataFrame or an Arrow
+table, importing pandas or pyarrow only when called. Missing numbers
+are NaN in pandas and null in Arrow, which shares the data buffers and
+only adds validity bitmaps.
+
+The columns of frozen sets are built once and shared, so exporting them
+repeatedly costs nothing; unfrozen sets are packed into columns first.
+Exported arrays are read-only, and stay valid as long as they are
+referenced, even if the set is not.
+"""
+from __future__ import annotations
+from typing import Any, Dict, Mapping, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+
+from oniref.columns import (INDEX_COLUMNS,
+                            QUANTITY_COLUMNS,
+                            RATIO_COLUMNS,
+                            ElementColumns)
+from oniref.elements import Element, Elements, State
+
+# State names by value, which is the state's code.
+STATE_CATEGORIES = tuple(State(i).name for i in range(len(State)))
+
+
+class Categorical(NamedTuple):
+    """
+    Integer 'codes' into 'categories', with -1 for missing values.
+    """
+    codes: np.ndarray
+    categories: Sequence[str]
+
+
+class ExportedColumns:
+    """
+    Zero-copy views of the columns of an element set, in element order.
+
+    'numeric' holds the quantity columns, in the units given by 'units',
+    and the ore ratios. 'state' codes into `STATE_CATEGORIES`. 'name'
+    and the columns in 'references', transition targets and ores, code
+    into 'names'.
+    """
+    def __init__(self, columns: ElementColumns):
+        self._columns = columns
+        self.numeric: Dict[str, np.ndarray] = {
+            name: columns[name]
+            for name in (*QUANTITY_COLUMNS, *RATIO_COLUMNS)
+        }
+        self.units: Mapping[str, str] = QUANTITY_COLUMNS
+        self.state = Categorical(columns['state'], STATE_CATEGORIES)
+        self.names: Sequence[str] = columns.names
+        self.name = Categorical(np.arange(len(columns), dtype='<i4'),
+                                self.names)
+        self.references: Dict[str, Categorical] = {
+            name: Categorical(columns[name], self.names)
+            for name in INDEX_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self._columns)
+
+    def name_buffers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Element names as int64 offsets and UTF-8 data.
+        """
+        return self._columns.string_buffers('name')
+
+    def pretty_name_buffers(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Pretty names as int64 offsets and UTF-8 data.
+        """
+        return self._columns.string_buffers('pretty_name')
+
+    def to_pandas(self) -> Any:
+        """
+        A pandas DataFrame of the columns, indexed by element name, with
+        the state, transition targets and ores as categoricals. Numeric
+        columns share memory with the set; their units are in the
+        frame's `attrs['units']`.
+        """
+        # pylint: disable=import-outside-toplevel
+        import pandas as pd
+
+        names = pd.Categorical.from_codes(self.name.codes,
+                                          categories=list(self.names))
+        data: Dict[str, Any] = {
+            'state': pd.Categorical.from_codes(
+                self.state.codes.astype(np.int8),
+                categories=list(STATE_CATEGORIES)
+            ),
+            'pretty_name': list(self._columns.pretty_names),
+        }
+        data.update(self.numeric)
+        for column, reference in self.references.items():
+            data[column] = pd.Categorical.from_codes(
+                reference.codes, dtype=names.dtype
+            )
+
+        frame = pd.DataFrame(data, index=pd.CategoricalIndex(names,
+                                                             name='name'),
+                             copy=False)
+        frame.attrs['units'] = dict(self.units)
+        return frame
+
+    def to_arrow(self) -> Any:
+        """
+        A pyarrow Table of the columns. Numeric and string data are
+        wrapped without copying; names, targets and ores are dictionary
+        arrays over the element names, and the unit of each quantity is
+        in its field's metadata.
+        """
+        # pylint: disable=import-outside-toplevel
+        import pyarrow as pa
+
+        count = len(self)
+
+        def wrap(kind, values, valid=None):
+            bitmap = None
+            if valid is not None and not valid.all():
+                bitmap = pa.py_buffer(np.packbits(valid, bitorder='little'))
+            return pa.Array.from_buffers(kind, count,
+                                         [bitmap, pa.py_buffer(values)])
+
+        def strings(buffers):
+            offsets, data = buffers
+            return pa.Array.from_buffers(pa.large_string(), count,
+                                         [None, pa.py_buffer(offsets),
+                                          pa.py_buffer(data)])
+
+        names = strings(self.name_buffers())
+        columns = {
+            'name': pa.DictionaryArray.from_arrays(
+                wrap(pa.int32(), self.name.codes), names
+            ),
+            'pretty_name': strings(self.pretty_name_buffers()),
+            'state': pa.DictionaryArray.from_arrays(
+                wrap(pa.uint8(), self.state.codes),
+                pa.array(STATE_CATEGORIES)
+            ),
+        }
+        for column, values in self.numeric.items():
+            columns[column] = wrap(pa.float64(), values, ~np.isnan(values))
+        for column, reference in self.references.items():
+            columns[column] = pa.DictionaryArray.from_arrays(
+                wrap(pa.int32(), reference.codes, reference.codes >= 0),
+                names
+            )
+
+        fields = [pa.field(column, array.type,
+                           metadata=({'unit': self.units[column]}
+                                     if column in self.units else None))
+                  for column, array in columns.items()]
+        return pa.Table.from_arrays(list(columns.values()),
+                                    schema=pa.schema(fields))
+
+
+def export(elements: Union[Elements, Sequence[Element]]) -> ExportedColumns:
+    """
+    The columns of 'elements' as NumPy arrays, sharing memory with the
+    columns of frozen sets.
+    """
+    return ExportedColumns(ElementColumns.of(elements))
+
+
+def to_pandas(elements: Union[Elements, Sequence[Element]]) -> Any:
+    """
+    A pandas DataFrame of 'elements'; see `ExportedColumns.to_pandas`.
+    """
+    return export(elements).to_pandas()
+
+
+def to_arrow(elements: Union[Elements, Sequence[Element]]) -> Any:
+    """
+    A pyarrow Table of 'elements'; see `ExportedColumns.to_arrow`.
+    """
+    return export(elements).to_arrow()
@@ -0,0 +1,822 @@
+"""
+Expression trees behind `oniref.predicates`.
+
+Every `Attribute` wraps an immutable `Node`. Nodes compare and hash by
+structure, so two independently built copies of `low_temp() < t` are the
+same node, and each node compiles to a plain closure once. Arbitrary
+Python callables enter a tree as `Opaque` leaves.
+
+Structural equality also finds repeated subexpressions: `compile_shared`
+evaluates each of them once per element however often it appears.
+
+Nodes pickle by their constructor arguments, and every node but `Opaque`
+has a JSON-compatible form from `to_data`, which `from_data` reads back.
+Attribute paths are written as strings, with '?' before optional steps:
+
+    {"and": [{"attr": "state", "op": "==",
+              "value": {"enum": "State.Liquid"}},
+             {"attr": "low_transition.?temperature", "op": "<",
+              "value": {"quantity": [30, "degree_Celsius"]}}]}
+
+`to_json` writes that form with sorted keys and no whitespace, so equal
+trees always give the same text.
+"""
+from __future__ import annotations
+from enum import Enum
+import json
+import operator
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from pint import DimensionalityError, Quantity as BaseQ
+
+from oniref.units import Q, convert, parse_unit, to_units
+
+Evaluator = Callable[[Any], Any]
+
+
+def const_key(value: Any) -> Hashable:
+    """
+    Hashable stand-in for a constant appearing in an expression.
+    """
+    if isinstance(value, BaseQ):
+        return ('Q', const_key(value.m), str(value.units))
+    if isinstance(value, (tuple, list)):
+        return (type(value), tuple(const_key(v) for v in value))
+    if isinstance(value, (set, frozenset)):
+        return ('set', frozenset(const_key(v) for v in value))
+
+    try:
+        hash(value)
+    except TypeError:
+        return ('id', id(value))
+
+    return (type(value), value)
+
+
+def format_const(value: Any) -> str:
+    if isinstance(value, Enum):
+        return f'{type(value).__name__}.{value.name}'
+    if isinstance(value, BaseQ):
+        return str(value)
+    if isinstance(value, tuple):
+        return f'({", ".join(format_const(v) for v in value)})'
+
+    return repr(value)
+
+
+class Node:
+    """
+    Base class of expression nodes. `cost` is a rough, static estimate
+    of evaluating the node itself, excluding its children.
+    """
+    __slots__ = ('key', '_fn')
+    cost = 1.0
+    # Binding strength when written out, used to decide on parentheses.
+    precedence = 4
+
+    def __init__(self, key: Hashable):
+        self.key = key
+        self._fn: Optional[Evaluator] = None
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return ()
+
+    @property
+    def fn(self) -> Evaluator:
+        """
+        Evaluator for this node on its own, without sharing of repeated
+        subexpressions. See `compile_shared`.
+        """
+        if self._fn is None:
+            self._fn = self._build(tuple(c.fn for c in self.children))
+        return self._fn
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        """
+        Return an evaluator for this node given evaluators for each of
+        its children.
+        """
+        raise NotImplementedError
+
+    def total_cost(self) -> float:
+        return self.cost + sum(c.total_cost() for c in self.children)
+
+    def _args(self) -> Tuple[Any, ...]:
+        """
+        Arguments which construct an equal node, used for pickling.
+        """
+        raise NotImplementedError
+
+    def __reduce__(self):
+        return (type(self), self._args())
+
+    def to_data(self) -> Any:
+        """
+        JSON-compatible form of this node, read back by `from_data`.
+        Raises TypeError if the node or one of its constants has none.
+        """
+        raise TypeError(f'{type(self).__name__} {self} has no data form')
+
+    def __eq__(self, o: object) -> bool:
+        return isinstance(o, Node) and self.key == o.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __repr__(self) -> str:
+        return f'{type(self).__name__}({self})'
+
+
+def _identity(e: Any) -> Any:
+    return e
+
+
+class Root(Node):
+    """
+    The element an expression is evaluated against.
+    """
+    __slots__ = ()
+    cost = 0.0
+
+    def __init__(self):
+        super().__init__(('root',))
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        return _identity
+
+    def _args(self) -> Tuple[Any, ...]:
+        return ()
+
+    def __reduce__(self):
+        return 'ROOT'
+
+    def to_data(self) -> Any:
+        return ''
+
+    def __str__(self) -> str:
+        return 'Element'
+
+
+ROOT = Root()
+
+
+class Opaque(Node):
+    """
+    An arbitrary callable. Nothing is known about its cost or behavior.
+    """
+    __slots__ = ('func', 'desc')
+    cost = 10.0
+
+    def __init__(self, func: Evaluator, desc: Optional[str] = None):
+        super().__init__(('opaque', id(func)))
+        self.func = func
+        self.desc = desc
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        return self.func
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.func, self.desc)
+
+    def __str__(self) -> str:
+        return self.desc or '<unknown attribute>'
+
+
+class GetAttr(Node):
+    """
+    Attribute access on the value of 'parent'. If 'optional' is set, a
+    parent value of None yields None instead of raising.
+    """
+    __slots__ = ('parent', 'name', 'optional')
+
+    def __init__(self, parent: Node, name: str, optional: bool = False):
+        super().__init__(('getattr', parent.key, name, optional))
+        self.parent = parent
+        self.name = name
+        self.optional = optional
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return (self.parent,)
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        name = self.name
+        if self.parent is ROOT and not self.optional:
+            return operator.attrgetter(name)
+
+        parent, = children
+        if self.optional:
+            def get_optional(e):
+                value = parent(e)
+                return None if value is None else getattr(value, name)
+
+            return get_optional
+
+        def get(e):
+            return getattr(parent(e), name)
+
+        return get
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.parent, self.name, self.optional)
+
+    def to_data(self) -> Any:
+        parent = self.parent.to_data()
+        if isinstance(parent, str):
+            step = f'?{self.name}' if self.optional else self.name
+            return f'{parent}.{step}' if parent else step
+
+        return _optional_data({'getattr': self.name, 'of': parent},
+                              self.optional)
+
+    def __str__(self) -> str:
+        return f'{self.parent}{".?" if self.optional else "."}{self.name}'
+
+
+class Call(Node):
+    """
+    Call of the value of 'parent', which is usually a bound method.
+    """
+    __slots__ = ('parent', 'args', 'kwargs', 'optional')
+    cost = 4.0
+
+    def __init__(self,
+                 parent: Node,
+                 args: Tuple[Any, ...],
+                 kwargs: Dict[str, Any],
+                 optional: bool = False):
+        super().__init__(('call', parent.key, const_key(args),
+                          const_key(sorted(kwargs.items())), optional))
+        self.parent = parent
+        self.args = args
+        self.kwargs = kwargs
+        self.optional = optional
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return (self.parent,)
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        parent, = children
+        args = self.args
+        kwargs = self.kwargs
+        if self.optional:
+            def call_optional(e):
+                func = parent(e)
+                return None if func is None else func(*args, **kwargs)
+
+            return call_optional
+
+        def call(e):
+            return parent(e)(*args, **kwargs)
+
+        return call
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.parent, self.args, self.kwargs, self.optional)
+
+    def to_data(self) -> Any:
+        data = {'call': [encode_const(arg) for arg in self.args],
+                'of': self.parent.to_data()}
+        if self.kwargs:
+            data['kwargs'] = {key: encode_const(value)
+                              for key, value in self.kwargs.items()}
+
+        return _optional_data(data, self.optional)
+
+    def __str__(self) -> str:
+        arg_string = ','.join(
+            [repr(arg) for arg in self.args]
+            + [f'{key}={value!r}' for key, value in self.kwargs.items()]
+        )
+        return f'{self.parent}({arg_string})'
+
+
+class Convert(Node):
+    """
+    `.to(unit)` on the value of 'operand', using the cached conversions
+    in `oniref.units` rather than having pint parse 'unit' every time.
+    """
+    __slots__ = ('operand', 'unit', 'optional')
+    cost = 2.0
+
+    def __init__(self, operand: Node, unit: Any, optional: bool = False):
+        super().__init__(('convert', operand.key, const_key(unit), optional))
+        self.operand = operand
+        self.unit = unit
+        self.optional = optional
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return (self.operand,)
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        operand, = children
+        unit = self.unit
+        optional = self.optional
+
+        def evaluate(e):
+            value = operand(e)
+            if isinstance(value, BaseQ):
+                return to_units(value, unit)
+            if value is None and optional:
+                return None
+            return value.to(unit)
+
+        return evaluate
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.operand, self.unit, self.optional)
+
+    def to_data(self) -> Any:
+        return _optional_data({'to': str(self.unit),
+                               'of': self.operand.to_data()},
+                              self.optional)
+
+    def __str__(self) -> str:
+        return (f'{self.operand}{".?" if self.optional else "."}'
+                f'to({self.unit!r})')
+
+
+def _contains(attr: Any, values: Tuple[Any, ...]) -> bool:
+    if len(values) == 1:
+        try:
+            return attr in values[0]
+        except TypeError:
+            pass
+
+    return attr in values
+
+
+def in_members(values: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+    """
+    The values `Attribute.In(*values)` tests for membership in, or None
+    if it tests something else, such as containment in a string.
+    """
+    if len(values) != 1:
+        return values
+    if isinstance(values[0], (list, tuple, set, frozenset)):
+        return tuple(values[0])
+
+    return None
+
+
+def _member_set(values: Tuple[Any, ...]) -> Optional[frozenset]:
+    """
+    The members of 'values' as a frozenset, if hashing finds exactly
+    the members a linear scan would. Quantities hash differently from
+    equal quantities in other units, so they are left to the scan.
+    """
+    members = in_members(values)
+    if members is None or any(isinstance(m, BaseQ) for m in members):
+        return None
+
+    try:
+        return frozenset(members)
+    except TypeError:
+        return None
+
+
+class Compare(Node):
+    """
+    Comparison of the value of 'operand' with the constant 'value'.
+    For 'in', 'value' is the tuple of arguments given to `Attribute.In`.
+    """
+    __slots__ = ('op', 'operand', 'value')
+
+    operators: Dict[str, Callable[[Any, Any], Any]] = {
+        '<': operator.lt,
+        '<=': operator.le,
+        '==': operator.eq,
+        '>': operator.gt,
+        '>=': operator.ge,
+        'is': operator.is_,
+        'in': _contains,
+    }
+
+    def __init__(self, op: str, operand: Node, value: Any):
+        # Identity tests need the very same object, not an equal one.
+        key = ('id', id(value)) if op == 'is' else const_key(value)
+        super().__init__(('compare', op, operand.key, key))
+        self.op = op
+        self.operand = operand
+        self.value = value
+
+    @property
+    def cost(self) -> float:  # type: ignore[override]
+        # Comparing quantities converts units on every call.
+        return 2.0 if isinstance(self.value, BaseQ) else 1.0
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return (self.operand,)
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        compare = self.operators[self.op]
+        operand, = children
+        value = self.value
+        if isinstance(value, BaseQ) and self.op not in ('is', 'in'):
+            return self._build_quantity(operand)
+        if self.op == 'in':
+            members = _member_set(value)
+            if members is not None:
+                return self._build_member(operand, members)
+
+        def evaluate(e):
+            return compare(operand(e), value)
+
+        return evaluate
+
+    def _build_member(self,
+                      operand: Evaluator,
+                      members: frozenset) -> Evaluator:
+        """
+        Test membership with a hash lookup, falling back on a scan for
+        values which can't be hashed or hash inconsistently.
+        """
+        value = self.value
+
+        def evaluate(e):
+            attr = operand(e)
+            if isinstance(attr, BaseQ):
+                return _contains(attr, value)
+            try:
+                return attr in members
+            except TypeError:
+                return _contains(attr, value)
+
+        return evaluate
+
+    def _build_quantity(self, operand: Evaluator) -> Evaluator:
+        """
+        Compare quantities by magnitude, converting the constant to the
+        units of each value with a cached conversion.
+        """
+        compare = self.operators[self.op]
+        value = self.value
+        magnitude, units = value.m, value.units
+        equality = self.op == '=='
+
+        def evaluate(e):
+            attr = operand(e)
+            if not isinstance(attr, BaseQ):
+                return compare(attr, value)
+
+            try:
+                converted = convert(magnitude, units, attr.units)
+            except DimensionalityError:
+                if equality:
+                    return False
+                raise
+
+            return compare(attr.m, converted)
+
+        return evaluate
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.op, self.operand, self.value)
+
+    def to_data(self) -> Any:
+        return {'attr': self.operand.to_data(),
+                'op': self.op,
+                'value': encode_const(self.value)}
+
+    def __str__(self) -> str:
+        return f'{self.operand} {self.op} {format_const(self.value)}'
+
+
+class Junction(Node):
+    """
+    Base for n-ary `And` and `Or`. As with Python's own operators, the
+    first operand's value is returned when it decides the result; any
+    later deciding operand is converted to bool.
+    """
+    __slots__ = ('operands',)
+    cost = 0.0
+    word = ''
+
+    def __init__(self, operands: Tuple[Node, ...]):
+        super().__init__((self.word, tuple(o.key for o in operands)))
+        self.operands = operands
+
+    @classmethod
+    def of(cls, *operands: Node) -> Node:
+        """
+        Combine 'operands', merging any which are already of this type.
+        """
+        flat: Tuple[Node, ...] = ()
+        for operand in operands:
+            flat += (operand.operands if type(operand) is cls  # noqa: E721
+                     else (operand,))
+
+        return flat[0] if len(flat) == 1 else cls(flat)
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return self.operands
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        # Implemented by `And` and `Or`.
+        raise NotImplementedError
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.operands,)
+
+    def to_data(self) -> Any:
+        return {self.word: [o.to_data() for o in self.operands]}
+
+    def __str__(self) -> str:
+        def wrap(node):
+            return (f'({node})' if node.precedence < self.precedence
+                    else str(node))
+
+        return f' {self.word} '.join(wrap(o) for o in self.operands)
+
+
+class And(Junction):
+    __slots__ = ()
+    word = 'and'
+    precedence = 2
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        first, *rest = children
+
+        def evaluate(e):
+            value = first(e)
+            if not value:
+                return value
+
+            for operand in rest:
+                if not operand(e):
+                    return False
+
+            return True
+
+        return evaluate
+
+
+class Or(Junction):
+    __slots__ = ()
+    word = 'or'
+    precedence = 1
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        first, *rest = children
+
+        def evaluate(e):
+            value = first(e)
+            if value:
+                return value
+
+            for operand in rest:
+                if operand(e):
+                    return True
+
+            return False
+
+        return evaluate
+
+
+class Not(Node):
+    __slots__ = ('operand',)
+    cost = 0.0
+    precedence = 3
+
+    def __init__(self, operand: Node):
+        super().__init__(('not', operand.key))
+        self.operand = operand
+
+    @property
+    def children(self) -> Tuple[Node, ...]:
+        return (self.operand,)
+
+    def _build(self, children: Tuple[Evaluator, ...]) -> Evaluator:
+        operand, = children
+
+        def evaluate(e):
+            return not operand(e)
+
+        return evaluate
+
+    def _args(self) -> Tuple[Any, ...]:
+        return (self.operand,)
+
+    def to_data(self) -> Any:
+        return {'not': self.operand.to_data()}
+
+    def __str__(self) -> str:
+        if self.operand.precedence < self.precedence:
+            return f'not ({self.operand})'
+        return f'not {self.operand}'
+
+
+def _optional_data(data: Dict[str, Any], optional: bool) -> Dict[str, Any]:
+    if optional:
+        data['optional'] = True
+    return data
+
+
+def encode_const(value: Any) -> Any:
+    """
+    JSON-compatible form of a constant, read back by `decode_const`.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, BaseQ):
+        return {'quantity': [encode_const(value.m), str(value.units)]}
+    if isinstance(value, Enum) and type(value).__name__ in _enums():
+        return {'enum': format_const(value)}
+    if isinstance(value, tuple):
+        return {'tuple': [encode_const(v) for v in value]}
+    if isinstance(value, list):
+        return [encode_const(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return {'set': sorted((encode_const(v) for v in value),
+                              key=json.dumps)}
+
+    raise TypeError(f'Constant {value!r} has no data form')
+
+
+def _enums() -> Dict[str, Any]:
+    # pylint: disable=import-outside-toplevel
+    from oniref.elements import State
+    return {'State': State}
+
+
+def decode_const(data: Any) -> Any:
+    if isinstance(data, list):
+        return [decode_const(v) for v in data]
+    if not isinstance(data, dict):
+        return data
+
+    if 'quantity' in data:
+        magnitude, unit = data['quantity']
+        return Q(decode_const(magnitude), parse_unit(unit))
+    if 'enum' in data:
+        enum, _, name = data['enum'].partition('.')
+        return _enums()[enum][name]
+    if 'tuple' in data:
+        return tuple(decode_const(v) for v in data['tuple'])
+    if 'set' in data:
+        return frozenset(decode_const(v) for v in data['set'])
+
+    raise ValueError(f'Bad constant {data!r}')
+
+
+def _path(path: str) -> Node:
+    node: Node = ROOT
+    if not path:
+        return node
+
+    for step in path.split('.'):
+        optional = step.startswith('?')
+        node = _path_step(node, step[1:] if optional else step, optional)
+
+    return node
+
+
+def _decode(data: Any) -> Node:
+    if isinstance(data, str):
+        return _path(data)
+    if not isinstance(data, dict):
+        raise ValueError(f'Bad expression {data!r}')
+
+    optional = bool(data.get('optional', False))
+    for junction in (And, Or):
+        if junction.word in data:
+            operands = tuple(_decode(o) for o in data[junction.word])
+            if len(operands) < 2:
+                raise ValueError(f'{junction.word!r} needs two operands')
+            return junction(operands)
+    if 'not' in data:
+        return Not(_decode(data['not']))
+    if 'op' in data:
+        if data['op'] not in Compare.operators:
+            raise ValueError(f'Bad comparison {data["op"]!r}')
+        return Compare(data['op'], _decode(data['attr']),
+                       decode_const(data['value']))
+    if 'getattr' in data:
+        return _path_step(_decode(data['of']), data['getattr'], optional)
+    if 'to' in data:
+        return Convert(_decode(data['of']), str(data['to']), optional)
+    if 'call' in data:
+        return Call(_decode(data['of']),
+                    tuple(decode_const(arg) for arg in data['call']),
+                    {str(key): decode_const(value)
+                     for key, value in data.get('kwargs', {}).items()},
+                    optional)
+
+    raise ValueError(f'Bad expression {data!r}')
+
+
+def _path_step(parent: Node, name: Any, optional: bool) -> Node:
+    if (not isinstance(name, str) or not name.isidentifier()
+            or name.startswith('_')):
+        raise ValueError(f'Bad attribute {name!r}')
+    return GetAttr(parent, name, optional)
+
+
+def from_data(data: Any) -> Node:
+    """
+    Rebuild a node from its `to_data` form. Raises ValueError if 'data'
+    isn't a valid expression. Attribute names starting with an
+    underscore are rejected, so data from untrusted sources can only
+    reach public attributes.
+    """
+    try:
+        return _decode(data)
+    except ValueError:
+        raise
+    except Exception as e:  # pylint: disable=broad-except
+        raise ValueError(f'Bad expression {data!r}: {e}') from e
+
+
+def to_json(node: Node) -> str:
+    """
+    Canonical JSON text of 'node'.
+    """
+    return json.dumps(node.to_data(), sort_keys=True, separators=(',', ':'),
+                      ensure_ascii=False)
+
+
+def from_json(text: str) -> Node:
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'Bad expression JSON: {e}') from e
+    return from_data(data)
+
+
+# Entry of a memo cell before anything has been stored in it.
+_EMPTY: Tuple[Any, Any] = (object(), None)
+
+
+def _count(node: Node, counts: Dict[Node, int]):
+    counts[node] = counts.get(node, 0) + 1
+    if counts[node] == 1:
+        for child in node.children:
+            _count(child, counts)
+
+
+def compile_shared(node: Node) -> Evaluator:
+    """
+    Return an evaluator for 'node' which computes each subexpression
+    appearing more than once in the tree at most once per element, as
+    with the four uses of `low_temp()` in `stable_over`.
+
+    Only subexpressions costlier than a plain attribute lookup are
+    shared. `Opaque` leaves never are, since they may not be pure.
+    """
+    counts: Dict[Node, int] = {}
+    _count(node, counts)
+    shared = {n for n, count in counts.items()
+              if count > 1 and n.total_cost() > 1.0
+              and not isinstance(n, Opaque)}
+    if not shared:
+        return node.fn
+
+    cells: List[List[Tuple[Any, Any]]] = []
+    built: Dict[Node, Evaluator] = {}
+
+    def build(n: Node) -> Evaluator:
+        evaluator = built.get(n)
+        if evaluator is not None:
+            return evaluator
+
+        evaluator = n._build(tuple(build(c) for c in n.children))
+        if n in shared:
+            evaluator = _memoize(evaluator, cells)
+
+        built[n] = evaluator
+        return evaluator
+
+    inner = build(node)
+
+    def evaluate(e):
+        for cell in cells:
+            cell[0] = _EMPTY
+        return inner(e)
+
+    return evaluate
+
+
+def _memoize(fn: Evaluator,
+             cells: List[List[Tuple[Any, Any]]]) -> Evaluator:
+    """
+    Wrap 'fn' to remember its value for the element it was last called
+    with, until the cell is reset at the start of the next evaluation.
+    """
+    cell = [_EMPTY]
+    cells.append(cell)
+
+    def evaluate(e):
+        entry = cell[0]
+        if entry[0] is e:
+            return entry[1]
+
+        value = fn(e)
+        cell[0] = (e, value)
+        return value
+
+    return evaluate
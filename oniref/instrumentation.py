@@ -0,0 +1,146 @@
+"""
+Optional timing and counter hooks for loading and querying elements.
+
+Nothing is recorded unless at least one listener is registered, so the
+instrumented code paths only pay for a global lookup when disabled:
+
+    with instrument(print):
+        load_klei_definitions(path)
+
+Listeners receive an `Event` for every completed span. `Recorder` is a
+ready-made listener which aggregates events by name.
+"""
+from __future__ import annotations
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Tuple
+
+
+@dataclass(frozen=True)
+class Event:
+    name: str
+    elapsed: float
+    data: Dict[str, Any] = field(default_factory=dict)
+
+
+Listener = Callable[[Event], None]
+
+_listeners: Tuple[Listener, ...] = ()
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(_listeners)
+
+
+def emit(name: str, elapsed: float = 0.0, **data: Any):
+    if not _listeners:
+        return
+
+    event = Event(name, elapsed, data)
+    for listener in _listeners:
+        listener(event)
+
+
+class _Span:
+    __slots__ = ('name', 'data', '_start')
+
+    def __init__(self, name: str, data: Dict[str, Any]):
+        self.name = name
+        self.data = data
+        self._start = 0.0
+
+    def set(self, **data: Any):
+        self.data.update(data)
+
+    def __enter__(self) -> _Span:
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        emit(self.name, time.perf_counter() - self._start, **self.data)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **data: Any):
+        pass
+
+    def __enter__(self) -> _NullSpan:
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_null_span = _NullSpan()
+
+
+def span(name: str, **data: Any):
+    """
+    Time the enclosed block and report it as an event called 'name'.
+    Additional event data can be attached with `set()` on the value
+    bound by the with statement.
+    """
+    if not _listeners:
+        return _null_span
+
+    return _Span(name, data)
+
+
+def add_listener(listener: Listener):
+    global _listeners  # pylint: disable=global-statement
+    with _lock:
+        _listeners = _listeners + (listener,)
+
+
+def remove_listener(listener: Listener):
+    global _listeners  # pylint: disable=global-statement
+    with _lock:
+        remaining = list(_listeners)
+        remaining.remove(listener)
+        _listeners = tuple(remaining)
+
+
+@contextmanager
+def instrument(listener: Listener) -> Iterator[Listener]:
+    add_listener(listener)
+    try:
+        yield listener
+    finally:
+        remove_listener(listener)
+
+
+@dataclass
+class Totals:
+    calls: int = 0
+    elapsed: float = 0.0
+    counters: Dict[str, int] = field(default_factory=dict)
+
+
+class Recorder:
+    """
+    Listener which accumulates call counts, total time and any integer
+    event data for each event name.
+    """
+    def __init__(self):
+        self.totals: Dict[str, Totals] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event):
+        with self._lock:
+            totals = self.totals.setdefault(event.name, Totals())
+            totals.calls += 1
+            totals.elapsed += event.elapsed
+            for key, value in event.data.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    totals.counters[key] = totals.counters.get(key, 0) + value
+
+    def __getitem__(self, name: str) -> Totals:
+        return self.totals[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.totals
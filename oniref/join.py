@@ -0,0 +1,219 @@
+"""
+Pairwise queries over two selections of elements.
+
+`join` returns the pairs of a left and a right element which satisfy a
+set of conditions, each comparing an attribute of the left element with
+an attribute of the right one:
+
+    pairs = join(coolants, fluids,
+                 *covers(),
+                 on(Element.thermal_conductivity, '>',
+                    Element.thermal_conductivity))
+
+Rather than testing every pair, the right elements are sorted on the
+attribute with the tightest bounds, each left element's bounds on it
+are found by binary search, and only the pairs within those bounds are
+checked against the remaining conditions.
+"""
+from __future__ import annotations
+from typing import (Any,
+                    Dict,
+                    Hashable,
+                    List,
+                    Literal,
+                    Optional,
+                    Sequence,
+                    Tuple)
+
+import numpy as np
+from pint import Quantity as BaseQ
+
+from oniref import expressions as ex
+from oniref.elements import Element
+from oniref.predicates import Attribute, high_temp, low_temp
+from oniref.units import convert
+from oniref.vectorized import attribute_values
+
+# Bounds a condition places on the right value, by operator: whether it
+# is a lower bound and whether it is strict.
+_BOUNDS = {
+    '<': ((True, True),),
+    '<=': ((True, False),),
+    '>': ((False, True),),
+    '>=': ((False, False),),
+    '==': ((True, False), (False, False)),
+}
+
+
+class Condition:
+    """
+    'left' 'op' 'right', with the value of 'left' taken from the left
+    element and 'right' from the right one. Where an attribute is None
+    the corresponding 'missing' value is used instead; if that is None
+    too, the condition fails.
+    """
+    def __init__(self,
+                 left: Attribute,
+                 op: str,
+                 right: Attribute,
+                 left_missing: Any = None,
+                 right_missing: Any = None):
+        if op not in _BOUNDS:
+            raise ValueError(f'Unsupported operator {op!r}')
+
+        self.left = left._node
+        self.op = op
+        self.right = right._node
+        self.left_missing = left_missing
+        self.right_missing = right_missing
+
+    def __str__(self) -> str:
+        return f'left.{self.left} {self.op} right.{self.right}'
+
+    def __repr__(self) -> str:
+        return f'Condition({self})'
+
+
+def on(left: Attribute,
+       op: str,
+       right: Attribute,
+       *,
+       left_missing: Any = None,
+       right_missing: Any = None) -> Condition:
+    return Condition(left, op, right, left_missing, right_missing)
+
+
+def covers(low: Optional[Attribute] = None,
+           high: Optional[Attribute] = None) -> Tuple[Condition, ...]:
+    """
+    Conditions that the range from 'low' to 'high' of the left element
+    contains that of the right one. Both default to the transition
+    temperatures, so the left element's state is stable across the
+    right's, and a missing bound is unbounded.
+    """
+    low = low if low is not None else low_temp()
+    high = high if high is not None else high_temp()
+    return (
+        on(low, '<=', low, left_missing=-np.inf, right_missing=-np.inf),
+        on(high, '>=', high, left_missing=np.inf, right_missing=np.inf),
+        # Implied by the other two, but it bounds the right element's low
+        # from above, which narrows the search.
+        on(high, '>=', low, left_missing=np.inf, right_missing=-np.inf),
+    )
+
+
+def _fill(array: np.ndarray, missing: Any, unit: Any) -> np.ndarray:
+    if missing is None:
+        return array
+    if isinstance(missing, BaseQ):
+        missing = convert(missing.m, missing.units, unit)
+
+    return np.where(np.isnan(array), missing, array)
+
+
+def _condition_values(cond: Condition,
+                      left: Sequence[Element],
+                      right: Sequence[Element],
+                      cache: Dict[Hashable, Tuple[np.ndarray, Any]]) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    def get(side, node, unit):
+        key = (id(side), node, unit)
+        if key not in cache:
+            cache[key] = attribute_values(side, node, unit)
+        return cache[key]
+
+    lvalues, unit = get(left, cond.left, None)
+    rvalues, _ = get(right, cond.right, unit)
+    return (_fill(lvalues, cond.left_missing, unit),
+            _fill(rvalues, cond.right_missing, unit))
+
+
+def _expand(starts: np.ndarray, stops: np.ndarray) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pairs (i, j) for every i and every j in range(starts[i], stops[i]).
+    """
+    counts = np.maximum(stops - starts, 0)
+    lefts = np.repeat(np.arange(len(starts)), counts)
+    offsets = np.cumsum(counts) - counts
+    rights = (np.arange(counts.sum())
+              - np.repeat(offsets, counts) + np.repeat(starts, counts))
+    return lefts, rights
+
+
+def join_positions(left: Sequence[Element],
+                   right: Sequence[Element],
+                   *conditions: Condition) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Like `join`, but return the positions of the paired elements in
+    'left' and in 'right' as two arrays.
+    """
+    if not conditions:
+        raise ValueError('join needs at least one condition')
+
+    cache: Dict[Hashable, Tuple[np.ndarray, Any]] = {}
+    evaluated = [(cond, *_condition_values(cond, left, right, cache))
+                 for cond in conditions]
+
+    # Drive the search with the right attribute bounded by the most
+    # conditions, preferring one bounded from both sides.
+    by_right: Dict[Hashable, List[Any]] = {}
+    for entry in evaluated:
+        cond = entry[0]
+        by_right.setdefault((cond.right, cond.right_missing), []).append(entry)
+
+    def rank(entries):
+        sides = {lower for cond, _, _ in entries
+                 for lower, _ in _BOUNDS[cond.op]}
+        return (len(sides), len(entries))
+
+    driving = max(by_right.values(), key=rank)
+    rvalues = driving[0][2]
+    order = np.argsort(rvalues, kind='stable')
+    # NaN sorts last and never satisfies a bound.
+    ordered = rvalues[order]
+    present = int(np.count_nonzero(~np.isnan(ordered)))
+    ordered = ordered[:present]
+
+    starts = np.zeros(len(left), dtype=np.intp)
+    stops = np.full(len(left), present, dtype=np.intp)
+    side: Literal['left', 'right']
+    for cond, lvalues, _ in driving:
+        for lower, strict in _BOUNDS[cond.op]:
+            # Searching for NaN finds the end, so NaN bounds are empty.
+            if lower:
+                side = 'right' if strict else 'left'
+                starts = np.maximum(starts,
+                                    np.searchsorted(ordered, lvalues, side))
+            else:
+                side = 'left' if strict else 'right'
+                stops = np.minimum(stops,
+                                   np.searchsorted(ordered, lvalues, side))
+                stops[np.isnan(lvalues)] = 0
+
+    lefts, sorted_rights = _expand(starts, stops)
+    rights = order[sorted_rights]
+
+    keep = np.ones(len(lefts), dtype=bool)
+    for cond, lvalues, rvalues in evaluated:
+        if any(cond is entry[0] for entry in driving):
+            continue
+        keep &= ex.Compare.operators[cond.op](lvalues[lefts], rvalues[rights])
+
+    lefts, rights = lefts[keep], rights[keep]
+    result = np.lexsort((rights, lefts))
+    return lefts[result], rights[result]
+
+
+def join(left: Sequence[Element],
+         right: Sequence[Element],
+         *conditions: Condition) -> List[Tuple[Element, Element]]:
+    """
+    Return every pair of an element from 'left' and one from 'right'
+    satisfying all of 'conditions', ordered by position in 'left' and
+    then in 'right'. Either side may be an `Elements` or any sequence of
+    elements, such as the result of `Elements.find`.
+    """
+    lefts, rights = join_positions(left, right, *conditions)
+    return [(left[i], right[j])
+            for i, j in zip(lefts.tolist(), rights.tolist())]
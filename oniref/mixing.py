@@ -0,0 +1,306 @@
+"""
+Thermal equilibrium of mixtures of elements.
+
+`equilibrium` takes any number of mixtures, each a few components of an
+element, a mass and a temperature, and finds the temperature every
+mixture settles at once its components have exchanged heat, along with
+the elements they have turned into:
+
+    result = equilibrium(elements,
+                         [['Water', 'Ice'], ['Water', 'Steam']],
+                         Q(np.array([[10.0, 1.0], [5.0, 2.0]]), 'kg'),
+                         Q(np.array([[20.0, -30.0], [40.0, 150.0]]), '°C'))
+    result.temperatures
+    result.products(0)
+
+`mix` does the same for a list of mixtures given as tuples.
+
+As in the game, elements change state without latent heat, keeping
+their temperature. A component heated past its high transition, or
+cooled past its low one, carries on as the transition's target with the
+heat capacity of that element, while the transition's `ore_ratio` of
+its mass becomes the `ore` element and carries on in the same way. So
+the heat a component takes up is a piecewise linear function of the
+final temperature, and the equilibrium is where the heat exchanged sums
+to zero, found by bisection for every mixture at once.
+"""
+from __future__ import annotations
+from typing import (Any,
+                    Dict,
+                    Iterable,
+                    List,
+                    NamedTuple,
+                    Sequence,
+                    Tuple,
+                    Union)
+
+import numpy as np
+
+from oniref.columns import ElementColumns
+from oniref.elements import Element, Elements
+from oniref.units import Q, magnitudes, parse_unit
+
+# Bisection stops once every mixture's temperature is known to this
+# many °C, or after MAX_ITERATIONS halvings.
+TOLERANCE = 1e-9
+MAX_ITERATIONS = 100
+
+_UP, _DOWN = 0, 1
+
+
+class _Branches(NamedTuple):
+    """
+    The elements an element turns into when heated (index _UP) or
+    cooled (_DOWN), as arrays of shape (2, elements, branches). Each
+    branch is an element, the fraction of the original mass it holds,
+    and the temperatures between which the mass is that element.
+    """
+    element: np.ndarray
+    weight: np.ndarray
+    low: np.ndarray
+    high: np.ndarray
+
+
+def _walk(columns: ElementColumns, root: int, direction: int) \
+        -> List[Tuple[int, float, float, float]]:
+    prefix = 'high_transition' if direction == _UP else 'low_transition'
+    temperature = columns[f'{prefix}.temperature']
+    target = columns[f'{prefix}.target']
+    ore = columns[f'{prefix}.ore']
+    ore_ratio = columns[f'{prefix}.ore_ratio']
+    pick, unbounded = (max, np.inf) if direction == _UP else (min, -np.inf)
+
+    result = []
+    stack = [(root, 1.0, -unbounded, 0)]
+    while stack:
+        element, weight, start, depth = stack.pop()
+        if target[element] < 0 or depth >= len(columns):
+            # The end of the chain, or a cycle in inconsistent data.
+            result.append((element, weight, start, unbounded))
+            continue
+
+        end = pick(float(temperature[element]), start)
+        result.append((element, weight, start, end))
+        ratio = float(ore_ratio[element])
+        if ore[element] >= 0 and ratio > 0:
+            stack.append((int(ore[element]), weight * ratio, end, depth + 1))
+            weight *= 1.0 - ratio
+        stack.append((int(target[element]), weight, end, depth + 1))
+
+    return result
+
+
+def _branches(columns: ElementColumns) -> _Branches:
+    walks = [[_walk(columns, i, direction) for i in range(len(columns))]
+             for direction in (_UP, _DOWN)]
+    width = max(len(walk) for by_element in walks for walk in by_element)
+    shape = (2, len(columns), width)
+
+    element = np.zeros(shape, dtype=np.intp)
+    weight = np.zeros(shape)
+    low = np.zeros(shape)
+    high = np.zeros(shape)
+    for direction, by_element in enumerate(walks):
+        for i, walk in enumerate(by_element):
+            for j, (elem, w, start, end) in enumerate(walk):
+                element[direction, i, j] = elem
+                weight[direction, i, j] = w
+                low[direction, i, j] = min(start, end)
+                high[direction, i, j] = max(start, end)
+
+    return _Branches(element, weight, low, high)
+
+
+def _active(low: np.ndarray, high: np.ndarray, direction: np.ndarray,
+            temperature: np.ndarray) -> np.ndarray:
+    """
+    Whether each branch, between 'low' and 'high', holds mass at
+    'temperature'. At exactly a transition temperature an element keeps
+    its own state, so branches reached by heating cover (low, high] and
+    those reached by cooling [low, high).
+    """
+    return np.where(direction == _UP,
+                    (low < temperature) & (temperature <= high),
+                    (low <= temperature) & (temperature < high))
+
+
+class Equilibrium:
+    """
+    Equilibria of a batch of mixtures: the final `temperatures`, and the
+    final mass of each element in each mixture as the (mixtures x
+    elements) array `masses`, in kg, with elements in the order of the
+    set. Mixtures without any mass have a NaN temperature.
+    """
+    def __init__(self,
+                 columns: ElementColumns,
+                 temperature: np.ndarray,
+                 masses: np.ndarray):
+        self._columns = columns
+        self.temperature = temperature
+        self.masses = masses
+
+    def __len__(self) -> int:
+        return len(self.temperature)
+
+    @property
+    def temperatures(self) -> Any:
+        return Q(self.temperature.copy(), parse_unit('°C'))
+
+    def products(self, mixture: int) -> Dict[str, Any]:
+        """
+        The mass of each element in 'mixture' at equilibrium, by name.
+        """
+        row = self.masses[mixture]
+        kg = parse_unit('kg')
+        return {self._columns.names[int(i)]: Q(float(row[i]), kg)
+                for i in np.flatnonzero(row)}
+
+
+def equilibrium(elements: Union[Elements, Sequence[Element]],
+                components: Any,
+                masses: Any,
+                temperatures: Any) -> Equilibrium:
+    """
+    Solve the mixtures given as a row each of 'components', element
+    names or positions in 'elements', with the matching 'masses' and
+    'temperatures'. These are quantities, or plain numbers in kg and °C,
+    broadcast to the shape of 'components'. Rows can be padded with
+    components of zero mass.
+    """
+    columns = ElementColumns.of(elements)
+    cells = np.atleast_2d(columns.positions(components))
+    if cells.ndim != 2:
+        raise ValueError('components must be a 2D array')
+
+    return _equilibrium(columns, cells,
+                        np.broadcast_to(magnitudes(masses, 'kg'),
+                                        cells.shape),
+                        np.broadcast_to(magnitudes(temperatures, '°C'),
+                                        cells.shape))
+
+
+def mix(elements: Union[Elements, Sequence[Element]],
+        mixtures: Iterable[Sequence[Tuple[Any, Any, Any]]]) -> Equilibrium:
+    """
+    `equilibrium` for mixtures given as sequences of (element, mass,
+    temperature) tuples, with elements as names or `Element`s. The
+    mixtures can differ in length.
+    """
+    columns = ElementColumns.of(elements)
+    rows = [list(mixture) for mixture in mixtures]
+    width = max((len(row) for row in rows), default=0)
+    cells = np.zeros((len(rows), width), dtype=np.intp)
+    masses = np.zeros((len(rows), width))
+    temperatures = np.zeros((len(rows), width))
+    for i, row in enumerate(rows):
+        for j, (element, mass, temperature) in enumerate(row):
+            name = element.name if isinstance(element, Element) else element
+            cells[i, j] = columns.index[name]
+            masses[i, j] = magnitudes(mass, 'kg')
+            temperatures[i, j] = magnitudes(temperature, '°C')
+
+    return _equilibrium(columns, cells, masses, temperatures)
+
+
+def _equilibrium(columns: ElementColumns,
+                 cells: np.ndarray,
+                 mass: np.ndarray,
+                 start: np.ndarray) -> Equilibrium:
+    branches = _branches(columns)
+    width = branches.weight.shape[2]
+
+    # A component given beyond one of its transition temperatures has
+    # already turned into the branches present at that temperature.
+    cooled = ((start < columns['low_transition.temperature'][cells])
+              & (columns['low_transition.target'][cells] >= 0))
+    direction = np.where(cooled, _DOWN, _UP)[..., None]
+    index = (direction, cells[..., None], np.arange(width))
+    present = _active(branches.low[index], branches.high[index],
+                      direction, start[..., None])
+
+    count = cells.shape[0]
+    resolved = np.where(present, branches.element[index], 0)
+    resolved = resolved.reshape(count, -1)
+    mass = (mass[..., None] * branches.weight[index] * present)
+    mass = mass.reshape(count, -1)
+    start = np.repeat(start, width, axis=1)
+
+    temperature = _solve(columns, branches, resolved, mass, start)
+    products = _products(columns, branches, resolved, mass, start,
+                         temperature)
+    return Equilibrium(columns, temperature, products)
+
+
+def _solve(columns: ElementColumns,
+           branches: _Branches,
+           cells: np.ndarray,
+           mass: np.ndarray,
+           start: np.ndarray) -> np.ndarray:
+    """
+    Equilibrium temperature of each row of components.
+    """
+    # Heat capacity of each branch in DTU/°C per kg of the component.
+    shc = columns['specific_heat_capacity']
+    capacity = branches.weight * shc[branches.element] * 1000.0
+
+    def gather(direction):
+        return (capacity[direction][cells], branches.low[direction][cells],
+                branches.high[direction][cells])
+
+    up, down = gather(_UP), gather(_DOWN)
+
+    def enthalpy(table, temperature):
+        # Heat relative to an arbitrary reference, per kg.
+        cap, low, high = table
+        return (cap * np.clip(temperature[..., None], low, high)).sum(-1)
+
+    up_start, down_start = enthalpy(up, start), enthalpy(down, start)
+
+    def heat(temperature):
+        at = np.broadcast_to(temperature[:, None], start.shape)
+        gained = np.where(at >= start,
+                          enthalpy(up, at) - up_start,
+                          enthalpy(down, at) - down_start)
+        return (mass * gained).sum(-1)
+
+    has_mass = mass > 0
+    empty = ~has_mass.any(-1)
+    lo = np.where(has_mass, start, np.inf).min(-1, initial=np.inf)
+    hi = np.where(has_mass, start, -np.inf).max(-1, initial=-np.inf)
+    lo[empty] = hi[empty] = 0.0
+
+    for _ in range(MAX_ITERATIONS):
+        if (hi - lo <= TOLERANCE).all():
+            break
+        mid = (lo + hi) / 2
+        hot = heat(mid) > 0
+        hi = np.where(hot, mid, hi)
+        lo = np.where(hot, lo, mid)
+
+    result = (lo + hi) / 2
+    result[empty] = np.nan
+    return result
+
+
+def _products(columns: ElementColumns,
+              branches: _Branches,
+              cells: np.ndarray,
+              mass: np.ndarray,
+              start: np.ndarray,
+              temperature: np.ndarray) -> np.ndarray:
+    """
+    The mass of each element in each row at 'temperature', in kg.
+    """
+    count, size = cells.shape[0], len(columns)
+    at = temperature[:, None, None]
+    direction = np.where(at[..., 0] >= start, _UP, _DOWN)[..., None]
+    index = (direction, cells[..., None],
+             np.arange(branches.weight.shape[2]))
+    active = _active(branches.low[index], branches.high[index],
+                     direction, at)
+
+    amounts = mass[..., None] * branches.weight[index] * active
+    rows = np.broadcast_to(np.arange(count)[:, None, None], amounts.shape)
+    flat = rows * size + branches.element[index]
+    return np.bincount(flat.ravel(), weights=amounts.ravel(),
+                       minlength=count * size).reshape(count, size)
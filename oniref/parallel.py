@@ -0,0 +1,266 @@
+"""
+Parallel evaluation of slow predicates for `Elements.find`.
+
+Predicates that run simulations or external lookups per element can
+take milliseconds each. Passing an executor spreads them over its
+workers in chunks:
+
+    with ProcessPoolExecutor() as pool:
+        matches = elements.find(slow_predicate, executor=pool)
+
+Matches are returned in element order. The first few elements are
+evaluated in the calling process to time the predicate, which sets the
+chunk size, and a predicate which turns out to be cheap is finished
+there without using the executor at all.
+
+Thread pools evaluate the elements themselves. For process pools the
+packed columns of the set are published once per call in shared memory
+(see `oniref.shared`), and each chunk only carries the name of the
+block, so predicates for them must be picklable, as predicate
+expressions and module-level functions are. Workers see read-only
+copies of the elements, in canonical units, without the derived
+attributes of the set: predicate expressions reading them are evaluated
+in the calling process instead, and other predicates reading them raise.
+
+An exception raised by the predicate is re-raised as a `PredicateError`
+naming the element it was raised for.
+"""
+from __future__ import annotations
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+import itertools
+import os
+import time
+from typing import (Any,
+                    Callable,
+                    Dict,
+                    List,
+                    NamedTuple,
+                    Optional,
+                    Sequence,
+                    Tuple)
+
+from oniref import expressions as ex
+from oniref.elements import Element, Elements
+
+# Number of elements timed before choosing a chunk size.
+PROBE_SIZE = 8
+# Time each chunk should take, long enough to amortize dispatching it.
+TARGET_CHUNK_SECONDS = 0.02
+# Below this much estimated remaining work, stay in the calling process.
+MIN_PARALLEL_SECONDS = 0.005
+# Chunks per worker when the chunks would otherwise be larger, so that
+# workers finishing early can pick up more.
+CHUNKS_PER_WORKER = 4
+
+
+class PredicateError(Exception):
+    """
+    The predicate raised 'inner' when evaluated on 'element'.
+    """
+    def __init__(self, element: Element, inner: BaseException):
+        super().__init__(
+            f'Predicate raised for {element!r}: {inner!r}'
+        )
+        self.element = element
+        self.inner = inner
+
+
+class _ChunkError(Exception):
+    """
+    Raised from workers with the position of the element that failed.
+    """
+    def __init__(self, position: int, inner: BaseException):
+        super().__init__(position, inner)
+        self.position = position
+        self.inner = inner
+
+
+def _match(elements: Sequence[Element],
+           match: Callable[[Element], Any],
+           start: int,
+           stop: int) -> List[int]:
+    result = []
+    for i in range(start, stop):
+        try:
+            if match(elements[i]):
+                result.append(i)
+        except Exception as e:  # pylint: disable=broad-except
+            raise _ChunkError(i, e) from e
+
+    return result
+
+
+class _NotInWorker:
+    """
+    Stands in for the derived attributes of the set on the elements of
+    process workers, which only have its packed columns.
+    """
+    @staticmethod
+    def value(name: str, elem: Element) -> Any:
+        raise AttributeError(
+            f'Derived attribute {name!r} of {elem!r} is only available in '
+            'the process it was registered in'
+        )
+
+
+_NOT_IN_WORKER = _NotInWorker()
+
+
+def _reads_derived(node: Any, names: Sequence[str]) -> bool:
+    if not isinstance(node, ex.Node):
+        return False
+    if (isinstance(node, ex.GetAttr) and isinstance(node.parent, ex.Root)
+            and node.name in names):
+        return True
+    return any(_reads_derived(child, names) for child in node.children)
+
+
+class _Published(NamedTuple):
+    """
+    The elements of a call published as the shared block 'name', with
+    the names of their derived attributes. 'token' is unique per call.
+    """
+    token: Tuple[int, int]
+    name: str
+    derived: Tuple[str, ...]
+
+
+# The elements most recently unpacked in this worker process, by token.
+_unpacked: Dict[Tuple[int, int], Elements] = {}
+_tokens = itertools.count()
+
+
+def _match_shared(published: _Published,
+                  needle: Any,
+                  start: int,
+                  stop: int) -> List[int]:
+    elements = _unpacked.get(published.token)
+    if elements is None:
+        # pylint: disable=import-outside-toplevel
+        from oniref.shared import attach
+        elements = attach(published.name)
+        _unpacked.clear()
+        _unpacked[published.token] = elements
+
+    # pylint: disable=import-outside-toplevel
+    from oniref.planner import plan
+    defs = elements._defs  # pylint: disable=protected-access
+    for i in range(start, stop):
+        for attribute in published.derived:
+            # pylint: disable=protected-access
+            defs[i]._attach(attribute, _NOT_IN_WORKER)
+
+    return _match(defs, plan(needle, elements), start, stop)
+
+
+def _workers(executor: Executor) -> int:
+    return max(1, getattr(executor, '_max_workers', None)
+               or os.cpu_count() or 1)
+
+
+def chunk_size(remaining: int, seconds_per_element: float,
+               workers: int) -> int:
+    """
+    Elements per chunk, so each chunk takes about TARGET_CHUNK_SECONDS
+    but there are still CHUNKS_PER_WORKER chunks for each worker.
+    """
+    by_time = int(TARGET_CHUNK_SECONDS / max(seconds_per_element, 1e-9))
+    by_workers = -(-remaining // (workers * CHUNKS_PER_WORKER))
+    return max(1, min(by_time, by_workers))
+
+
+def find_positions(elements: Elements,
+                   needle: Callable[[Element], Any],
+                   executor: Executor,
+                   size: Optional[int] = None) -> List[int]:
+    """
+    Positions of the elements matching the predicate 'needle', in order,
+    evaluated in chunks of 'size' elements on 'executor'. The chunk size
+    is chosen from the time taken by the first elements if not given.
+    """
+    # pylint: disable=import-outside-toplevel
+    from oniref.planner import plan
+    defs = elements._defs  # pylint: disable=protected-access
+    count = len(defs)
+    match = plan(needle, elements)
+
+    if (isinstance(executor, ProcessPoolExecutor)
+            and _reads_derived(getattr(needle, '_node', None),
+                               list(elements.derived))):
+        return _run_serial(defs, match, [(0, count)])
+
+    probe = min(PROBE_SIZE, count) if size is None else 0
+    start_time = time.perf_counter()
+    try:
+        positions = _match(defs, match, 0, probe)
+    except _ChunkError as e:
+        raise PredicateError(defs[e.position], e.inner) from e.inner
+
+    remaining = count - probe
+    serial = False
+    if size is None:
+        per_element = (time.perf_counter() - start_time) / max(probe, 1)
+        serial = per_element * remaining < MIN_PARALLEL_SECONDS
+        size = (max(remaining, 1) if serial
+                else chunk_size(remaining, per_element, _workers(executor)))
+
+    bounds = [(start, min(start + size, count))
+              for start in range(probe, count, size)]
+    chunks = ([_run_serial(defs, match, bounds)] if serial
+              else _run(elements, needle, match, executor, bounds))
+
+    for chunk in chunks:
+        positions.extend(chunk)
+
+    return positions
+
+
+def _run_serial(defs: Sequence[Element],
+                match: Callable[[Element], Any],
+                bounds: List[Tuple[int, int]]) -> List[int]:
+    result: List[int] = []
+    for start, stop in bounds:
+        try:
+            result.extend(_match(defs, match, start, stop))
+        except _ChunkError as e:
+            raise PredicateError(defs[e.position], e.inner) from e.inner
+
+    return result
+
+
+def _run(elements: Elements,
+         needle: Any,
+         match: Callable[[Element], Any],
+         executor: Executor,
+         bounds: List[Tuple[int, int]]) -> List[List[int]]:
+    defs = elements._defs  # pylint: disable=protected-access
+    if not isinstance(executor, ProcessPoolExecutor):
+        return _collect(defs, [executor.submit(_match, defs, match, start,
+                                               stop)
+                               for start, stop in bounds])
+
+    # Workers attach to the columns published once for the call, and
+    # are only sent the name of the block with each chunk.
+    # pylint: disable=import-outside-toplevel
+    from oniref.shared import publish
+    with publish(elements) as table:
+        published = _Published((os.getpid(), next(_tokens)), table.name,
+                               tuple(elements.derived))
+        return _collect(defs, [executor.submit(_match_shared, published,
+                                               needle, start, stop)
+                               for start, stop in bounds])
+
+
+def _collect(defs: Sequence[Element],
+             futures: List[Future]) -> List[List[int]]:
+    results = []
+    try:
+        for future in futures:
+            results.append(future.result())
+    except _ChunkError as e:
+        raise PredicateError(defs[e.position], e.inner) from e.inner
+    finally:
+        for future in futures:
+            future.cancel()
+
+    return results
@@ -0,0 +1,108 @@
+"""
+Phase maps of elements over a grid of temperatures.
+
+`phase_map` returns an (elements x temperatures) matrix computed from
+the transition temperature columns in one vectorized pass, instead of
+evaluating `stable_at` once per element and temperature:
+
+    grid = Q(np.linspace(-100, 500, 6001), '°C')
+    stable = phase_map(elements, grid)
+    states = phase_map(elements, grid, states=True)
+
+Large grids are processed in chunks of temperatures sized to keep the
+intermediate arrays under `CHUNK_BYTES`; `iter_phase_map` yields those
+chunks without assembling the full matrix.
+"""
+from __future__ import annotations
+from typing import Any, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from oniref.columns import ElementColumns
+from oniref.elements import Element, Elements
+from oniref.units import convert
+
+CHUNK_BYTES = 64 * 1024 * 1024
+
+
+def _stable(columns: ElementColumns, temps: np.ndarray) -> np.ndarray:
+    low = columns['low_transition.temperature'][:, None]
+    high = columns['high_transition.temperature'][:, None]
+    return ((np.isnan(low) | (low < temps))
+            & (np.isnan(high) | (high > temps)))
+
+
+def _states(columns: ElementColumns, temps: np.ndarray) -> np.ndarray:
+    """
+    State codes reached from each element by following its transitions
+    until reaching an element which doesn't transition at that
+    temperature. At exactly a transition temperature an element keeps
+    its own state.
+    """
+    low = columns['low_transition.temperature']
+    high = columns['high_transition.temperature']
+    low_target = columns['low_transition.target']
+    high_target = columns['high_transition.target']
+
+    current = np.repeat(np.arange(len(columns))[:, None], len(temps), axis=1)
+    # Each step moves to a different element, so chains in consistent
+    # data end within that many steps; the limit guards against cycles.
+    for _ in range(len(columns)):
+        down = (temps < low[current]) & (low_target[current] >= 0)
+        up = ~down & (temps > high[current]) & (high_target[current] >= 0)
+        if not (down.any() or up.any()):
+            break
+
+        current = np.where(down, low_target[current],
+                           np.where(up, high_target[current], current))
+
+    return columns['state'][current]
+
+
+def _chunk_size(count: int, chunk_size: Optional[int]) -> int:
+    if chunk_size is not None:
+        return max(1, chunk_size)
+
+    # The state walk holds a handful of integer arrays per chunk.
+    return max(1, CHUNK_BYTES // (max(count, 1) * 8 * 4))
+
+
+def iter_phase_map(elements: Union[Elements, Sequence[Element]],
+                   temperatures: Any,
+                   states: bool = False,
+                   chunk_size: Optional[int] = None) \
+        -> Iterator[Tuple[slice, np.ndarray]]:
+    """
+    Yield the columns of `phase_map` in chunks, as the slice of
+    'temperatures' each chunk covers and the matrix for that slice.
+    """
+    columns = ElementColumns.of(elements)
+    temps = np.ravel(convert(np.asarray(temperatures.m, dtype=float),
+                             temperatures.units, '°C'))
+    compute = _states if states else _stable
+    size = _chunk_size(len(columns), chunk_size)
+    for start in range(0, len(temps), size):
+        chunk = slice(start, min(start + size, len(temps)))
+        yield chunk, compute(columns, temps[chunk])
+
+
+def phase_map(elements: Union[Elements, Sequence[Element]],
+              temperatures: Any,
+              states: bool = False,
+              chunk_size: Optional[int] = None) -> np.ndarray:
+    """
+    Return a matrix with a row for each of 'elements' and a column for
+    each of 'temperatures', a temperature quantity array.
+
+    By default each entry is whether the element is stable at that
+    temperature, as with `stable_at`. With 'states' set, it is instead
+    the `State` value of the element it turns into at that temperature.
+    """
+    count = len(elements)
+    temps = np.ravel(temperatures.m)
+    result = np.empty((count, len(temps)), dtype='u1' if states else bool)
+    for chunk, block in iter_phase_map(elements, temperatures, states,
+                                       chunk_size):
+        result[:, chunk] = block
+
+    return result
@@ -0,0 +1,421 @@
+"""
+Cost-based planning for predicate evaluation.
+
+`optimize` reorders the operands of every n-ary `And` and `Or` so that
+operands which are cheap and likely to decide the result run first. An
+operand's cost is the static estimate from `oniref.expressions` and its
+selectivity is measured on an evenly spaced sample of the elements being
+searched. Each leaf is evaluated once per sampled element, and those
+with opaque callables only on a few of them; the outcomes of nested
+junctions are combined from those of their operands.
+
+Reordering must not change which elements match, nor which raise, so
+only operands which can't raise are moved: comparisons of element and
+transition fields of known types, and of optional paths guarded by an
+earlier `.Is(None)`, as in `low_temp().Is(None) | (low_temp() < t)`.
+Any other operand, such as an opaque callable, stays where it is, and
+operands are only reordered among those between two such operands.
+"""
+from __future__ import annotations
+from typing import (Any,
+                    Callable,
+                    Dict,
+                    FrozenSet,
+                    Iterable,
+                    List,
+                    NamedTuple,
+                    Optional,
+                    Sequence,
+                    Tuple,
+                    Union,
+                    cast,
+                    get_args,
+                    get_type_hints)
+
+from pint import DimensionalityError
+from pint import Quantity as BaseQ
+
+from oniref import expressions as ex
+from oniref.elements import (CANONICAL_UNITS,
+                             TEMPERATURE_UNIT,
+                             Element,
+                             Transition)
+from oniref.units import convert
+
+SAMPLE_SIZE = 64
+# Number of sampled elements operands with opaque callables are
+# evaluated on.
+OPAQUE_SAMPLE_SIZE = 8
+MAX_CACHED_PLANS = 256
+
+_EPSILON = 1e-3
+
+
+def sample(elements: Sequence[Any], size: int = SAMPLE_SIZE) -> List[Any]:
+    count = len(elements)
+    if count <= size:
+        return list(elements)
+
+    return [elements[i * count // size] for i in range(size)]
+
+
+# Outcome of evaluating a node on a sampled element which raised.
+_RAISED = object()
+
+
+class _Planned(NamedTuple):
+    """
+    The optimized form of a node, its expected evaluation cost and its
+    outcome on each sampled element: True, False, `_RAISED`, or None
+    where it wasn't evaluated. 'outcomes' is None if not measured.
+    """
+    node: ex.Node
+    cost: float
+    outcomes: Optional[List[Any]]
+
+
+class _Ranked(NamedTuple):
+    node: ex.Node
+    cost: float
+    decisive: float
+
+
+# Declared types of the fields of elements and transitions, and the units
+# of those which are quantities.
+_FIELDS = {cls: get_type_hints(cls) for cls in (Element, Transition)}
+_FIELD_UNITS: Dict[Tuple[type, str], str] = {
+    **{(Element, name): unit for name, unit in CANONICAL_UNITS.items()},
+    (Transition, 'temperature'): TEMPERATURE_UNIT,
+}
+
+
+class _Path(NamedTuple):
+    """
+    The declared type of the value of an attribute path, its unit if it
+    is a quantity field, and whether it may be None.
+    """
+    kind: Any
+    unit: Optional[str]
+    nullable: bool
+
+
+def _path(node: ex.Node, present: FrozenSet[ex.Node]) -> Optional[_Path]:
+    """
+    Describe the value of 'node', if it is a path of fields from the
+    element which can't raise. Paths in 'present' are known not to be
+    None.
+    """
+    if isinstance(node, ex.Root):
+        return _Path(Element, None, False)
+    if not isinstance(node, ex.GetAttr):
+        return None
+
+    parent = _path(node.parent, present)
+    if parent is None or (parent.nullable and not node.optional):
+        return None
+    hint = _FIELDS.get(parent.kind, {}).get(node.name)
+    if hint is None:
+        return None
+
+    kinds = get_args(hint) if hint is not Any else ()
+    nullable = type(None) in kinds
+    if nullable:
+        rest = tuple(k for k in kinds if k is not type(None))
+        hint = rest[0] if len(rest) == 1 else Union[rest]
+    return _Path(hint, _FIELD_UNITS.get((parent.kind, node.name)),
+                 (nullable or parent.nullable) and node not in present)
+
+
+def _guards(junction: ex.Junction, operand: ex.Node) -> FrozenSet[ex.Node]:
+    """
+    Paths known not to be None when 'junction' goes on past 'operand':
+    those tested with `.Is(None)` in an `Or`, or `~.Is(None)` in an `And`.
+    """
+    if isinstance(junction, ex.And):
+        if not isinstance(operand, ex.Not):
+            return frozenset()
+        operand = operand.operand
+
+    if (isinstance(operand, ex.Compare) and operand.op == 'is'
+            and operand.value is None):
+        return frozenset((operand.operand,))
+    return frozenset()
+
+
+def _comparison_cannot_raise(node: ex.Compare, path: _Path) -> bool:
+    value = node.value
+    if node.op in ('is', 'in'):
+        return True
+    if isinstance(value, BaseQ) and path.unit is not None:
+        try:
+            convert(value.m, value.units, path.unit)
+        except DimensionalityError:
+            # Equality with a quantity of other dimensions is False.
+            return node.op == '=='
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return node.op == '==' or not path.nullable
+
+    return node.op == '==' or (not path.nullable and (
+        (path.kind is str and isinstance(value, str))
+        or (path.kind is float and isinstance(value, (int, float)))
+    ))
+
+
+def _cannot_raise(node: ex.Node, present: FrozenSet[ex.Node]) -> bool:
+    """
+    Whether evaluating 'node' is known not to raise, given that the paths
+    in 'present' are not None.
+    """
+    if isinstance(node, ex.Not):
+        return _cannot_raise(node.operand, present)
+    if isinstance(node, ex.Junction):
+        for operand in node.operands:
+            if not _cannot_raise(operand, present):
+                return False
+            present |= _guards(node, operand)
+        return True
+
+    path = (_path(node.operand, present) if isinstance(node, ex.Compare)
+            else None)
+    return path is not None and _comparison_cannot_raise(
+        cast(ex.Compare, node), path
+    )
+
+
+def _has_opaque(node: ex.Node) -> bool:
+    return (isinstance(node, ex.Opaque)
+            or any(_has_opaque(c) for c in node.children))
+
+
+def _measure(node: ex.Node, elements: Sequence[Any]) -> List[Any]:
+    """
+    Evaluate 'node' on 'elements'. Nodes with opaque callables, which
+    may be arbitrarily slow, are only evaluated on `OPAQUE_SAMPLE_SIZE`
+    of them.
+    """
+    count = len(elements)
+    positions: Iterable[int] = range(count)
+    if count > OPAQUE_SAMPLE_SIZE and _has_opaque(node):
+        positions = (i * count // OPAQUE_SAMPLE_SIZE
+                     for i in range(OPAQUE_SAMPLE_SIZE))
+
+    fn = node.fn
+    outcomes: List[Any] = [None] * count
+    for i in positions:
+        try:
+            outcomes[i] = bool(fn(elements[i]))
+        except Exception:  # pylint: disable=broad-except
+            outcomes[i] = _RAISED
+
+    return outcomes
+
+
+def _passed(outcomes: List[Any]) -> float:
+    """
+    Return the fraction of the known 'outcomes' which passed.
+    """
+    known = [o for o in outcomes if o is not None]
+    if not known:
+        return 0.5
+
+    return sum(o is True for o in known) / len(known)
+
+
+def _combine(is_and: bool, operands: List[List[Any]]) -> List[Any]:
+    """
+    Outcomes of an `And` or `Or` evaluated in order from the outcomes
+    of its operands.
+    """
+    result = []
+    for outcomes in zip(*operands):
+        combined: Any = is_and
+        for outcome in outcomes:
+            if outcome is None or outcome is _RAISED or outcome != is_and:
+                combined = outcome
+                break
+        result.append(combined)
+
+    return result
+
+
+def _negate(outcomes: List[Any]) -> List[Any]:
+    return [not o if isinstance(o, bool) else o for o in outcomes]
+
+
+def _rank(entry: _Ranked) -> float:
+    return entry.cost / max(entry.decisive, _EPSILON)
+
+
+def _plan(node: ex.Node, elements: Sequence[Any], measure: bool,
+          present: FrozenSet[ex.Node] = frozenset()) -> _Planned:
+    """
+    Optimize 'node', measuring its outcomes on 'elements' if 'measure'
+    is set. Junctions measure their operands once, and their own
+    outcomes are combined from those. Paths in 'present' are known not
+    to be None where 'node' is evaluated.
+    """
+    if isinstance(node, ex.Not):
+        operand = _plan(node.operand, elements, measure, present)
+        return _Planned(node if operand.node is node.operand
+                        else ex.Not(operand.node),
+                        operand.cost,
+                        None if operand.outcomes is None
+                        else _negate(operand.outcomes))
+
+    if not isinstance(node, ex.Junction):
+        return _Planned(node, node.total_cost(),
+                        _measure(node, elements) if measure else None)
+
+    is_and = isinstance(node, ex.And)
+    operands = []
+    order: List[_Ranked] = []
+    movable: List[_Ranked] = []
+    guarded = present
+    for child in node.operands:
+        # Operands which may raise stay behind those before them, so
+        # they can rely on the paths those guard.
+        fixed = not _cannot_raise(child, present)
+        planned = _plan(child, elements, True, guarded if fixed else present)
+        operands.append(planned)
+        guarded |= _guards(node, child)
+
+        passed = _passed(cast(List[Any], planned.outcomes))
+        entry = _Ranked(planned.node, planned.cost,
+                        (1.0 - passed) if is_and else passed)
+        if fixed:
+            order += sorted(movable, key=_rank)
+            order.append(entry)
+            movable = []
+        else:
+            movable.append(entry)
+    order += sorted(movable, key=_rank)
+
+    expected = 0.0
+    reach = 1.0
+    for entry in order:
+        expected += reach * entry.cost
+        reach *= 1.0 - entry.decisive
+
+    outcomes = None
+    if measure:
+        outcomes = _combine(is_and, [cast(List[Any], operand.outcomes)
+                                     for operand in operands])
+
+    reordered = tuple(entry.node for entry in order)
+    if reordered == node.operands:
+        return _Planned(node, expected, outcomes)
+
+    return _Planned(type(node)(reordered), expected, outcomes)
+
+
+def _optimize(node: ex.Node, elements: Sequence[Any]) \
+        -> Tuple[ex.Node, float]:
+    """
+    Return the optimized form of 'node' and its expected evaluation cost.
+    """
+    planned = _plan(node, elements, False)
+    return planned.node, planned.cost
+
+
+def optimize(node: ex.Node, elements: Sequence[Any]) -> ex.Node:
+    return _optimize(node, sample(elements))[0]
+
+
+def _has_junction(node: ex.Node) -> bool:
+    return (isinstance(node, ex.Junction)
+            or any(_has_junction(c) for c in node.children))
+
+
+def plan(needle: Any, elements: Any) -> Callable[[Any], Any]:
+    """
+    Return the function `Elements.find` should call for each element to
+    evaluate 'needle'. Plans are cached per `Elements` and predicate.
+    """
+    node = getattr(needle, '_node', None)
+    if not isinstance(node, ex.Node):
+        return needle
+    if not _has_junction(node):
+        # Calling the tree's evaluator directly skips the extra evaluation
+        # `Attribute.__call__` makes to check for a callable value.
+        return needle._attr
+
+    plans: Dict[ex.Node, Callable[[Any], Any]] = elements._plans
+    result = plans.get(node)
+    if result is None:
+        if len(plans) >= MAX_CACHED_PLANS:
+            plans.clear()
+        result = plans[node] = ex.compile_shared(optimize(node, elements))
+
+    return result
+
+
+class _Stats:
+    def __init__(self):
+        self.evaluated = 0
+        self.passed = 0
+        self.raised = 0
+
+    def __str__(self) -> str:
+        rate = self.passed / self.evaluated if self.evaluated else 0.0
+        raised = f', raised {self.raised}' if self.raised else ''
+        return (f'evaluated {self.evaluated}, passed {self.passed} '
+                f'({rate:.0%}){raised}')
+
+
+def _counting(node: ex.Node,
+              lines: List[Tuple[int, ex.Node, _Stats]],
+              depth: int = 0) -> ex.Evaluator:
+    stats = _Stats()
+    lines.append((depth, node, stats))
+
+    if isinstance(node, ex.Junction):
+        operands = [_counting(o, lines, depth + 1) for o in node.operands]
+        stop = not isinstance(node, ex.And)
+
+        def junction(e):
+            for operand in operands:
+                if bool(operand(e)) is stop:
+                    return stop
+            return not stop
+
+        inner = junction
+    elif isinstance(node, ex.Not):
+        operand = _counting(node.operand, lines, depth + 1)
+
+        def negate(e):
+            return not operand(e)
+
+        inner = negate
+    else:
+        inner = node.fn
+
+    def evaluate(e):
+        stats.evaluated += 1
+        try:
+            result = inner(e)
+        except Exception:
+            stats.raised += 1
+            raise
+
+        stats.passed += bool(result)
+        return result
+
+    return evaluate
+
+
+def explain(node: ex.Node, elements: Sequence[Any]) -> str:
+    optimized = optimize(node, elements)
+    lines: List[Tuple[int, ex.Node, _Stats]] = []
+    evaluate = _counting(optimized, lines)
+    for elem in elements:
+        try:
+            evaluate(elem)
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    def label(n):
+        return n.word if isinstance(n, ex.Junction) else str(n)
+
+    return '\n'.join(f'{"  " * depth}{label(n)}  [{stats}]'
+                     for depth, n, stats in lines)
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
-import itertools
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Optional, Sequence, Union
 
+from pint import Unit as BaseUnit
+
+from oniref import expressions as ex
 from oniref.elements import Element as OElement, State
 from oniref.units import Q
 
@@ -11,40 +13,74 @@ SimpleAttribute = Callable[[OElement], Any]
 
 
 class Attribute:
-    def __init__(self, attr: SimpleAttribute, desc: Optional[str] = None):
-        self._attr = attr
-        self._desc = desc
+    _node: ex.Node
+
+    def __init__(self,
+                 attr: Union[SimpleAttribute, ex.Node, Attribute],
+                 desc: Optional[str] = None):
+        if isinstance(attr, Attribute):
+            self._node = attr._node
+        elif isinstance(attr, ex.Node):
+            self._node = attr
+        else:
+            self._node = ex.Opaque(attr, desc)
+
+        self._fn: Optional[SimpleAttribute] = None
+        self._desc = desc if desc is not None else str(self._node)
 
     def __repr__(self):
         return f'Attribute({self._desc})'
 
+    def __reduce__(self):
+        # The compiled evaluator is a closure; rebuild it after loading.
+        return (type(self), (self._node, self._desc))
+
+    def to_data(self) -> Any:
+        """
+        JSON-compatible form of this attribute or predicate, which
+        `from_data` reads back. Raises TypeError for those built from
+        arbitrary callables.
+        """
+        return self._node.to_data()
+
+    def to_json(self) -> str:
+        """
+        Canonical JSON text of `to_data`, the same for equal expressions.
+        """
+        return ex.to_json(self._node)
+
+    @property
+    def _attr(self) -> SimpleAttribute:
+        if self._fn is None:
+            self._fn = ex.compile_shared(self._node)
+        return self._fn
+
     def __str__(self):
-        return self._desc or '<unknown attribute>'
+        return self._desc
+
+    def _compare(self, op: str, v: object) -> Predicate:
+        return Predicate(ex.Compare(op, self._node, v))
 
     def __lt__(self, v: object) -> Predicate:
-        return Predicate(lambda e: self._attr(e) < v)
+        return self._compare('<', v)
 
     def __le__(self, v: object) -> Predicate:
-        return Predicate(lambda e: self._attr(e) <= v)
+        return self._compare('<=', v)
 
     def __eq__(self, v: object) -> Predicate:  # type: ignore[override]
-        return Predicate(lambda e: self._attr(e) == v)
+        return self._compare('==', v)
 
     def __gt__(self, v: object) -> Predicate:
-        return Predicate(lambda e: self._attr(e) > v)
+        return self._compare('>', v)
 
     def __ge__(self, v: object) -> Predicate:
-        return Predicate(lambda e: self._attr(e) >= v)
-
-    def _wrap_attr_call(self, *args, **kwargs) -> Any:
-        def wrap(e):
-            return self._attr(e)(*args, **kwargs)
+        return self._compare('>=', v)
 
-        return wrap
+    _optional = False
 
-    @staticmethod
-    def _child(attr, desc):
-        return Attribute(attr, desc)
+    @classmethod
+    def _child(cls, node: ex.Node) -> Attribute:
+        return cls(node)
 
     def __call__(self, *args, **kwargs) -> Any:
         # `Element.foo(element)` is ambiguous. It could mean the user
@@ -54,96 +90,81 @@ class Attribute:
         # `element.foo` since this is a much less common use case.
         if (len(args) != 1 or not isinstance(args[0], OElement)
                 or callable(self._attr(args[0]))):
-            arg_string = ','.join(
-                itertools.chain(
-                    (repr(arg) for arg in args),
-                    (f'{key}={value!r}' for key, value in kwargs.items())
+            node = self._node
+            if (isinstance(node, ex.GetAttr) and node.name == 'to'
+                    and len(args) == 1 and not kwargs
+                    and isinstance(args[0], (str, BaseUnit))):
+                return self._child(
+                    ex.Convert(node.parent, args[0], self._optional)
                 )
-            )
 
             return self._child(
-                self._wrap_attr_call(*args, **kwargs),
-                f'{self._desc}({arg_string})'
+                ex.Call(self._node, args, kwargs, self._optional)
             )
 
         return self._attr(args[0])
 
     def Is(self, v: Any) -> Predicate:
-        return Predicate(lambda e: self._attr(e) is v)
+        return self._compare('is', v)
 
     def In(self, *v: Any) -> Predicate:
-        def result(e: OElement):
-            attr = self._attr(e)
-            if len(v) == 1:
-                try:
-                    return attr in v[0]
-                except TypeError:
-                    pass
-
-            return attr in v
-
-        return Predicate(result)
+        return self._compare('in', v)
 
     def __getattr__(self, name) -> Attribute:
-        def attr(e: OElement) -> Any:
-            return getattr(self._attr(e), name)
+        if name.startswith('__') and name.endswith('__'):
+            raise AttributeError(name)
 
-        return self._child(attr, f'{self._desc}.{name}')
+        return self._child(ex.GetAttr(self._node, name, self._optional))
 
 
 class OptionalAttribute(Attribute):
+    _optional = True
+
     def __repr__(self):
         return f'OptionalAttribute({self._desc})'
 
-    @staticmethod
-    def _child(attr, desc):
-        return OptionalAttribute(attr, desc)
-
-    def _wrap_attr_call(self, *args, **kwargs) -> Callable[[OElement], Any]:
-        base = super()._wrap_attr_call(*args, **kwargs)
-
-        def wrap(e):
-            # base calls _attr(e) so no need to wrap it.
-            return base(e) if self._attr(e) is not None else None
-
-        return wrap
-
-    def __getattr__(self, name) -> Attribute:
-        def attr(e: OElement) -> Any:
-            parent = self._attr(e)
-            return getattr(parent, name) if parent is not None else None
-
-        return self._child(attr, f'{self._desc}.?{name}')
-
 
 class Predicate(Attribute):
     @staticmethod
-    def _cast_attr(attr: SimpleAttribute) -> SimplePredicate:
-        return lambda e: bool(attr(e))
+    def _operand(o: Union[SimpleAttribute, Attribute]) -> ex.Node:
+        return o._node if isinstance(o, Attribute) else ex.Opaque(o)
 
     def __and__(self, o: SimpleAttribute) -> Predicate:
-        return Predicate(
-            lambda e: self._attr(e) and self._cast_attr(o)(e),
-            f'{self} and {o}'
-        )
+        return Predicate(ex.And.of(self._node, self._operand(o)))
 
     def __or__(self, o: SimpleAttribute) -> Predicate:
-        return Predicate(
-            lambda e: self._attr(e) or self._cast_attr(o)(e),
-            f'{self} or {o}'
-        )
+        return Predicate(ex.Or.of(self._node, self._operand(o)))
 
     def __invert__(self) -> Predicate:
-        return Predicate(
-            lambda e: not self._attr(e),
-            f'not {self}'
-        )
+        return Predicate(ex.Not(self._node))
+
+    def optimize(self, elements: Sequence[OElement]) -> Predicate:
+        """
+        Return an equivalent predicate with the operands of every `&`
+        and `|` reordered to evaluate cheaper, more decisive operands
+        first, using selectivity sampled from 'elements'.
+        """
+        # pylint: disable=import-outside-toplevel
+        from oniref.planner import optimize
+        return Predicate(optimize(self._node, elements))
+
+    def explain(self, elements: Sequence[OElement]) -> str:
+        """
+        Describe the evaluation order chosen for 'elements', along with
+        how often each node was evaluated and how often it passed.
+        """
+        # pylint: disable=import-outside-toplevel
+        from oniref.planner import explain
+        return explain(self._node, elements)
 
 
 def _make_element_type():
     class ElementType:
         def __getattr__(self, name):
-            return Attribute(lambda e: getattr(e, name), f'Element.{name}')
+            if name.startswith('__') and name.endswith('__'):
+                raise AttributeError(name)
+
+            return Attribute(ex.GetAttr(ex.ROOT, name))
 
     return ElementType()
 
@@ -163,8 +184,20 @@ def Not(p: Predicate) -> Predicate:
     return ~p
 
 
+def from_data(data: Any) -> Predicate:
+    """
+    Rebuild a predicate from the form given by `Attribute.to_data`.
+    Raises ValueError if 'data' isn't one.
+    """
+    return Predicate(ex.from_data(data))
+
+
+def from_json(text: str) -> Predicate:
+    return Predicate(ex.from_json(text))
+
+
 def optional(attr: Attribute) -> Attribute:
-    return OptionalAttribute(attr, str(attr))
+    return OptionalAttribute(attr)
 
 
 def is_solid():
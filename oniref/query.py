@@ -0,0 +1,385 @@
+"""
+A text query language for element predicates.
+
+`compile_query` turns text such as
+
+    state == Liquid and stable_over(30 degC, 90 degC)
+        and thermal_conductivity > 1 W/(m K)
+
+into a `Predicate` built from expression nodes, as if written with
+`oniref.predicates`, so it is planned, vectorized and shared like any
+other. Compiled queries are cached by their text, so running saved
+queries again costs only their evaluation.
+
+Comparisons are between an attribute and a constant:
+
+    path < 30 degC          path == "Water"       path in ("Ice", "Water")
+    path is None            path is not None      path != Gas
+
+with `<`, `<=`, `==`, `!=`, `>=` and `>`. Paths are attribute names
+joined by '.', with '?' before optional steps as in the JSON form of
+predicates: `low_transition.?temperature`. Constants are numbers
+followed by an optional unit, quoted strings, `None`, `True`, `False`
+and state names. Comparisons combine with `and`, `or`, `not` and
+parentheses, and the functions in `FUNCTIONS` can be called with
+constant arguments.
+
+Units are parsed when the query is compiled, and checked against the
+units of the attribute compared where it has a column, so that
+`thermal_conductivity > 1 kg` is rejected up front rather than failing
+on every element. Errors raise `QuerySyntaxError`, a ValueError giving
+the position in the text.
+"""
+from __future__ import annotations
+import ast
+from functools import lru_cache
+import operator
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from pint import DimensionalityError
+
+from oniref import expressions as ex
+from oniref import predicates as OP
+from oniref.columns import QUANTITY_COLUMNS
+from oniref.elements import TEMPERATURE_UNIT, State
+from oniref.units import Q, conversion, parse_unit
+
+MAX_CACHED_QUERIES = 4096
+
+# Functions callable in queries, with the unit each argument must be
+# compatible with.
+FUNCTIONS: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {
+    'stable_at': (OP.stable_at, (TEMPERATURE_UNIT,)),
+    'stable_over': (OP.stable_over, (TEMPERATURE_UNIT, TEMPERATURE_UNIT)),
+    'is_solid': (OP.is_solid, ()),
+    'is_liquid': (OP.is_liquid, ()),
+    'is_gas': (OP.is_gas, ()),
+    'low_temp': (OP.low_temp, ()),
+    'high_temp': (OP.high_temp, ()),
+}
+
+COMPARISONS: Dict[str, Callable[[Any, Any], OP.Predicate]] = {
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': lambda attr, value: ~(attr == value),
+    '>=': operator.ge,
+    '>': operator.gt,
+}
+
+KEYWORDS = frozenset({'and', 'or', 'not', 'in', 'is'})
+CONSTANTS = {'None': None, 'True': True, 'False': False}
+
+_token_re = re.compile(r'''
+    (?P<space>\s+)
+  | (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<name>°?[^\W\d]\w*)
+  | (?P<op>==|!=|<=|>=|\*\*|[<>()*/^,.?+-])
+''', re.VERBOSE)
+
+
+class QuerySyntaxError(ValueError):
+    """
+    The query 'text' is invalid at 'position'.
+    """
+    def __init__(self, message: str, text: str, position: int):
+        super().__init__(f'{message} at position {position}: {text!r}')
+        self.text = text
+        self.position = position
+
+
+class _Token(NamedTuple):
+    kind: str
+    text: str
+    start: int
+    end: int
+
+
+def _tokenize(text: str) -> List[_Token]:
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _token_re.match(text, position)
+        if match is None:
+            raise QuerySyntaxError(f'Unexpected {text[position]!r}', text,
+                                   position)
+
+        kind = match.lastgroup
+        assert kind is not None
+        if kind != 'space':
+            tokens.append(_Token(kind, match.group(), position, match.end()))
+        position = match.end()
+
+    tokens.append(_Token('end', '', len(text), len(text)))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.index = 0
+
+    @property
+    def token(self) -> _Token:
+        return self.tokens[self.index]
+
+    def error(self, message: str,
+              token: Optional[_Token] = None) -> QuerySyntaxError:
+        return QuerySyntaxError(message, self.text,
+                                (token or self.token).start)
+
+    def advance(self) -> _Token:
+        token = self.token
+        self.index += 1
+        return token
+
+    def accept(self, *texts: str) -> Optional[_Token]:
+        token = self.token
+        if token.kind in ('op', 'name') and token.text in texts:
+            return self.advance()
+        return None
+
+    def expect(self, text: str) -> _Token:
+        token = self.accept(text)
+        if token is None:
+            raise self.error(f'Expected {text!r}')
+        return token
+
+    def parse(self) -> OP.Predicate:
+        result = self.disjunction()
+        if self.token.kind != 'end':
+            raise self.error(f'Unexpected {self.token.text!r}')
+        return result
+
+    def disjunction(self) -> OP.Predicate:
+        result = self.conjunction()
+        while self.accept('or'):
+            result = result | self.conjunction()
+        return result
+
+    def conjunction(self) -> OP.Predicate:
+        result = self.negation()
+        while self.accept('and'):
+            result = result & self.negation()
+        return result
+
+    def negation(self) -> OP.Predicate:
+        if self.accept('not'):
+            return ~self.negation()
+        return self.primary()
+
+    def primary(self) -> OP.Predicate:
+        if self.accept('('):
+            result = self.disjunction()
+            self.expect(')')
+            return result
+
+        start = self.token
+        operand = self.operand()
+        op = self.token
+        if isinstance(operand, OP.Predicate):
+            # Functions giving predicates, such as is_liquid(), are
+            # conditions in themselves rather than values.
+            if op.kind == 'op' and op.text in COMPARISONS \
+                    or op.text in ('is', 'in', 'not'):
+                raise self.error(f'{start.text}() cannot be compared', op)
+            return operand
+
+        compare = COMPARISONS.get(op.text)
+        if compare is not None:
+            self.advance()
+            return compare(operand, self.value(operand))
+        if self.accept('is'):
+            negate = self.accept('not') is not None
+            value = self.value(operand)
+            result = operand.Is(value)
+            return ~result if negate else result
+        if op.text in ('not', 'in'):
+            negate = self.accept('not') is not None
+            self.expect('in')
+            self.expect('(')
+            values = [self.value(operand)]
+            while self.accept(','):
+                values.append(self.value(operand))
+            self.expect(')')
+            result = operand.In(*values)
+            return ~result if negate else result
+
+        raise self.error('Expected a comparison', start)
+
+    def operand(self) -> OP.Attribute:
+        token = self.token
+        if token.kind != 'name' or token.text in KEYWORDS:
+            raise self.error('Expected an attribute')
+
+        if self.tokens[self.index + 1].text == '(':
+            return self.call()
+
+        steps = []
+        while True:
+            optional = self.accept('?') is not None
+            name = self.advance()
+            if name.kind != 'name' or name.text in KEYWORDS:
+                raise self.error('Expected an attribute name', name)
+            steps.append(('?' if optional else '') + name.text)
+            if not self.accept('.'):
+                break
+
+        try:
+            node = ex.from_data('.'.join(steps))
+        except ValueError as e:
+            raise self.error(str(e), token) from e
+        return OP.Attribute(node)
+
+    def call(self) -> OP.Attribute:
+        name = self.advance()
+        function = FUNCTIONS.get(name.text)
+        if function is None:
+            raise self.error(f'Unknown function {name.text!r}', name)
+
+        fn, units = function
+        self.expect('(')
+        args = []
+        if not self.accept(')'):
+            args.append(self.constant())
+            while self.accept(','):
+                args.append(self.constant())
+            self.expect(')')
+
+        if len(args) != len(units):
+            raise self.error(f'{name.text} takes {len(units)} arguments',
+                             name)
+        for (arg, token), unit in zip(args, units):
+            self.check_unit(arg, unit, token)
+
+        return fn(*(arg for arg, _ in args))
+
+    def value(self, operand: OP.Attribute) -> Any:
+        value, token = self.constant()
+        if isinstance(value, str) and token.kind == 'name':
+            value = self.state(operand, token)
+        unit = _unit_of(operand)
+        if unit is not None:
+            self.check_unit(value, unit, token)
+        return value
+
+    def constant(self) -> Tuple[Any, _Token]:
+        token = self.token
+        sign = self.accept('-', '+')
+        number = self.token
+        if number.kind == 'number':
+            self.advance()
+            magnitude: Any = (int(number.text) if number.text.isdigit()
+                              else float(number.text))
+            if sign is not None and sign.text == '-':
+                magnitude = -magnitude
+            return self.quantity(magnitude), token
+        if sign is not None:
+            raise self.error('Expected a number')
+
+        if token.kind == 'string':
+            self.advance()
+            try:
+                return ast.literal_eval(token.text), token
+            except (SyntaxError, ValueError) as e:
+                raise self.error(f'Bad string {token.text}', token) from e
+        if token.kind == 'name' and token.text in CONSTANTS:
+            self.advance()
+            return CONSTANTS[token.text], token
+        if token.kind == 'name' and token.text not in KEYWORDS:
+            self.advance()
+            if token.text == 'State' and self.accept('.'):
+                token = self.advance()
+            return token.text, token
+
+        raise self.error('Expected a constant')
+
+    def quantity(self, magnitude: Any) -> Any:
+        """
+        The quantity of the unit following a number, if any. A unit
+        runs on over names, operators and balanced parentheses.
+        """
+        start = self.token.start
+        end = start
+        depth = 0
+        previous = ''
+        while True:
+            token = self.token
+            if token.kind == 'name':
+                if token.text in KEYWORDS or token.text in CONSTANTS:
+                    break
+            elif token.kind == 'number' or token.text == '-':
+                if previous not in ('^', '**', '-'):
+                    break
+            elif token.text == '(':
+                depth += 1
+            elif token.text == ')':
+                if not depth:
+                    break
+                depth -= 1
+            elif token.text not in ('*', '/', '^', '**'):
+                break
+
+            previous = token.text
+            end = self.advance().end
+
+        if end == start:
+            return magnitude
+
+        text = self.text[start:end]
+        try:
+            return Q(magnitude, parse_unit(text))
+        except Exception as e:  # pylint: disable=broad-except
+            # pint's parser raises a variety of errors, such as
+            # tokenize.TokenError for unbalanced parentheses.
+            raise QuerySyntaxError(f'Bad unit {text!r}', self.text,
+                                   start) from e
+
+    def state(self, operand: OP.Attribute, token: _Token) -> State:
+        try:
+            return State[token.text]
+        except KeyError:
+            raise self.error(f'Unknown name {token.text!r} for {operand}',
+                             token) from None
+
+    def check_unit(self, value: Any, unit: str, token: _Token):
+        if value is None:
+            return
+        if not hasattr(value, 'units'):
+            if isinstance(value, (int, float)) \
+                    and not isinstance(value, bool) \
+                    and parse_unit(unit).dimensionless:
+                return
+            raise self.error(f'Expected a quantity in {unit}', token)
+
+        try:
+            conversion(value.units, unit)
+        except DimensionalityError:
+            raise self.error(f'{value.units} is not compatible with {unit}',
+                             token) from None
+
+
+def _unit_of(operand: OP.Attribute) -> Optional[str]:
+    """
+    Unit of the column an attribute path refers to, if it has one.
+    """
+    try:
+        data = operand.to_data()
+    except TypeError:
+        return None
+
+    if not isinstance(data, str):
+        return None
+    return QUANTITY_COLUMNS.get(data.replace('?', ''))
+
+
+@lru_cache(maxsize=MAX_CACHED_QUERIES)
+def compile_query(text: str) -> OP.Predicate:
+    """
+    Compile the query 'text' into a predicate. Raises
+    `QuerySyntaxError` if it is invalid.
+    """
+    return _Parser(text).parse()
@@ -0,0 +1,336 @@
+"""
+Long-running query server which keeps a loaded `Elements` warm.
+
+Queries are JSON objects, answered over localhost HTTP or a Unix socket
+(one JSON document per line):
+
+    {"op": "get", "id": "Water", "fields": ["name", "molar_mass:g/mol"]}
+    {"op": "find", "text": "Water"}
+    {"op": "find", "regex": "^Molten", "fields": ["name"]}
+    {"op": "find", "where": {"and": [{"state": "Liquid"},
+                                     {"stable_over": ["30 degC", "90 degC"]}]}}
+    {"op": "find", "where": {"expr": {"attr": "molar_mass", "op": "<",
+                                      "value": {"quantity": [20, "g/mol"]}}}}
+    {"op": "find", "where": {"query": "state == Gas and stable_at(0 degC)"}}
+
+An "expr" predicate holds the serialized form given by
+`Attribute.to_data`, and a "query" predicate the text of a query read
+by `oniref.query.compile_query`. Fields are dotted attribute paths on
+`Element` with an optional target unit after a colon. Missing optional
+values are reported as null.
+
+HTTP clients may POST the query to `/query` or use GET requests on
+`/element/<id>` and `/find` with `text`, `regex`, `where` (JSON) and
+`fields` (comma separated) query parameters.
+"""
+from __future__ import annotations
+import argparse
+from functools import lru_cache, reduce
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import socketserver
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from pint import Quantity as BaseQ
+
+from oniref import predicates as OP
+from oniref.elements import (Element, Elements, State, Transition,
+                             load_klei_definitions)
+from oniref.query import compile_query
+from oniref.units import Q, parse_quantity
+
+DEFAULT_FIELDS = ('name',
+                  'pretty_name',
+                  'state',
+                  'specific_heat_capacity:DTU/g/°C',
+                  'thermal_conductivity:DTU/(m s)/°C',
+                  'molar_mass:g/mol',
+                  'radiation_absorption:dimensionless',
+                  'radioactivity:rads/kg',
+                  'mass_per_tile:kg',
+                  'low_transition.temperature:°C',
+                  'low_transition.target',
+                  'high_transition.temperature:°C',
+                  'high_transition.target')
+
+
+class QueryError(Exception):
+    pass
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, BaseQ):
+        return value.m
+    if isinstance(value, Element):
+        return value.name
+    if isinstance(value, State):
+        return value.name
+    if isinstance(value, Transition):
+        return {'temperature': _plain(value.temperature),
+                'target': _plain(value.target),
+                'ore': _plain(value.ore),
+                'ore_ratio': value.ore_ratio}
+
+    return value
+
+
+@lru_cache(maxsize=256)
+def _compile_field(spec: str) -> Callable[[Element], Any]:
+    path, _, unit = spec.partition(':')
+    first, *rest = path.split('.')
+
+    attr = OP.optional(getattr(OP.Element, first))
+    for name in rest:
+        attr = getattr(attr, name)
+
+    if unit:
+        try:
+            Q(1, unit)
+        except Exception as e:
+            raise QueryError(f'Bad unit in field {spec!r}: {e}') from e
+        attr = attr.to(unit)
+
+    return attr
+
+
+def _compile_fields(fields: Optional[Sequence[str]]) \
+        -> List[Tuple[str, Callable[[Element], Any]]]:
+    return [(spec.partition(':')[0], _compile_field(spec))
+            for spec in (fields or DEFAULT_FIELDS)]
+
+
+def _quantity(text: str) -> BaseQ:
+    try:
+        return parse_quantity(text)
+    except Exception as e:
+        raise QueryError(f'Bad quantity {text!r}: {e}') from e
+
+
+_comparisons = {
+    '<': lambda a, v: a < v,
+    '<=': lambda a, v: a <= v,
+    '==': lambda a, v: a == v,
+    '>': lambda a, v: a > v,
+    '>=': lambda a, v: a >= v,
+}
+
+
+def compile_where(where: Dict[str, Any]) -> OP.Predicate:
+    """
+    Build a predicate from its JSON form.
+    """
+    if not isinstance(where, dict):
+        raise QueryError(f'Bad predicate {where!r}')
+
+    for key, combine in (('and', OP.And), ('or', OP.Or)):
+        if key in where:
+            if not where[key]:
+                raise QueryError(f'Empty {key!r} predicate')
+            return reduce(combine, (compile_where(w) for w in where[key]))
+
+    if 'not' in where:
+        return ~compile_where(where['not'])
+
+    if 'expr' in where:
+        try:
+            return OP.from_data(where['expr'])
+        except ValueError as e:
+            raise QueryError(str(e)) from e
+
+    if 'query' in where:
+        try:
+            return compile_query(where['query'])
+        except (TypeError, ValueError) as e:
+            raise QueryError(str(e)) from e
+
+    if 'state' in where:
+        try:
+            return OP.Element.state == State[where['state']]
+        except KeyError as e:
+            raise QueryError(f'Unknown state {where["state"]!r}') from e
+
+    if 'stable_at' in where:
+        return OP.stable_at(_quantity(where['stable_at']))
+
+    if 'stable_over' in where:
+        low, high = where['stable_over']
+        return OP.stable_over(_quantity(low), _quantity(high))
+
+    if 'attr' in where:
+        name, op_name = where['attr'], where.get('op')
+        op = _comparisons.get(op_name) if isinstance(op_name, str) else None
+        if op is None:
+            raise QueryError(f'Bad comparison in {where!r}')
+        if (not isinstance(name, str) or not name.isidentifier()
+                or name.startswith('_')):
+            raise QueryError(f'Bad attribute {name!r}')
+
+        value = where.get('value')
+        if isinstance(value, str):
+            value = _quantity(value)
+
+        return op(getattr(OP.Element, name), value)
+
+    raise QueryError(f'Bad predicate {where!r}')
+
+
+class QueryEngine:
+    """
+    Transport-independent query evaluation against a loaded `Elements`.
+    """
+    def __init__(self, elements: Elements):
+        self.elements = elements
+
+    def _project(self, elems, fields):
+        compiled = _compile_fields(fields)
+        return [{name: _plain(get(elem)) for name, get in compiled}
+                for elem in elems]
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get('op')
+        fields = request.get('fields')
+        if fields is not None and (
+                not isinstance(fields, list)
+                or not all(isinstance(f, str) for f in fields)):
+            raise QueryError(f'Bad fields {fields!r}')
+
+        if op == 'get':
+            key = request.get('id')
+            elem = self.elements.get(key) if isinstance(key, str) else None
+            if elem is None:
+                raise QueryError(f'No element {key!r}')
+            return {'result': self._project([elem], fields)[0]}
+
+        if op == 'find':
+            needle: Any
+            if 'text' in request:
+                needle = request['text']
+            elif 'regex' in request:
+                try:
+                    needle = re.compile(request['regex'])
+                except re.error as e:
+                    raise QueryError(f'Bad regex: {e}') from e
+            elif 'where' in request:
+                needle = compile_where(request['where'])
+            else:
+                raise QueryError('find requires text, regex or where')
+
+            return {'result': self._project(self.elements.find(needle),
+                                            fields)}
+
+        raise QueryError(f'Unknown op {op!r}')
+
+    def handle_json(self, payload: bytes) -> Tuple[bool, bytes]:
+        try:
+            request = json.loads(payload)
+            if not isinstance(request, dict):
+                raise QueryError('Query must be a JSON object')
+            response, ok = self.handle(request), True
+        except (QueryError, ValueError, TypeError, AttributeError) as e:
+            response, ok = {'error': str(e)}, False
+
+        return ok, json.dumps(response, separators=(',', ':'),
+                              ensure_ascii=False).encode()
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    engine: QueryEngine
+
+    def _respond(self, ok: bool, body: bytes):
+        self.send_response(200 if ok else 400)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        if urlsplit(self.path).path != '/query':
+            self._respond(False, b'{"error":"not found"}')
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        self._respond(*self.engine.handle_json(self.rfile.read(length)))
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        url = urlsplit(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        request: Dict[str, Any] = {}
+
+        if 'fields' in params:
+            request['fields'] = params.pop('fields').split(',')
+
+        if url.path.startswith('/element/'):
+            request.update(op='get', id=unquote(url.path[len('/element/'):]))
+        elif url.path == '/find':
+            request['op'] = 'find'
+            for key in ('text', 'regex'):
+                if key in params:
+                    request[key] = params[key]
+            if 'where' in params:
+                try:
+                    request['where'] = json.loads(params['where'])
+                except ValueError:
+                    self._respond(False, b'{"error":"bad where"}')
+                    return
+        else:
+            self._respond(False, b'{"error":"not found"}')
+            return
+
+        self._respond(*self.engine.handle_json(json.dumps(request).encode()))
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class _UnixHandler(socketserver.StreamRequestHandler):
+    engine: QueryEngine
+
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                _, body = self.engine.handle_json(line)
+                self.wfile.write(body + b'\n')
+                self.wfile.flush()
+
+
+def make_http_server(elements: Elements,
+                     host: str = '127.0.0.1',
+                     port: int = 0) -> ThreadingHTTPServer:
+    handler = type('Handler', (_HTTPHandler,),
+                   {'engine': QueryEngine(elements)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+class UnixQueryServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+def make_unix_server(elements: Elements, path: str) -> UnixQueryServer:
+    handler = type('Handler', (_UnixHandler,),
+                   {'engine': QueryEngine(elements)})
+    return UnixQueryServer(path, handler)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(
+        description='Serve element queries from a warm Elements instance.'
+    )
+    parser.add_argument('oni_path', help='Game installation directory.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8642)
+    parser.add_argument('--unix', metavar='PATH',
+                        help='Listen on a Unix socket instead of HTTP.')
+    args = parser.parse_args(argv)
+
+    # Frozen, so that concurrent requests share it without locking.
+    elements = load_klei_definitions(args.oni_path, frozen=True)
+    server = (make_unix_server(elements, args.unix) if args.unix
+              else make_http_server(elements, args.host, args.port))
+    with server:
+        server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
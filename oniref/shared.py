@@ -0,0 +1,98 @@
+"""
+Publish element data in shared memory for process pools.
+
+The first process loads the definitions and publishes them:
+
+    with publish(load_klei_definitions(path)) as table:
+        pool = Pool(initializer=init_worker, initargs=(table.name,))
+
+Workers then `attach(name)` to get a read-only `Elements` whose columns
+are views of the shared block rather than copies.
+"""
+from __future__ import annotations
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+import os
+import sys
+from typing import Optional
+
+from oniref.columns import ColumnarElements, ElementColumns
+from oniref.elements import Elements
+
+
+class SharedElements:
+    """
+    Owner of a shared memory block holding packed element columns. The
+    block is removed by `unlink`, or on leaving the with statement.
+    """
+    def __init__(self, elements: Elements, name: Optional[str] = None):
+        columns = ElementColumns.of(elements)
+        self._shm = SharedMemory(name, create=True, size=columns.nbytes())
+        columns.write_into(self._shm.buf)
+
+    @property
+    def name(self) -> str:
+        return self._shm.name
+
+    def close(self):
+        self._shm.close()
+
+    def unlink(self):
+        self._shm.unlink()
+
+    def __enter__(self) -> SharedElements:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        self.unlink()
+
+
+def publish(elements: Elements, name: Optional[str] = None) \
+        -> SharedElements:
+    return SharedElements(elements, name)
+
+
+class _Attachment(SharedMemory):
+    def __del__(self):
+        # Closing fails while columns still reference the mapping. The
+        # mapping is released along with the last of them in that case.
+        try:
+            super().__del__()
+        except BufferError:
+            pass
+
+
+# The process whose resource tracker was started by attaching a block.
+_tracker_owner: Optional[int] = None  # pylint: disable=invalid-name
+
+
+def _open(name: str) -> SharedMemory:
+    global _tracker_owner  # pylint: disable=global-statement
+    if sys.version_info >= (3, 13):
+        # pylint: disable=unexpected-keyword-arg
+        return _Attachment(name, track=False)
+
+    # Before Python 3.13 attaching registers the block with the resource
+    # tracker, which unlinks it when the tracker's processes have exited.
+    # Child processes share the tracker of their parent, where the
+    # publisher's registration must stay until it unlinks the block, so
+    # only a tracker started for this attachment is told to forget it.
+    # pylint: disable=protected-access
+    tracker = resource_tracker._resource_tracker
+    if tracker._fd is None:  # type: ignore[attr-defined]
+        _tracker_owner = os.getpid()
+    shm = _Attachment(name)
+    if _tracker_owner == os.getpid():
+        resource_tracker.unregister(
+            shm._name, 'shared_memory'  # type: ignore[attr-defined]
+        )
+    return shm
+
+
+def attach(name: str) -> Elements:
+    """
+    Return a read-only view of the elements published as 'name'.
+    """
+    shm = _open(name)
+    return ColumnarElements(ElementColumns.from_buffer(shm.buf), shm)
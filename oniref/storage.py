@@ -0,0 +1,34 @@
+"""
+Preprocessed element data files.
+
+`save_elements` writes the packed columns of an `Elements` set (see
+`oniref.columns`) to a file: a versioned header and column directory,
+fixed-width numeric columns in canonical units, transition index columns
+and string tables. `open_elements` memory-maps such a file and returns a
+read-only `Elements` which decodes elements on first access, so opening
+a file costs the same regardless of its size and only the pages a query
+touches are read.
+"""
+from __future__ import annotations
+import mmap
+from os import PathLike
+from pathlib import Path
+from typing import Union
+
+from oniref.columns import ColumnarElements, ElementColumns, FormatError
+from oniref.elements import Elements
+
+
+def save_elements(elements: Elements, path: Union[str, PathLike]):
+    Path(path).write_bytes(ElementColumns.of(elements).to_bytes())
+
+
+def open_elements(path: Union[str, PathLike]) -> Elements:
+    with open(path, 'rb') as data:
+        try:
+            mapping = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as e:
+            # Raised for empty files, which can't be mapped.
+            raise FormatError(f'Not an element file: {path}') from e
+
+    return ColumnarElements(ElementColumns.from_buffer(mapping), mapping)
@@ -1,27 +1,143 @@
+from __future__ import annotations
 import os
-from typing import Dict, Optional, Union
+from pathlib import Path
+import re
+import sys
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, List, Mapping, Optional, Union, cast
 
 from bs4 import BeautifulSoup as BS
 import polib
 
+from oniref.instrumentation import span
+
+
+StrPath = Union[str, os.PathLike]
+
 
 def strip_tags(text):
     return ''.join(i.get_text() for i in BS(text, 'lxml'))
 
 
 class KleiStrings:
-    def __init__(self, strings: Dict[str, str]):
-        self._raw = strings
-        self._stripped: Dict[str, str] = {}
+    """
+    Strings by localization key, with markup stripped on access.
+
+    'catalogs' maps locale codes to the .po files translating these
+    strings, which `locale` loads on first use. A translated catalog
+    falls back to the one it was loaded from for any key it lacks.
+    """
+    def __init__(self,
+                 strings: Dict[str, str],
+                 catalogs: Optional[Mapping[str, StrPath]] = None,
+                 fallback: Optional[KleiStrings] = None):
+        self._raw: Mapping[str, str] = strings
+        self._stripped: Mapping[str, str] = {}
+        self._frozen = False
+        self._catalogs = dict(catalogs or {})
+        self._fallback = fallback
+        self._locales: Dict[str, KleiStrings] = {}
+        self._lock = threading.Lock()
 
     def __len__(self):
         return len(self._raw)
 
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def freeze(self):
+        """
+        Strip every string up front and make the catalog read-only. A
+        frozen catalog never writes to its cache, so lookups are safe
+        from any number of threads.
+        """
+        if self._frozen:
+            return
+
+        with span('strings.strip', strings=len(self._raw)):
+            stripped = {key: strip_tags(raw)
+                        for key, raw in self._raw.items()}
+
+        self._raw = MappingProxyType(dict(self._raw))
+        self._stripped = MappingProxyType(stripped)
+        self._frozen = True
+
+    def __getstate__(self):
+        # The lock can't be pickled, and an unfrozen catalog's cache is
+        # cheap to rebuild. A frozen one keeps its stripped strings so
+        # they aren't stripped again on load, storing only those which
+        # differ from the raw string.
+        stripped = None
+        if self._frozen:
+            stripped = {key: value for key, value in self._stripped.items()
+                        if value != self._raw[key]}
+
+        return {'raw': dict(self._raw),
+                'stripped': stripped,
+                'catalogs': self._catalogs,
+                'fallback': self._fallback,
+                'locales': self._locales}
+
+    def __setstate__(self, state):
+        raw, stripped = state['raw'], state['stripped']
+        self._raw = raw
+        self._stripped = {}
+        self._frozen = False
+        self._catalogs = state['catalogs']
+        self._fallback = state['fallback']
+        self._locales = state['locales']
+        self._lock = threading.Lock()
+        if stripped is not None:
+            self._raw = MappingProxyType(raw)
+            self._stripped = MappingProxyType(
+                {key: stripped.get(key, value) for key, value in raw.items()}
+            )
+            self._frozen = True
+
+    @property
+    def locales(self) -> List[str]:
+        return sorted(self._catalogs)
+
+    def locale(self, code: str) -> KleiStrings:
+        """
+        Return the catalog for the locale 'code', loading it on first
+        use. Its keys are the same interned strings as this catalog's.
+        """
+        result = self._locales.get(code)
+        if result is not None:
+            return result
+
+        with self._lock:
+            result = self._locales.get(code)
+            if result is None:
+                try:
+                    path = self._catalogs[code]
+                except KeyError:
+                    raise KeyError(f'No catalog for locale {code!r}') \
+                        from None
+
+                result = _from_po(lambda: polib.pofile(str(path)),
+                                  fallback=self)
+                if self._frozen:
+                    result.freeze()
+                self._locales[code] = result
+
+        return result
+
     def _strip(self, key):
         result = self._stripped.get(key)
         if result is None:
-            raw = self._raw[key]
-            result = self._stripped[key] = strip_tags(raw)
+            raw = self._raw.get(key)
+            if raw is None:
+                if self._fallback is None:
+                    raise KeyError(key)
+                return self._fallback._strip(key)
+
+            with span('strings.strip'):
+                result = strip_tags(raw)
+            cast(Dict[str, str], self._stripped)[key] = result
 
         return result
 
@@ -51,11 +167,59 @@ class KleiStrings:
         return self._raw.get(key, default)
 
 
-def load_strings(path: Union[str, os.PathLike]) -> KleiStrings:
-    po = polib.pofile(str(path))
+def parse_strings(contents: str,
+                  catalogs: Optional[Mapping[str, StrPath]] = None) \
+        -> KleiStrings:
+    """
+    Build a `KleiStrings` from the text of a .pot template, with the
+    translations in 'catalogs' available by locale.
+    """
+    return _from_po(lambda: polib.pofile(contents), catalogs)
+
+
+def load_strings(path: StrPath,
+                 catalogs: Optional[Mapping[str, StrPath]] = None) \
+        -> KleiStrings:
+    return _from_po(lambda: polib.pofile(str(path)), catalogs)
 
-    result = {}
-    for entry in po:
-        result[entry.msgctxt] = entry.msgid
 
-    return KleiStrings(result)
+# The game ships translations as strings_preinstalled_<locale>_klei.po.
+_CATALOG_NAME = re.compile(r'strings_preinstalled_(?P<locale>.+)_klei')
+
+
+def find_catalogs(directory: StrPath) -> Dict[str, Path]:
+    """
+    Return the .po catalogs in 'directory' by locale code.
+    """
+    result = {}
+    for path in sorted(Path(directory).glob('*.po')):
+        match = _CATALOG_NAME.fullmatch(path.stem)
+        result[match['locale'] if match else path.stem] = path
+
+    return result
+
+
+def _from_po(parse: Callable[[], polib.POFile],
+             catalogs: Optional[Mapping[str, StrPath]] = None,
+             fallback: Optional[KleiStrings] = None) -> KleiStrings:
+    """
+    Build a `KleiStrings` from the entries of a .pot template, or of a
+    .po translation if there is a 'fallback' catalog for untranslated
+    keys. Keys are interned so every locale shares them.
+    """
+    with span('load.strings') as phase:
+        result: Dict[str, str] = {}
+        for entry in parse():
+            if fallback is None:
+                text = entry.msgid
+            elif entry.msgstr:
+                text = entry.msgstr
+            else:
+                continue
+
+            key: str = entry.msgctxt
+            result[sys.intern(key) if key is not None else key] = text
+
+        phase.set(strings=len(result))
+
+    return KleiStrings(result, catalogs, fallback)
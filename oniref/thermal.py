@@ -0,0 +1,197 @@
+"""
+Tile-to-tile heat conduction over a 2D grid of elements.
+
+A `ThermalGrid` holds an element, a mass and a temperature for every
+cell, as NumPy arrays, and steps conduction between orthogonally
+adjacent cells a tick at a time:
+
+    grid = ThermalGrid(elements,
+                       [['Granite', 'Water', 'Water'],
+                        ['Granite', 'Vacuum', 'Steam']],
+                       temperatures=Q(np.full((2, 3), 20.0), '°C'))
+    grid.run(1000)
+    grid.temperatures
+
+Element properties come from the columns of the set, so each tick is a
+fixed sequence of array operations over the whole grid, with no Python
+loops over cells or pint arithmetic, and repeated runs give identical
+results.
+
+Heat flows across each face at the lower of the two cells' thermal
+conductivities times their temperature difference, as in the game. A
+single tick never moves more than a quarter of the heat that would
+equalize the two cells, which keeps every step stable however long the
+tick or conductive the elements. Cells without mass, such as vacuum,
+neither hold nor pass heat, and no heat crosses the edges of the grid.
+
+After each tick, a cell beyond one of its element's transition
+temperatures becomes the transition's target, keeping its mass and
+temperature as the game does. Ore byproducts aren't placed anywhere,
+as each cell holds a single element.
+"""
+from __future__ import annotations
+from typing import Any, Sequence, Tuple, Union
+
+import numpy as np
+
+from oniref.columns import ElementColumns
+from oniref.elements import Element, Elements
+from oniref.units import Q, magnitudes, parse_unit
+
+# Simulated seconds per tick, the game's conduction interval.
+DEFAULT_TICK = 0.2
+# The fraction of the heat that would equalize two cells which may
+# cross their face in one tick. With at most four faces per cell this
+# keeps every update a weighted average of neighbouring temperatures.
+MAX_FACE_FRACTION = 0.25
+
+
+def _magnitudes(value: Any, unit: str, shape: Tuple[int, ...]) -> np.ndarray:
+    return np.array(np.broadcast_to(magnitudes(value, unit), shape))
+
+
+class ThermalGrid:
+    """
+    Cells of 'elements' laid out as the 2D array 'cells', of element
+    names or positions in 'elements'.
+
+    'masses' and 'temperatures' are quantities, or plain numbers in kg
+    and °C, either for every cell or broadcast to the grid. Masses
+    default to each element's `mass_per_tile`, or zero for elements
+    without one. 'tick' is the simulated time per tick, in seconds if
+    not a quantity.
+    """
+    def __init__(self,
+                 elements: Union[Elements, Sequence[Element]],
+                 cells: Any,
+                 masses: Any = None,
+                 temperatures: Any = 20.0,
+                 tick: Any = DEFAULT_TICK):
+        self._columns = ElementColumns.of(elements)
+        self.cells = self._columns.positions(cells)
+        if self.cells.ndim != 2:
+            raise ValueError('cells must be a 2D array')
+
+        shape = self.cells.shape
+        if masses is None:
+            masses = np.nan_to_num(
+                self._columns['mass_per_tile'][self.cells]
+            )
+        self.masses = _magnitudes(masses, 'kg', shape)
+        self.temperature = _magnitudes(temperatures, '°C', shape)
+        self.tick = float(_magnitudes(tick, 's', ()))
+        self.ticks = 0
+
+        columns = self._columns
+        self._shc = np.asarray(columns['specific_heat_capacity'])
+        self._conductivity = np.asarray(columns['thermal_conductivity'])
+        self._low = columns['low_transition.temperature']
+        self._high = columns['high_transition.temperature']
+        self._low_target = columns['low_transition.target']
+        self._high_target = columns['high_transition.target']
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.cells.shape
+
+    @property
+    def temperatures(self) -> Any:
+        return Q(self.temperature.copy(), parse_unit('°C'))
+
+    def names(self) -> np.ndarray:
+        """
+        The name of the element in each cell.
+        """
+        names = np.array(list(self._columns.names), dtype=object)
+        return names[self.cells]
+
+    def heat_capacities(self) -> np.ndarray:
+        """
+        Heat capacity of each cell in DTU/°C.
+        """
+        return self._shc[self.cells] * self.masses * 1000.0
+
+    def heat(self) -> float:
+        """
+        Total heat in the grid relative to 0 °C, in DTU. Conduction
+        conserves it; phase transitions change it.
+        """
+        return float((self.heat_capacities() * self.temperature).sum())
+
+    def step(self):
+        temperature = self.temperature
+        capacity = self.heat_capacities()
+        conductivity = np.where(capacity > 0,
+                                self._conductivity[self.cells], 0.0)
+
+        flow = np.zeros_like(temperature)
+        for axis in (0, 1):
+            first = [slice(None)] * 2
+            second = [slice(None)] * 2
+            first[axis] = slice(None, -1)
+            second[axis] = slice(1, None)
+            a, b = tuple(first), tuple(second)
+            face = _face_flow(temperature[a], temperature[b],
+                              conductivity[a], conductivity[b],
+                              capacity[a], capacity[b], self.tick)
+            flow[a] -= face
+            flow[b] += face
+
+        np.divide(flow, capacity, out=flow, where=capacity > 0)
+        temperature += flow
+        self._transition()
+        self.ticks += 1
+
+    def run(self, ticks: int):
+        for _ in range(ticks):
+            self.step()
+
+    def _transition(self):
+        # Each transition moves to a different element, so chains in
+        # consistent data end within that many steps.
+        for _ in range(len(self._columns)):
+            cells = self.cells
+            temperature = self.temperature
+            down = ((temperature < self._low[cells])
+                    & (self._low_target[cells] >= 0))
+            up = ((temperature > self._high[cells])
+                  & (self._high_target[cells] >= 0))
+            if not (down.any() or up.any()):
+                return
+
+            self.cells = np.where(
+                down, self._low_target[cells],
+                np.where(up, self._high_target[cells], cells)
+            ).astype(np.intp)
+
+
+def _face_flow(t_a: np.ndarray, t_b: np.ndarray,
+               k_a: np.ndarray, k_b: np.ndarray,
+               c_a: np.ndarray, c_b: np.ndarray,
+               tick: float) -> np.ndarray:
+    """
+    Heat in DTU moving from each cell 'a' to its neighbour 'b' in one
+    tick, for 1 m tiles.
+    """
+    difference = t_a - t_b
+    flow = np.minimum(k_a, k_b) * difference * tick
+
+    total = c_a + c_b
+    equalizing = np.divide(c_a * c_b, total, out=np.zeros_like(total),
+                           where=total > 0)
+    limit = np.abs(difference) * equalizing * MAX_FACE_FRACTION
+    return np.clip(flow, -limit, limit)
+
+
+def simulate(elements: Union[Elements, Sequence[Element]],
+             cells: Any,
+             ticks: int,
+             masses: Any = None,
+             temperatures: Any = 20.0,
+             tick: Any = DEFAULT_TICK) -> ThermalGrid:
+    """
+    Run 'ticks' ticks of a new `ThermalGrid` and return it.
+    """
+    grid = ThermalGrid(elements, cells, masses, temperatures, tick)
+    grid.run(ticks)
+    return grid
@@ -1,14 +1,135 @@
-from typing import Optional
+from functools import lru_cache
+import math
+import re
+from typing import Any, Optional, Tuple, Union
+
+import numpy as np
 from pint import UnitRegistry, Quantity as BaseQ
+from pint.facets.plain import PlainUnit
 
 registry = UnitRegistry()
 registry.define('DTU = J')
 
 Q = registry.Quantity
 Unit = registry.Unit
+
+
+# pint unpickles quantities and units into its application registry,
+# which lacks 'DTU' and can't be compared with ours. The classes of our
+# registry pickle into it instead, leaving the application registry of
+# the program alone.
+def _unpickle_quantity(magnitude: Any, units: Any) -> BaseQ:
+    return Q(magnitude, units)
+
+
+def _unpickle_unit(units: Any) -> PlainUnit:
+    return Unit(units)
+
+
+def _reduce_quantity(self):
+    return _unpickle_quantity, (self.magnitude, self._units)
+
+
+def _reduce_unit(self):
+    return _unpickle_unit, (self._units,)
+
+
+Q.__reduce__ = _reduce_quantity  # type: ignore[method-assign,assignment]
+Unit.__reduce__ = _reduce_unit  # type: ignore[method-assign,assignment]
 shc_units = registry.parse_units('J/g/°C')
 tc_units = registry.parse_units('J/(m s)/°C')
 
+_quantity_re = re.compile(
+    r'\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)\s*(.*?)\s*$'
+)
+
 
 def maybeQ(mag: Optional[float], dim) -> Optional[BaseQ]:
     return Q(mag, dim) if mag is not None else None
+
+
+def parse_quantity(text: str) -> BaseQ:
+    """
+    Parse a quantity such as '30 degC' or '1.5 W/(m K)'. Unlike
+    `Q(text)` this accepts offset units like degrees Celsius.
+    """
+    match = _quantity_re.fullmatch(text)
+    if match is None:
+        raise ValueError(f'Not a quantity: {text!r}')
+
+    return Q(float(match[1]), match[2] or 'dimensionless')
+
+
+UnitSpec = Union[str, PlainUnit]
+
+
+@lru_cache(maxsize=None)
+def parse_unit(spec: UnitSpec) -> PlainUnit:
+    """
+    Return the unit 'spec', parsing each distinct string only once.
+    """
+    return spec if isinstance(spec, PlainUnit) else Unit(spec)
+
+
+@lru_cache(maxsize=4096)
+def conversion(src: UnitSpec, dst: UnitSpec) \
+        -> Optional[Tuple[float, float]]:
+    """
+    Return (factor, offset) such that a magnitude m in 'src' is
+    m * factor + offset in 'dst', or None if the conversion isn't affine.
+    Raises `pint.DimensionalityError` if the units are incompatible.
+    """
+    src_unit, dst_unit = parse_unit(src), parse_unit(dst)
+
+    def at(magnitude: float) -> float:
+        return Q(magnitude, src_unit).to(dst_unit).m
+
+    offset = at(0.0)
+    if offset:
+        # Temperature scales have simple factors like 1 or 1.8, which
+        # differencing converted points only recovers approximately.
+        factor = (at(1024.0) - offset) / 1024.0
+        rounded = round(factor, 9)
+        if math.isclose(factor, rounded, rel_tol=0, abs_tol=1e-12):
+            factor = rounded
+    else:
+        factor = at(1.0)
+
+    if not math.isclose(at(100.0), 100.0 * factor + offset,
+                        rel_tol=1e-9, abs_tol=1e-9):
+        return None
+
+    return factor, offset
+
+
+def convert(magnitude: Any, src: UnitSpec, dst: UnitSpec) -> Any:
+    """
+    Convert 'magnitude', a number or array, from 'src' to 'dst' units.
+    """
+    affine = conversion(src, dst)
+    if affine is None:
+        return Q(magnitude, parse_unit(src)).to(parse_unit(dst)).m
+
+    factor, offset = affine
+    if factor == 1.0:
+        return magnitude + offset if offset else magnitude
+
+    return magnitude * factor + offset
+
+
+def to_units(quantity: BaseQ, dst: UnitSpec) -> BaseQ:
+    """
+    `quantity.to(dst)`, using the cached conversion between the units.
+    """
+    return Q(convert(quantity.m, quantity.units, dst), parse_unit(dst))
+
+
+def magnitudes(value: Any, unit: UnitSpec) -> np.ndarray:
+    """
+    A float array of the magnitudes of 'value' in 'unit', where 'value'
+    is a quantity or numbers already in that unit.
+    """
+    if hasattr(value, 'units'):
+        return np.array(convert(np.asarray(value.m, dtype=float),
+                                value.units, unit), dtype=float)
+    return np.array(value, dtype=float)
@@ -0,0 +1,301 @@
+"""
+Vectorized evaluation of predicates over `ElementColumns`.
+
+`mask` evaluates an expression tree against whole columns at once and
+returns a boolean array with one entry per element. Trees made of
+comparisons between column backed attributes and constants, combined
+with `&`, `|` and `~`, can be evaluated this way. For anything else, or
+for any tree which would raise when evaluated element by element, `mask`
+returns None and the caller falls back to the element by element path.
+Comparisons on `Element.name` are answered from the name index.
+"""
+from __future__ import annotations
+from numbers import Real
+from typing import Any, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pint import DimensionalityError, UndefinedUnitError
+from pint import Quantity as BaseQ
+
+from oniref import expressions as ex
+from oniref.columns import (COLUMN_DTYPES,
+                            INDEX_COLUMNS,
+                            QUANTITY_COLUMNS,
+                            ElementColumns)
+from oniref.elements import Elements, State
+from oniref.units import convert, parse_unit
+
+
+class Column:
+    """
+    The value of an attribute for every element. 'missing' marks the
+    elements for which the value is None and 'raising' those for which
+    evaluating the attribute raises. 'unit' is None for columns which
+    aren't quantities.
+    """
+    __slots__ = ('name', 'values', 'unit', 'missing', 'raising')
+
+    def __init__(self,
+                 name: str,
+                 values: np.ndarray,
+                 unit: Any,
+                 missing: np.ndarray,
+                 raising: np.ndarray):
+        self.name = name
+        self.values = values
+        self.unit = unit
+        self.missing = missing
+        self.raising = raising
+
+
+def _path(node: ex.Node) -> Optional[List[ex.GetAttr]]:
+    path = []
+    while isinstance(node, ex.GetAttr):
+        path.append(node)
+        node = node.parent
+
+    return path[::-1] if node is ex.ROOT and path else None
+
+
+def column(node: ex.Node, columns: ElementColumns) -> Optional[Column]:
+    """
+    Return the values of the attribute 'node' as a column, or None if
+    the attribute isn't backed by one.
+    """
+    if isinstance(node, ex.Convert):
+        return _converted(node, columns)
+
+    path = _path(node)
+    if path is None or len(path) > 2:
+        return None
+
+    name = '.'.join(n.name for n in path)
+    derived = columns.derived.get(name)
+    if derived is not None:
+        return Column(name, derived.values, derived.unit, derived.missing,
+                      derived.raising)
+
+    none = np.zeros(len(columns), dtype=bool)
+    if name == 'name':
+        return Column(name, np.arange(len(columns)), None, none, none)
+    if name not in COLUMN_DTYPES or name in INDEX_COLUMNS:
+        return None
+
+    values = columns[name]
+    missing = np.isnan(values) if values.dtype.kind == 'f' else none
+    raising = none
+    if len(path) == 2 and not path[1].optional:
+        # Reading a field of a transition which doesn't exist raises.
+        raising = columns[f'{path[0].name}.target'] < 0
+
+    return Column(name, values, QUANTITY_COLUMNS.get(name), missing,
+                  raising)
+
+
+def _converted(node: ex.Convert,
+               columns: ElementColumns) -> Optional[Column]:
+    """
+    Column for `attr.to(unit)` on a quantity column.
+    """
+    base = column(node.operand, columns)
+    if base is None or base.unit is None:
+        return None
+
+    try:
+        values = convert(base.values, base.unit, node.unit)
+    except (DimensionalityError, UndefinedUnitError, ValueError):
+        return None
+
+    raising = base.raising if node.optional else base.raising | base.missing
+    return Column(base.name, values, node.unit, base.missing, raising)
+
+
+def _magnitude(col: Column, value: Any) -> Optional[float]:
+    """
+    'value' as a magnitude comparable with the values of 'col', or None
+    if it can't be compared with them.
+    """
+    if col.name in ('state', 'name'):
+        return None
+
+    if col.unit is None:
+        return float(value) if isinstance(value, Real) else None
+
+    if isinstance(value, BaseQ):
+        try:
+            magnitude = convert(value.m, value.units, col.unit)
+        except DimensionalityError:
+            return None
+    elif isinstance(value, Real) and parse_unit(col.unit).dimensionless:
+        magnitude = convert(float(value), 'dimensionless', col.unit)
+    else:
+        return None
+
+    return magnitude if np.ndim(magnitude) == 0 else None
+
+
+def _equal(col: Column, value: Any,
+           columns: ElementColumns) -> Optional[np.ndarray]:
+    none = np.zeros(len(col.values), dtype=bool)
+    if value is None:
+        return col.missing.copy()
+
+    if col.name == 'name':
+        if isinstance(value, str) and value in columns.index:
+            none[columns.index[value]] = True
+        return none
+
+    if col.name == 'state':
+        if isinstance(value, State):
+            return col.values == value.value
+        return none
+
+    if isinstance(value, BaseQ) and np.ndim(value.m) != 0:
+        return None
+
+    magnitude = _magnitude(col, value)
+    if magnitude is not None:
+        return col.values == magnitude
+    if isinstance(value, BaseQ) and col.unit is not None:
+        # Quantities of different dimensions are never equal.
+        return none
+
+    # Pint compares quantities with plain zero and NaN, and plain numbers
+    # with quantities, by magnitude, so leave those to the elements.
+    return None
+
+
+def _compare(node: ex.Compare,
+             columns: ElementColumns,
+             where: np.ndarray) -> Optional[np.ndarray]:
+    col = column(node.operand, columns)
+    if col is None or (col.raising & where).any():
+        return None
+
+    if node.op == 'is':
+        if node.value is None:
+            return col.missing.copy()
+        if col.name == 'state' and isinstance(node.value, State):
+            return col.values == node.value.value
+        return None
+
+    if node.op == '==':
+        return _equal(col, node.value, columns)
+
+    if node.op == 'in':
+        members = ex.in_members(node.value)
+        if members is None:
+            return None
+
+        result = np.zeros(len(columns), dtype=bool)
+        for member in members:
+            equal = _equal(col, member, columns)
+            if equal is None:
+                return None
+            result |= equal
+
+        return result
+
+    # Ordering None against anything raises.
+    if (col.missing & where).any():
+        return None
+
+    magnitude = _magnitude(col, node.value)
+    if magnitude is None:
+        return None
+
+    return ex.Compare.operators[node.op](col.values, magnitude)
+
+
+def _mask(node: ex.Node,
+          columns: ElementColumns,
+          where: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Evaluate 'node' for every element. Only the elements in 'where'
+    would be evaluated element by element, so only those may raise.
+    """
+    if isinstance(node, ex.Compare):
+        return _compare(node, columns, where)
+
+    if isinstance(node, ex.Not):
+        result = _mask(node.operand, columns, where)
+        return None if result is None else ~result
+
+    if isinstance(node, ex.And):
+        remaining = where.copy()
+        for operand in node.operands:
+            result = _mask(operand, columns, remaining)
+            if result is None:
+                return None
+            remaining &= result
+
+        return remaining
+
+    if isinstance(node, ex.Or):
+        remaining = where.copy()
+        passed = np.zeros(len(columns), dtype=bool)
+        for operand in node.operands:
+            result = _mask(operand, columns, remaining)
+            if result is None:
+                return None
+            passed |= result & remaining
+            remaining &= ~result
+
+        return passed
+
+    return None
+
+
+def mask(node: ex.Node, columns: ElementColumns) -> Optional[np.ndarray]:
+    """
+    Return a boolean array of whether each element satisfies 'node', or
+    None if 'node' can't be evaluated over columns.
+    """
+    return _mask(node, columns, np.ones(len(columns), dtype=bool))
+
+
+def attribute_values(elements: Union[Elements, Sequence[Any]],
+                     node: ex.Node,
+                     unit: Any = None,
+                     positions: Optional[np.ndarray] = None) \
+        -> Tuple[np.ndarray, Any]:
+    """
+    Return the magnitudes of the numeric attribute 'node' for every one
+    of 'elements', or those at 'positions', with NaN for None, along with
+    their unit. Magnitudes are in 'unit' if it is given, and otherwise in
+    the attribute's own unit. Plain numbers are dimensionless.
+
+    Frozen `Elements` are read from their columns where possible; other
+    sequences are evaluated element by element.
+    """
+    if positions is None:
+        positions = np.arange(len(elements))
+
+    col = None
+    if getattr(elements, 'frozen', False):
+        col = column(node, elements.columns)  # type: ignore[union-attr]
+        if col is not None and (col.name in ('state', 'name')
+                                or col.raising[positions].any()):
+            col = None
+
+    if col is not None:
+        result, source = col.values[positions], col.unit
+    else:
+        evaluate = ex.compile_shared(node)
+        results = [evaluate(elements[i]) for i in positions.tolist()]
+        # Magnitudes are in the unit of the first quantity.
+        source = None
+        magnitudes = []
+        for r in results:
+            if isinstance(r, BaseQ):
+                source = r.units if source is None else source
+                magnitudes.append(convert(r.m, r.units, source))
+            else:
+                magnitudes.append(np.nan if r is None else r)
+        result = np.array(magnitudes, dtype=float)
+
+    source = source if source is not None else 'dimensionless'
+    if unit is None:
+        return result, source
+
+    return convert(result, source, unit), unit
@@ -6,8 +6,14 @@ setup(
     description='Oxygen Not Included reference database',
     author_email='tim.prince@gmail.com',
     packages=find_packages(),
-    install_requires=['pint', 'pyyaml', 'polib'],
-    entry_points={},
+    install_requires=['numpy', 'pint', 'pyyaml', 'polib'],
+    extras_require={
+        'pandas': ['pandas'],
+        'arrow': ['pyarrow'],
+    },
+    entry_points={
+        'console_scripts': ['oniref-server = oniref.server:main'],
+    },
     tests_require=[
         'pytest',
     ],
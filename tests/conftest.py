@@ -66,6 +66,22 @@ def water_elements(water_states, water_strings) -> Elements:
     return Elements(water_states, water_strings)
 
 
+# Whether sets are frozen, for tests that must pass either way.
+@fixture(name='frozen', params=[False, True])
+def frozen_fixture(request) -> bool:
+    return request.param
+
+
+@fixture(name='elements')
+def elements_fixture(water_states, water_strings, frozen) -> Elements:
+    return Elements(water_states, water_strings, frozen=frozen)
+
+
+@fixture(name='frozen_elements')
+def frozen_elements_fixture(water_states, water_strings) -> Elements:
+    return Elements(water_states, water_strings, frozen=True)
+
+
 def populate_elements(oni_install_path, water_states):
     elements_dir = (oni_install_path / 'OxygenNotIncluded_Data'
                     / 'StreamingAssets' / 'elements')
@@ -0,0 +1,55 @@
+import pytest
+
+from oniref.elements import State
+from oniref.predicates import Element, Predicate, is_solid, low_temp
+from oniref.units import Q
+
+
+def test_group_by_state(elements):
+    groups = elements.group_by(Element.state)
+    assert groups.keys == [State.Solid, State.Liquid, State.Gas]
+    assert groups.count() == {State.Solid: 1, State.Liquid: 1, State.Gas: 1}
+    assert groups.groups()[State.Liquid] == [elements['Water']]
+
+
+def test_aggregates(elements):
+    groups = elements.group_by(Predicate(lambda e: e.name != 'Water'))
+    conductivity = Element.thermal_conductivity
+    result = groups.aggregate(conductivity, 'count', 'min', 'max', 'mean',
+                              'sum', 'argmin', 'argmax', 'p50',
+                              unit='DTU/(m s)/°C')
+
+    values = sorted(elements[n].thermal_conductivity.to('DTU/(m s)/°C').m
+                    for n in ('Ice', 'Steam'))
+    row = result[True]
+    assert row['count'] == 2
+    assert row['min'].m == pytest.approx(values[0])
+    assert row['max'].m == pytest.approx(values[1])
+    assert row['mean'].m == pytest.approx(sum(values) / 2)
+    assert row['sum'].m == pytest.approx(sum(values))
+    assert row['p50'].m == pytest.approx(sum(values) / 2)
+    assert row['argmin'] is elements['Steam']
+    assert row['argmax'] is elements['Ice']
+    assert result[False]['argmax'] is elements['Water']
+
+
+def test_units(elements):
+    groups = elements.group_by(Element.state, where=~is_solid())
+    assert groups.keys == [State.Liquid, State.Gas]
+
+    lows = groups.min(low_temp(), 'K')
+    assert lows[State.Liquid].units == Q(1, 'K').units
+    assert lows[State.Liquid].m == pytest.approx(273.15)
+    assert groups.max(low_temp().to('K'))[State.Gas] == Q(373.15, 'K')
+
+
+def test_missing_values(elements):
+    groups = elements.group_by(low_temp())
+    assert None in groups.keys
+    assert groups.count(low_temp())[None] == 0
+    assert groups.mean(low_temp())[None] is None
+
+
+def test_unknown_aggregate(elements):
+    with pytest.raises(ValueError):
+        elements.group_by(Element.state).aggregate(Element.molar_mass, 'mode')
@@ -0,0 +1,62 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from oniref import aio
+from oniref.elements import asset_paths
+from oniref.units import registry
+
+from conftest import populate_elements, populate_strings
+
+
+def test_load_strings(oni_install_dir, water_strings):
+    _, strings_path = asset_paths(oni_install_dir)
+    result = asyncio.run(aio.load_strings(strings_path))
+
+    assert dict(result.items()) == dict(water_strings.items())
+
+
+def test_load(oni_install_dir, water_states):
+    result = asyncio.run(aio.load_klei_definitions(oni_install_dir))
+
+    assert len(result) == 3
+    assert result['Ice'] == water_states[0]
+    assert result['Water'].low_transition.target is result['Ice']
+    assert result['Water'].pretty_name == 'Water (pretty)'
+
+
+def test_load_executor_and_semaphore(oni_install_dir):
+    async def load():
+        with ThreadPoolExecutor(2) as executor:
+            return await aio.load_klei_definitions(
+                oni_install_dir,
+                executor=executor,
+                semaphore=asyncio.Semaphore(1)
+            )
+
+    assert len(asyncio.run(load())) == 3
+
+
+def test_load_many(tmp_path, water_states, water_strings):
+    paths = []
+    for i in range(4):
+        path = tmp_path / f'oni{i}'
+        populate_elements(path, water_states)
+        populate_strings(path, water_strings)
+        paths.append(path)
+
+    results = asyncio.run(aio.load_many(paths, limit=2))
+
+    assert len(results) == 4
+    for result in results:
+        assert result['Steam'].thermal_conductivity._REGISTRY is registry
+
+    # Quantities from different installs share one registry.
+    assert (results[0]['Water'].molar_mass
+            == results[3]['Water'].molar_mass)
+
+
+def test_load_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        asyncio.run(aio.load_klei_definitions(tmp_path))
@@ -0,0 +1,123 @@
+import pickle
+
+import numpy as np
+import pytest
+
+from oniref.columns import (ColumnarElements, ElementColumns, FormatError,
+                            QUANTITY_COLUMNS)
+from oniref.elements import State
+from oniref.units import Q
+
+
+def test_from_elements(water_elements):
+    columns = water_elements.columns
+
+    assert columns is water_elements.columns
+    assert len(columns) == 3
+    assert columns.names == ['Ice', 'Water', 'Steam']
+    assert columns.pretty_names[1] == 'Water (pretty)'
+    assert columns['state'].tolist() == [State.Solid.value,
+                                         State.Liquid.value,
+                                         State.Gas.value]
+    assert columns['thermal_conductivity'].tolist() == pytest.approx(
+        [2.18, 0.609, 0.184]
+    )
+    assert np.isnan(columns['mass_per_tile'][2])
+    assert columns['low_transition.target'].tolist() == [-1, 0, 1]
+    assert columns['high_transition.target'].tolist() == [1, 2, -1]
+    assert columns['high_transition.temperature'][0] == pytest.approx(0)
+    assert columns.quantity('molar_mass')[1] == Q(18.01528, 'g/mol')
+    assert 'state' in columns
+    assert set(QUANTITY_COLUMNS) < set(columns)
+
+    with pytest.raises(ValueError):
+        columns['state'][0] = 3
+
+
+def test_buffer_round_trip(water_elements):
+    data = water_elements.columns.to_bytes()
+    columns = ElementColumns.from_buffer(data)
+
+    assert list(columns.names) == water_elements.columns.names
+    assert (list(columns.pretty_names)
+            == water_elements.columns.pretty_names)
+    for name in water_elements.columns:
+        np.testing.assert_array_equal(columns[name],
+                                      water_elements.columns[name])
+
+
+def test_write_into_too_small(water_elements):
+    with pytest.raises(ValueError):
+        water_elements.columns.write_into(bytearray(16))
+
+
+@pytest.mark.parametrize('data', [b'', b'NOTONI\0\0' + bytes(64)])
+def test_bad_buffer(data):
+    with pytest.raises(FormatError):
+        ElementColumns.from_buffer(data)
+
+
+def test_bad_version(water_elements):
+    data = bytearray(water_elements.columns.to_bytes())
+    data[8] = 99
+
+    with pytest.raises(FormatError):
+        ElementColumns.from_buffer(data)
+
+
+def _patched(columns, **replaced):
+    arrays = {name: columns[name] for name in columns}
+    arrays.update(replaced)
+    return ElementColumns(arrays, columns.names,
+                          columns.pretty_names).to_bytes()
+
+
+@pytest.mark.parametrize('name, values', [
+    ('state', [1, 2, 9]),
+    ('low_transition.target', [-1, 0, 3]),
+    ('high_transition.ore', [-2, -1, -1]),
+])
+def test_bad_values(water_elements, name, values):
+    columns = water_elements.columns
+    data = _patched(columns,
+                    **{name: np.array(values, dtype=columns[name].dtype)})
+
+    with pytest.raises(FormatError):
+        ElementColumns.from_buffer(data)
+
+
+def test_bad_dtype(water_elements):
+    data = bytearray(_patched(water_elements.columns,
+                              extra=np.zeros(3, dtype='<f8')))
+    entry = data.index(b'extra')
+    data[entry + 48:entry + 56] = b'|O'.ljust(8, b'\0')
+
+    with pytest.raises(FormatError):
+        ElementColumns.from_buffer(data)
+
+
+def test_columnar_elements(water_elements):
+    view = ColumnarElements(
+        ElementColumns.from_buffer(water_elements.columns.to_bytes())
+    )
+
+    assert view.frozen
+    assert len(view) == 3
+    for elem in water_elements:
+        assert view[elem.name] == elem
+        assert view[elem.name].pretty_name == elem.pretty_name
+        assert view[elem.name].mass_per_tile == elem.mass_per_tile
+
+    assert view['Water'].low_transition.target is view['Ice']
+    assert view['Water'].high_transition.temperature == Q(100, '°C')
+    assert view['Steam'].high_transition is None
+    assert view.find('Wat') == [view['Water']]
+
+
+def test_pickle_columnar_elements(water_elements):
+    view = ColumnarElements(ElementColumns.from_elements(water_elements))
+    restored = pickle.loads(pickle.dumps(view))
+
+    assert isinstance(restored, ColumnarElements)
+    assert restored['Water'].low_transition.target is restored['Ice']
+    assert restored['Water'].pretty_name == 'Water (pretty)'
@@ -0,0 +1,62 @@
+from typing import NamedTuple
+
+import pytest
+
+from oniref.decoding import (BadDefinitionError,
+                             BadDefinitionsError,
+                             Decoder,
+                             Field)
+from oniref.units import Q
+
+
+class _Geyser(NamedTuple):
+    name: str
+    temperature: object
+    pressure: object
+    period: object
+
+
+_decoder = Decoder(_Geyser, [
+    Field('id', 'name'),
+    Field('temperature', 'temperature', unit='K'),
+    Field('maxPressure', 'pressure', unit='kg', required=False),
+    Field(('on', 'off'), 'period', convert=lambda on, off: (on or 0) + off),
+], name_key='id')
+
+
+def test_decode():
+    geyser = _decoder.decode({'id': 'steam', 'temperature': '383',
+                              'on': 10, 'off': 20, 'other': 1})
+    assert geyser == _Geyser('steam', Q(383.0, 'K'), None, 30)
+
+    geyser = _decoder.decode({'id': 'salt', 'temperature': 368,
+                              'maxPressure': 5, 'off': 1})
+    assert geyser.pressure == Q(5, 'kg')
+    assert geyser.period == 1
+
+
+def test_decode_bad():
+    with pytest.raises(BadDefinitionError) as exc:
+        _decoder.decode({'id': 'steam', 'off': 1})
+    assert exc.value.elem == 'steam'
+    assert isinstance(exc.value.inner, KeyError)
+
+    with pytest.raises(BadDefinitionError) as exc:
+        _decoder.decode({'id': 'steam', 'temperature': 'hot', 'off': 1})
+    assert isinstance(exc.value.inner, ValueError)
+
+    with pytest.raises(BadDefinitionError) as exc:
+        _decoder.decode(5)
+    assert exc.value.elem == '<unknown>'
+
+
+def test_decode_all():
+    good = {'id': 'steam', 'temperature': 383, 'off': 1}
+    assert _decoder.decode_all([good, good]) == [_decoder.decode(good)] * 2
+
+    with pytest.raises(BadDefinitionsError) as exc:
+        _decoder.decode_all([{'id': 'a'}, good, {'temperature': 1}])
+
+    assert [e.elem for e in exc.value.errors] == ['a', '<unknown>']
+    assert exc.value.elem == 'a'
+    assert 'Encountered 2 bad definitions' in str(exc.value)
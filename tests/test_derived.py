@@ -0,0 +1,166 @@
+import copy
+import pickle
+
+import pytest
+
+from oniref.columns import ColumnarElements, ElementColumns
+from oniref.derived import STANDARD, derive_standard
+from oniref.elements import Elements, LocalizedElements, State
+from oniref.predicates import Attribute, Element
+from oniref.units import Q
+from oniref.vectorized import column, mask
+
+
+# Derived attributes need frozen sets, so only use those for 'elements'.
+@pytest.fixture(name='frozen')
+def frozen_fixture():
+    return True
+
+
+def _names(elements):
+    return [e.name for e in elements]
+
+
+def test_computed_once(elements):
+    calls = []
+
+    def heat(e):
+        calls.append(e.name)
+        if e.mass_per_tile is None:
+            return None
+        return e.specific_heat_capacity * e.mass_per_tile
+
+    attr = elements.derive('tile_heat', heat, unit='DTU/°C')
+    assert calls == ['Ice', 'Water', 'Steam']
+
+    threshold = Q(3e6, 'DTU/°C')
+    present = ~Element.tile_heat.Is(None)
+    assert _names(elements.find(present & (attr > threshold))) == ['Water']
+    assert _names(elements.find(
+        present & (Element.tile_heat < threshold)
+    )) == ['Ice']
+    assert elements['Water'].tile_heat.m == pytest.approx(4.179e6)
+    assert elements['Steam'].tile_heat is None
+    assert len(calls) == 3
+
+
+def test_vectorized(water_states, water_strings):
+    frozen = Elements(water_states, water_strings, frozen=True)
+    frozen.derive('span', Element.thermal_conductivity.to('W/(m K)'))
+    predicate = Element.span > Q(0.5, 'W/(m K)')
+    assert mask(predicate._node, frozen.columns) is not None
+    assert _names(frozen.find(predicate)) == ['Ice', 'Water']
+
+
+def test_sort_key(elements):
+    elements.derive('tile_heat', STANDARD['tile_heat_capacity'][0])
+    present = [e for e in elements if e.tile_heat is not None]
+    assert _names(sorted(present, key=Element.tile_heat)) == \
+        ['Ice', 'Water']
+    assert _names(elements.derived.sorted('tile_heat', reverse=True)) == \
+        ['Water', 'Ice']
+
+
+def test_range(elements):
+    derive_standard(elements, index=True)
+    derived = elements.derived
+    assert set(derived) == set(STANDARD)
+    assert _names(derived.between('tile_heat_capacity',
+                                  Q(2e6, 'DTU/°C'), Q(5e6, 'DTU/°C'))) == \
+        ['Ice', 'Water']
+    assert _names(derived.between('tile_heat_capacity',
+                                  low=Q(3e6, 'DTU/°C'))) == ['Water']
+    assert _names(derived.between('tile_heat_capacity', Q(5e6, 'DTU/°C'),
+                                  Q(2e6, 'DTU/°C'))) == []
+    assert _names(derived.between('transition_span')) == ['Water']
+    assert elements['Water'].transition_span.m == pytest.approx(100)
+    with pytest.raises(TypeError):
+        derived.between('tile_heat_capacity', 1.0)
+
+
+def test_plain_numbers(elements):
+    elements.derive('conductive', lambda e: e.thermal_conductivity.m > 0.5)
+    assert elements['Ice'].conductive == 1.0
+    assert _names(elements.find(Element.conductive == 1)) == \
+        ['Ice', 'Water']
+    assert _names(elements.derived.between('conductive', 0.5)) == \
+        ['Ice', 'Water']
+
+
+def test_raising(elements):
+    elements.derive('low', Element.low_transition.temperature)
+    with pytest.raises(AttributeError):
+        _ = elements['Ice'].low
+    assert elements['Water'].low.m == pytest.approx(0)
+    assert _names(elements.find(
+        Element.low_transition.Is(None) | (Element.low < Q(50, 'degC'))
+    )) == ['Ice', 'Water']
+
+
+def test_bad_definitions(elements):
+    for name in ('name', 'density', 'ΔQ', '_private', 'not a name'):
+        with pytest.raises(ValueError):
+            elements.derive(name, Element.molar_mass)
+    with pytest.raises(TypeError):
+        elements.derive('pretty', Element.pretty_name)
+    with pytest.raises(AttributeError):
+        _ = elements['Water'].pretty
+
+
+def test_aggregate(elements):
+    heat = elements.derive('tile_heat',
+                           Attribute(STANDARD['tile_heat_capacity'][0]),
+                           unit='DTU/°C')
+    totals = elements.group_by(Element.state).aggregate(heat, 'sum')
+    assert totals[State.Liquid]['sum'].m == pytest.approx(4.179e6)
+
+
+def test_views(water_states, water_strings):
+    frozen = Elements(water_states, water_strings, frozen=True)
+    frozen.derive('heat', Element.specific_heat_capacity)
+    localized = LocalizedElements(frozen, water_strings)
+    assert localized.derived is frozen.derived
+
+    packed = ColumnarElements(
+        ElementColumns.from_buffer(frozen.columns.to_bytes())
+    )
+    packed.derive('heat', lambda e: e.specific_heat_capacity * 2)
+    assert packed['Ice'].heat.m == pytest.approx(4.1)
+
+    # Registrations stay with the set they were made on.
+    restored = pickle.loads(pickle.dumps(frozen))
+    assert len(restored.derived) == 0
+    assert _names(restored.find(Element.state == State.Gas)) == ['Steam']
+
+
+def test_unfrozen(water_elements):
+    with pytest.raises(ValueError):
+        water_elements.derive('heat', Element.specific_heat_capacity)
+    assert len(water_elements.derived) == 0
+
+
+def test_copies(elements):
+    elements.derive('low', Element.low_transition.temperature)
+    elements.derive('heat', STANDARD['tile_heat_capacity'][0])
+    water, ice = elements['Water'], elements['Ice']
+
+    for copied in (copy.copy(water), copy.deepcopy(water),
+                   pickle.loads(pickle.dumps(water))):
+        assert copied.low.m == pytest.approx(0)
+        assert copied.heat == water.heat
+    with pytest.raises(AttributeError):
+        _ = pickle.loads(pickle.dumps(ice)).low
+
+    # Registering more attributes on the set leaves copies alone.
+    shallow = copy.copy(water)
+    elements.derive('more', Element.molar_mass)
+    assert water.more == water.molar_mass
+    with pytest.raises(AttributeError):
+        _ = shallow.more
+
+
+def test_columns(elements):
+    attr = elements.derive('heat', Element.specific_heat_capacity)
+    columns = ElementColumns.of(elements)
+    assert 'heat' in columns.derived
+    assert column(attr._node, columns) is not None
@@ -1,9 +1,15 @@
+import copy
+from dataclasses import FrozenInstanceError
+import pickle
 import re
+import threading
 
 import pytest
 
 import pint
-from oniref import Element, Transition
+from oniref import Element, Elements, Transition
+from oniref import predicates as OP
+from oniref.columns import ColumnarElements
 from oniref.units import Q, Unit
 
 
@@ -134,6 +140,32 @@ def test_find_predicate(water_elements):
     assert water_elements['Water'] in found
 
 
+def test_find_variants(water_elements):
+    liquid = water_elements.iter_find(OP.is_liquid())
+    assert next(liquid) is water_elements['Water']
+    assert next(liquid, None) is None
+
+    assert water_elements.count('pretty') == 3
+    assert water_elements.count(re.compile('^Ice')) == 1
+    assert water_elements.count(OP.is_gas()) == 1
+    assert water_elements.first('pretty') is water_elements['Ice']
+    assert water_elements.first('Dirty') is None
+    assert water_elements.any(OP.is_solid())
+    assert not water_elements.any('Dirty')
+
+
+def test_find_variants_stop_early(water_elements):
+    calls = []
+
+    def needle(elem):
+        calls.append(elem)
+        return True
+
+    assert water_elements.any(needle)
+    assert water_elements.first(needle) is water_elements[0]
+    assert len(calls) == 2
+
+
 def test_find_bad_type(water_elements):
     with pytest.raises(TypeError):
         water_elements.find(None)
@@ -205,3 +237,150 @@ def test_element_str(water_elements):
     water = water_elements['Water']
     assert str(water) == 'Water (pretty)'
     assert repr(water) == "Element(name='Water')"
+
+
+def test_element_hash(water_elements, water):
+    elements = set(water_elements)
+    assert len(elements) == 3
+    assert water in elements
+    assert {water: 1}[water_elements['Water']] == 1
+    assert water != 'Water'
+
+
+def test_intern(water_elements, water):
+    assert water in water_elements
+    assert 'Ice' in water_elements
+    assert 'Juice' not in water_elements
+    assert water_elements.intern(water) is water_elements['Water']
+    assert water_elements.intern('Ice') is water_elements['Ice']
+
+    with pytest.raises(KeyError):
+        water_elements.intern('Juice')
+
+
+def test_frozen_elements(water_states, water_strings):
+    elements = Elements(water_states, water_strings, frozen=True)
+    water = elements['Water']
+
+    assert elements.frozen
+    assert elements.strings.frozen
+    assert water.pretty_name == 'Water (pretty)'
+    assert water.low_transition.target is elements['Ice']
+
+    with pytest.raises(FrozenInstanceError):
+        water.pretty_name = 'Juice'
+
+    with pytest.raises(FrozenInstanceError):
+        del water.mass_per_tile
+
+    with pytest.raises(FrozenInstanceError):
+        water.low_transition.target = elements['Steam']
+
+    with pytest.raises(TypeError):
+        elements._id_map['Juice'] = water  # pylint: disable=protected-access
+
+
+def test_unfrozen_elements(water_elements):
+    assert not water_elements.frozen
+    water_elements['Water'].pretty_name = 'Juice'
+    del water_elements['Water'].mass_per_tile
+
+
+def test_pickle_elements(water_states, water_strings, frozen):
+    elements = Elements(water_states, water_strings, frozen=frozen)
+    data = pickle.dumps(elements)
+    restored = pickle.loads(data)
+
+    assert b'pint' not in data
+    assert restored.frozen == frozen
+    assert restored.strings.frozen == frozen
+    assert list(restored) == list(elements)
+    for elem in elements:
+        copy = restored[elem.name]
+        assert copy.pretty_name == elem.pretty_name
+        assert copy.state == elem.state
+        assert copy.thermal_conductivity == elem.thermal_conductivity
+        assert copy.mass_per_tile == elem.mass_per_tile
+        assert copy.low_transition == elem.low_transition
+        assert copy.high_transition == elem.high_transition
+
+    water = restored['Water']
+    assert water.low_transition.target is restored['Ice']
+    assert restored['Ice'].high_transition.target is water
+    assert restored.pretty_name('Water') == 'Water (pretty)'
+    assert restored.find(OP.is_liquid()) == [water]
+
+
+def test_pickle_element(water_states):
+    ice, water, _ = water_states
+    ice._freeze()  # pylint: disable=protected-access
+    restored = pickle.loads(pickle.dumps(water))
+
+    assert restored == water
+    assert restored.molar_mass == water.molar_mass
+    assert restored.low_transition.target == 'Ice'
+    assert restored.low_transition.temperature == Q(0, '°C')
+
+    with pytest.raises(FrozenInstanceError):
+        pickle.loads(pickle.dumps(ice)).pretty_name = 'Juice'
+
+
+def test_copy_element(water_states):
+    ice, water, _ = water_states
+    water.thermal_conductivity = Q(0.6, 'W/(m K)')
+
+    shallow = copy.copy(water)
+    assert shallow.low_transition is water.low_transition
+
+    deep = copy.deepcopy(water)
+    assert deep.thermal_conductivity.units == Unit('W/(m K)')
+    assert deep.low_transition is not water.low_transition
+    assert deep.low_transition.target.name == 'Ice'
+    assert deep.low_transition.target.high_transition.target is deep
+    assert str(deep.low_transition) == str(water.low_transition)
+
+    ice._freeze()  # pylint: disable=protected-access
+    with pytest.raises(FrozenInstanceError):
+        copy.deepcopy(ice).pretty_name = 'Juice'
+
+
+def test_copy_decoded(water_states, water_strings):
+    elements = Elements(water_states, water_strings, frozen=True)
+    packed = ColumnarElements(elements.columns)
+    water = copy.deepcopy(packed['Water'])
+
+    assert type(water.low_transition) is Transition
+    assert water.low_transition.target == elements['Ice']
+    assert water.low_transition.target.high_transition.target is water
+
+
+def test_frozen_concurrent_readers(water_states, water_strings):
+    elements = Elements(water_states, water_strings, frozen=True)
+    pattern = re.compile('pretty')
+    pred = OP.is_liquid() & OP.stable_at(Q(50, '°C'))
+    expected = {'Water': elements['Water']}
+    errors = []
+    barrier = threading.Barrier(16)
+
+    def hammer():
+        try:
+            barrier.wait()
+            for _ in range(200):
+                assert elements.find('Wat') == [expected['Water']]
+                assert len(elements.find(pattern)) == 3
+                assert elements.find(pred)[0] is expected['Water']
+                assert elements.get('Ice').high_transition.target \
+                    is expected['Water']
+                assert elements.strings['STRINGS.ELEMENTS.WATER.NAME'] \
+                    == 'Water (pretty)'
+                assert len(list(elements.strings.values())) == 3
+        except Exception as e:  # pylint: disable=broad-except
+            errors.append(e)
+
+    threads = [threading.Thread(target=hammer) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from oniref.columns import ColumnarElements, ElementColumns
+from oniref.export import STATE_CATEGORIES, export, to_arrow, to_pandas
+
+
+@pytest.fixture(name='packed')
+def packed_fixture(frozen_elements):
+    return ColumnarElements(
+        ElementColumns.from_buffer(frozen_elements.columns.to_bytes())
+    )
+
+
+def test_shares_memory(frozen_elements):
+    table = export(frozen_elements)
+    columns = frozen_elements.columns
+    assert len(table) == 3
+    assert table.numeric['thermal_conductivity'] is \
+        columns['thermal_conductivity']
+    assert table.units['specific_heat_capacity'] == 'DTU/g/°C'
+    assert not table.numeric['molar_mass'].flags.writeable
+    assert export(frozen_elements).name_buffers()[1] is table.name_buffers()[1]
+
+
+def test_codes(frozen_elements):
+    table = export(frozen_elements)
+    assert [STATE_CATEGORIES[c] for c in table.state.codes] == \
+        ['Solid', 'Liquid', 'Gas']
+    assert table.name.codes.tolist() == [0, 1, 2]
+    assert list(table.names) == ['Ice', 'Water', 'Steam']
+    targets = table.references['high_transition.target']
+    assert targets.codes.tolist() == [1, 2, -1]
+    assert targets.categories is table.names
+
+
+def test_string_buffers(frozen_elements, packed):
+    for elements in (frozen_elements, packed):
+        offsets, data = export(elements).pretty_name_buffers()
+        assert offsets.dtype == np.dtype('<i8')
+        assert data[offsets[1]:offsets[2]].tobytes() == b'Water (pretty)'
+
+    packed_data = packed.columns.string_buffers('name')[1]
+    assert export(packed).name_buffers()[1] is packed_data
+
+
+def test_unfrozen(water_elements):
+    table = export(water_elements)
+    assert table.numeric['thermal_conductivity'].tolist() == \
+        pytest.approx([2.18, 0.609, 0.184])
+
+
+def test_pandas(frozen_elements):
+    pytest.importorskip('pandas')
+    frame = to_pandas(frozen_elements)
+    assert list(frame.index) == ['Ice', 'Water', 'Steam']
+    assert list(frame['state']) == ['Solid', 'Liquid', 'Gas']
+    assert frame.loc['Water', 'high_transition.target'] == 'Steam'
+    assert np.isnan(frame.loc['Steam', 'mass_per_tile'])
+    assert frame.attrs['units']['mass_per_tile'] == 'kg'
+    assert np.shares_memory(frame['thermal_conductivity'].to_numpy(),
+                            frozen_elements.columns['thermal_conductivity'])
+
+
+def test_arrow(packed):
+    pytest.importorskip('pyarrow')
+    table = to_arrow(packed)
+    assert table.column('name').to_pylist() == ['Ice', 'Water', 'Steam']
+    assert table.column('state').to_pylist() == ['Solid', 'Liquid', 'Gas']
+    assert table.column('high_transition.target').to_pylist() == \
+        ['Water', 'Steam', None]
+    assert table.column('mass_per_tile').to_pylist()[2] is None
+    assert table.schema.field('molar_mass').metadata == \
+        {b'unit': b'g/mol'}
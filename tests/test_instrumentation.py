@@ -0,0 +1,76 @@
+import re
+
+from oniref import instrumentation as OI
+from oniref.elements import Elements, State, load_klei_definitions
+from oniref.predicates import Element, Predicate, is_liquid
+
+
+def test_disabled_span_is_shared():
+    assert not OI.enabled()
+    assert OI.span('foo') is OI.span('bar')
+
+    with OI.span('foo') as phase:
+        phase.set(ignored=1)
+
+
+def test_instrument_scoped():
+    events = []
+    with OI.instrument(events.append):
+        assert OI.enabled()
+        with OI.span('foo', a=1) as phase:
+            phase.set(b=2)
+
+    assert not OI.enabled()
+    OI.emit('ignored')
+
+    assert len(events) == 1
+    assert events[0].name == 'foo'
+    assert events[0].data == {'a': 1, 'b': 2}
+    assert events[0].elapsed >= 0
+
+
+def test_load_phases(oni_install_dir):
+    recorder = OI.Recorder()
+    with OI.instrument(recorder):
+        load_klei_definitions(oni_install_dir)
+
+    assert recorder['load'].calls == 1
+    assert recorder['load.yaml'].calls == 3
+    assert recorder['load.decode'].counters == {'elements': 3}
+    assert recorder['load.strings'].counters == {'strings': 3}
+    assert recorder['load.resolve'].counters == {'elements': 3}
+    assert recorder['strings.strip'].calls == 3
+    assert recorder['load'].elapsed >= recorder['load.resolve'].elapsed
+
+
+def test_find_counters(water_elements):
+    recorder = OI.Recorder()
+    with OI.instrument(recorder):
+        water_elements.find(is_liquid())
+        water_elements.find(re.compile('e'))
+
+    assert 'load' not in recorder
+    assert recorder['elements.match.elements'].counters == \
+        {'scanned': 3, 'matched': 1}
+    assert recorder['elements.match.text'].counters == \
+        {'scanned': 3, 'matched': 3}
+
+
+def test_query_paths(water_states, water_strings):
+    frozen = Elements(water_states, water_strings, frozen=True)
+    recorder = OI.Recorder()
+    with OI.instrument(recorder):
+        assert frozen.count(is_liquid()) == 1
+        assert frozen.any(Element.state == State.Gas)
+        assert frozen.first(Predicate(lambda e: e.name != 'Ice')).name == \
+            'Water'
+        assert len(list(frozen.iter_find('Steam'))) == 1
+
+    vectorized = recorder['elements.match.vectorized']
+    assert vectorized.calls == 2
+    assert vectorized.counters == {'scanned': 6, 'matched': 2}
+    # Stopping at the first match only scans up to it.
+    assert recorder['elements.match.elements'].counters == \
+        {'scanned': 2, 'matched': 1}
+    assert recorder['elements.match.text'].counters == \
+        {'scanned': 3, 'matched': 1}
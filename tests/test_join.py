@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+import random
+
+import numpy as np
+import pytest
+
+from oniref.join import covers, join, join_positions, on
+from oniref.predicates import Element, is_liquid, low_temp
+from oniref.units import Q
+
+
+def _thing(low, high, conductivity):
+    def transition(temp):
+        if temp is None:
+            return None
+        return SimpleNamespace(temperature=Q(temp, '°C'))
+
+    return SimpleNamespace(low_transition=transition(low),
+                           high_transition=transition(high),
+                           thermal_conductivity=Q(conductivity, 'W/(m K)'))
+
+
+def _random_things(rng, count):
+    things = []
+    for _ in range(count):
+        low = rng.choice([None, rng.randint(-100, 100)])
+        high = rng.choice([None, (low or -100) + rng.randint(0, 150)])
+        things.append(_thing(low, high, rng.randint(0, 5)))
+    return things
+
+
+def _bounds(thing):
+    low = thing.low_transition
+    high = thing.high_transition
+    return (low.temperature.m if low else -np.inf,
+            high.temperature.m if high else np.inf)
+
+
+def test_covers_matches_brute_force():
+    rng = random.Random(1)
+    left = _random_things(rng, 60)
+    right = _random_things(rng, 50)
+    conductivity = Element.thermal_conductivity
+
+    pairs = join(left, right, *covers(), on(conductivity, '>', conductivity))
+
+    expected = [(a, b) for a in left for b in right
+                if _bounds(a)[0] <= _bounds(b)[0]
+                and _bounds(b)[1] <= _bounds(a)[1]
+                and a.thermal_conductivity > b.thermal_conductivity]
+    assert pairs == expected
+    assert expected
+
+
+@pytest.mark.parametrize('op', ['<', '<=', '>', '>=', '=='])
+def test_operators_match_brute_force(op):
+    rng = random.Random(op)
+    left = _random_things(rng, 40)
+    right = _random_things(rng, 40)
+    conductivity = Element.thermal_conductivity
+
+    lefts, rights = join_positions(left, right,
+                                   on(conductivity, op, conductivity))
+
+    compare = {'<': np.less, '<=': np.less_equal, '>': np.greater,
+               '>=': np.greater_equal, '==': np.equal}[op]
+    expected = [(i, j) for i, a in enumerate(left)
+                for j, b in enumerate(right)
+                if compare(a.thermal_conductivity.m,
+                           b.thermal_conductivity.m)]
+    assert list(zip(lefts.tolist(), rights.tolist())) == expected
+
+
+def test_missing_fails_without_default():
+    left = [_thing(None, None, 1), _thing(0, 10, 1)]
+    right = [_thing(5, 6, 1)]
+    pairs = join_positions(left, right, on(low_temp(), '<', low_temp()))
+    assert pairs[0].tolist() == [1]
+
+
+def test_join_elements(elements):
+
+    # Only water's liquid range covers its own.
+    pairs = join(elements.find(is_liquid()), elements, *covers())
+    assert pairs == [(elements['Water'], elements['Water'])]
+
+    pairs = join(elements, elements, *covers())
+    assert (elements['Steam'], elements['Steam']) in pairs
+    assert (elements['Water'], elements['Steam']) not in pairs
+
+
+def test_join_needs_condition(water_elements):
+    with pytest.raises(ValueError):
+        join(water_elements, water_elements)
+
+    with pytest.raises(ValueError):
+        on(Element.molar_mass, '!=', Element.molar_mass)
@@ -1,4 +1,8 @@
 from io import StringIO
+import pickle
+import re
+
+from polib import POEntry, POFile
 import pytest
 import yaml
 
@@ -6,6 +10,18 @@ import oniref.elements as OE
 from oniref.units import Q
 
 
+def _definition(name, **extra):
+    return {'elementId': name,
+            'state': 'Liquid',
+            'specificHeatCapacity': 1,
+            'thermalConductivity': 1,
+            'molarMass': 1,
+            'localizationID': name,
+            'radiationAbsorptionFactor': 1,
+            'radiationPer1000Mass': 0,
+            **extra}
+
+
 def test_load_simple():
     contents = StringIO(
         yaml.dump(
@@ -56,6 +72,34 @@ def test_missing_key():
     assert "foo" in str(exc)
 
 
+def test_bad_definitions_reported_together():
+    contents = StringIO(yaml.dump({"elements": [
+        {"elementId": "foo"},
+        _definition('Good'),
+        _definition('Bad', state='Plasma'),
+        _definition('Worse', molarMass='heavy'),
+    ]}))
+
+    with pytest.raises(OE.BadDefinitionsError) as exc:
+        OE.load_klei_definitions_from_file(contents)
+
+    assert ([e.elem for e in exc.value.errors]
+            == ['foo', 'Bad', 'Worse'])
+
+
+def test_iter_definitions_bad():
+    contents = yaml.dump({"elements": [
+        _definition('A'), {"elementId": "foo"}, _definition('B'),
+    ]})
+
+    stream = OE.iter_klei_definitions(contents)
+    assert next(stream).name == 'A'
+    assert next(stream).name == 'B'
+    with pytest.raises(OE.BadDefinitionsError) as exc:
+        next(stream)
+    assert [e.elem for e in exc.value.errors] == ['foo']
+
+
 def test_missing_elements():
     contents = StringIO(yaml.dump({}))
 
@@ -63,6 +107,50 @@ def test_missing_elements():
         OE.load_klei_definitions_from_file(contents)
 
 
+def test_iter_definitions():
+    contents = StringIO(
+        yaml.dump({'other': [1, 2],
+                   'elements': [_definition('A', highTemp=300,
+                                            highTempTransitionTarget='B'),
+                                _definition('B')]})
+        + '---\n'
+        + yaml.dump({'elements': [_definition('C')]})
+    )
+
+    stream = OE.iter_klei_definitions(contents)
+    first = next(stream)
+    assert first.name == 'A'
+    assert first.high_transition.target == 'B'
+    assert [elem.name for elem in stream] == ['B', 'C']
+
+
+def test_iter_definitions_resolve():
+    contents = yaml.dump({'elements': [
+        _definition('A', highTemp=300, highTempTransitionTarget='B'),
+        _definition('B'),
+    ]})
+
+    elements = OE.Elements(OE.iter_klei_definitions(contents),
+                           OE.KleiStrings({}))
+    assert elements['A'].high_transition.target is elements['B']
+
+
+def test_iter_definitions_missing_elements():
+    with pytest.raises(OE.MissingElementsError):
+        list(OE.iter_klei_definitions(yaml.dump({'other': []})))
+
+    with pytest.raises(OE.MissingElementsError):
+        list(OE.iter_klei_definitions('[1, 2]'))
+
+
+def test_iter_definition_files(oni_install_dir, water_states):
+    paths, _ = OE.asset_paths(oni_install_dir)
+    result = list(OE.iter_klei_definition_files(paths))
+
+    assert result == [water_states[2], water_states[1], water_states[0]]
+    assert result[1].low_transition.target == 'Ice'
+
+
 def test_load_all(oni_install_dir, water_states):
     result = OE.load_klei_definitions(oni_install_dir)
 
@@ -73,3 +161,48 @@ def test_load_all(oni_install_dir, water_states):
 
 def test_load_str_path(oni_install_dir):
     OE.load_klei_definitions(str(oni_install_dir))
+
+
+def test_load_frozen(oni_install_dir):
+    result = OE.load_klei_definitions(oni_install_dir, frozen=True)
+
+    assert result.frozen
+    assert result['Water'].pretty_name == 'Water (pretty)'
+
+
+def _add_catalog(oni_install_dir, locale, translations):
+    strings_dir = (oni_install_dir / 'OxygenNotIncluded_Data'
+                   / 'StreamingAssets' / 'strings')
+    po = POFile()
+    for key, text in translations.items():
+        po.append(POEntry(msgctxt=key, msgid='', msgstr=text))
+    po.save(strings_dir / f'strings_preinstalled_{locale}_klei.po')
+
+
+@pytest.mark.parametrize('frozen', [False, True])
+def test_load_localized(oni_install_dir, frozen):
+    _add_catalog(oni_install_dir, 'es',
+                 {'STRINGS.ELEMENTS.WATER.NAME': 'Agua <b>(bonita)</b>'})
+    result = OE.load_klei_definitions(oni_install_dir, frozen=frozen)
+    assert result.strings.locales == ['es']
+
+    spanish = result.localized('es')
+    assert spanish.pretty_name('Water') == 'Agua (bonita)'
+    assert spanish.pretty_name(result['Ice']) == 'Ice (pretty)'
+    assert spanish.find('Agua') == [result['Water']]
+    assert spanish.find('Agua')[0] is result['Water']
+    assert spanish.count(re.compile('pretty')) == 2
+
+    # The elements themselves are untouched.
+    assert result['Water'].pretty_name == 'Water (pretty)'
+    assert result.pretty_name('Water') == 'Water (pretty)'
+    assert result.find('Agua') == []
+    assert spanish.strings is result.strings.locale('es')
+
+    restored = pickle.loads(pickle.dumps(spanish))
+    assert restored.pretty_name('Water') == 'Agua (bonita)'
+    assert restored.find('Agua') == [restored['Water']]
+    assert restored.frozen == frozen
+
+    with pytest.raises(KeyError):
+        result.localized('fr')
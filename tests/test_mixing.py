@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from oniref.elements import Element, Elements, State, Transition
+from oniref.mixing import equilibrium, mix
+from oniref.units import Q
+
+
+def _element(name, state, shc):
+    return Element(name,
+                   f'STRINGS.ELEMENTS.{name.upper()}.NAME',
+                   state,
+                   Q(shc, 'DTU/g/°C'),
+                   Q(1, 'DTU/(m s)/°C'),
+                   Q(18, 'g/mol'),
+                   Q(0.8, 'dimensionless'),
+                   Q(0, 'rads/kg'))
+
+
+@pytest.fixture(name='elements')
+def elements_fixture(water_states, water_strings, frozen):
+    ice, water, steam = water_states
+    salt_water = _element('SaltWater', State.Liquid, 4.1)
+    salt = _element('Salt', State.Solid, 0.7)
+    salt_water.high_transition = Transition(Q(100.0, 'degC'), steam,
+                                            salt, 0.07)
+    return Elements([ice, water, steam, salt_water, salt], water_strings,
+                    frozen=frozen)
+
+
+def _masses(products):
+    return {name: mass.to('kg').m for name, mass in products.items()}
+
+
+def test_single_element(elements):
+    result = equilibrium(elements, [['Water', 'Water']], [[1.0, 3.0]],
+                         Q(np.array([[20.0, 60.0]]), '°C'))
+    assert result.temperatures.to('°C').m == pytest.approx([50.0])
+    assert _masses(result.products(0)) == pytest.approx({'Water': 4.0})
+
+
+def test_melting(elements):
+    result = mix(elements, [[('Ice', Q(1, 'kg'), Q(-30, '°C')),
+                             ('Water', Q(10, 'kg'), Q(20, '°C'))]])
+    # The ice warms to 0 °C at its own heat capacity, then as water.
+    expected = (10 * 4.179 * 20 - 2.05 * 30) / (11 * 4.179)
+    assert result.temperature == pytest.approx([expected])
+    assert _masses(result.products(0)) == pytest.approx({'Water': 11.0})
+
+
+def test_ore_byproduct(elements):
+    result = mix(elements, [[('SaltWater', 1.0, 99.0),
+                             ('Steam', 100.0, 300.0)]])
+    (temperature,) = result.temperature
+    assert temperature > 100.0
+    assert _masses(result.products(0)) == pytest.approx(
+        {'Steam': 100.93, 'Salt': 0.07}
+    )
+
+    heat = (1.0 * 4.1 * 1.0
+            + 0.93 * 4.179 * (temperature - 100.0)
+            + 0.07 * 0.7 * (temperature - 100.0))
+    assert heat == pytest.approx(100.0 * 4.179 * (300.0 - temperature))
+
+
+def test_unstable_input(elements):
+    result = mix(elements, [[(elements['Ice'], 2.0, 50.0)]])
+    assert result.temperature == pytest.approx([50.0])
+    assert _masses(result.products(0)) == pytest.approx({'Water': 2.0})
+
+
+def test_batch_matches_single(elements):
+    rng = np.random.default_rng(0)
+    names = np.array(['Ice', 'Water', 'Steam', 'SaltWater', 'Salt'])
+    cells = names[rng.integers(0, len(names), (500, 3))]
+    masses = rng.uniform(0, 10, (500, 3))
+    temps = rng.uniform(-50, 250, (500, 3))
+    result = equilibrium(elements, cells, masses, temps)
+    assert len(result) == 500
+    assert result.masses.sum(1) == pytest.approx(masses.sum(1))
+
+    for i in range(0, 500, 50):
+        single = equilibrium(elements, cells[i], masses[i], temps[i])
+        assert single.temperature[0] == pytest.approx(result.temperature[i])
+        assert single.masses[0] == pytest.approx(result.masses[i])
+
+
+def test_ragged_and_empty(elements):
+    result = mix(elements, [[('Water', 1.0, 10.0)],
+                            [],
+                            [('Water', 1.0, 10.0), ('Water', 1.0, 30.0)]])
+    assert result.temperature[0] == pytest.approx(10.0)
+    assert np.isnan(result.temperature[1])
+    assert result.products(1) == {}
+    assert result.temperature[2] == pytest.approx(20.0)
+
+    with pytest.raises(KeyError):
+        mix(elements, [[('Unobtanium', 1.0, 10.0)]])
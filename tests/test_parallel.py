@@ -0,0 +1,153 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+import multiprocessing
+import pickle
+import subprocess
+import sys
+import time
+
+import pytest
+
+from oniref import Elements
+from oniref import predicates as OP
+from oniref.derived import STANDARD
+from oniref.parallel import PredicateError, chunk_size
+from oniref.units import Q
+
+
+def _slow_liquid(elem):
+    time.sleep(0.002)
+    return elem.state.name == 'Liquid'
+
+
+def _hot_liquid(elem):
+    return _slow_liquid(elem) and elem.tile_heat_capacity > Q(1e6, 'DTU/°C')
+
+
+def _fails_on_steam(elem):
+    if elem.name == 'Steam':
+        raise ValueError('too hot')
+    return True
+
+
+@pytest.fixture(name='many')
+def many_fixture(water_states, water_strings):
+    # The same three elements under many names, to make many chunks.
+    elements = [replace(elem, name=f'{elem.name}{i}',
+                        low_transition=None, high_transition=None)
+                for i in range(40) for elem in water_states]
+    return Elements(elements, water_strings, frozen=True)
+
+
+def test_chunk_size():
+    assert chunk_size(1000, 0.001, 4) == 20
+    assert chunk_size(1000, 1.0, 4) == 1
+    assert chunk_size(100, 1e-6, 4) == 7
+
+
+@pytest.mark.parametrize('size', [None, 1, 7, 1000])
+def test_find_threads(many, size):
+    expected = many.find(_slow_liquid)
+    with ThreadPoolExecutor(4) as pool:
+        result = many.find(_slow_liquid, executor=pool, chunk_size=size)
+
+    assert result == expected
+    assert all(a is b for a, b in zip(result, expected))
+    assert len(result) == 40
+
+
+def test_find_processes(many, water_elements):
+    pred = OP.is_liquid() & (OP.Element.molar_mass > Q(18, 'g/mol'))
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(2, mp_context=context) as pool:
+        result = many.find(_slow_liquid, executor=pool)
+        assert many.find(pred, executor=pool, chunk_size=16) \
+            == many.find(pred)
+        assert many.find('Ice1', executor=pool) == many.find('Ice1')
+
+        with pytest.raises(PredicateError) as exc:
+            water_elements.find(_fails_on_steam, executor=pool,
+                                chunk_size=1)
+
+    assert result == many.find(OP.is_liquid())
+    assert exc.value.element is water_elements['Steam']
+    assert str(exc.value.inner) == 'too hot'
+
+
+class _RecordingPool(ProcessPoolExecutor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.payloads = []
+
+    def submit(self, fn, /, *args, **kwargs):
+        self.payloads.append(len(pickle.dumps(args)))
+        return super().submit(fn, *args, **kwargs)
+
+
+def test_processes_share_columns(many):
+    context = multiprocessing.get_context('spawn')
+    with _RecordingPool(2, mp_context=context) as pool:
+        result = many.find(_slow_liquid, executor=pool, chunk_size=1)
+
+    assert result == many.find(OP.is_liquid())
+    assert len(pool.payloads) == len(many)
+    # Each chunk carries the block's name, not the packed columns.
+    assert max(pool.payloads) < len(many.columns.to_bytes()) // 10
+
+
+def test_processes_derived(many):
+    many.derive('tile_heat_capacity', STANDARD['tile_heat_capacity'][0])
+    pred = OP.Predicate(_slow_liquid) \
+        & (OP.Element.tile_heat_capacity > Q(1e6, 'DTU/°C'))
+    context = multiprocessing.get_context('spawn')
+    with _RecordingPool(2, mp_context=context) as pool:
+        # Workers don't have derived attributes, so predicates reading
+        # them are evaluated here.
+        assert many.find(pred, executor=pool, chunk_size=1) \
+            == many.find(pred)
+        assert pool.payloads == []
+
+        with pytest.raises(PredicateError) as exc:
+            many.find(_hot_liquid, executor=pool, chunk_size=1)
+
+    assert isinstance(exc.value.inner, AttributeError)
+    assert 'only available in the process' in str(exc.value.inner)
+
+
+_FIND_IN_POOL = """
+import multiprocessing, pickle, sys
+from concurrent.futures import ProcessPoolExecutor
+from oniref.predicates import is_liquid
+
+elements = pickle.load(sys.stdin.buffer)
+context = multiprocessing.get_context(sys.argv[1])
+with ProcessPoolExecutor(2, mp_context=context) as pool:
+    matches = elements.find(is_liquid(), executor=pool, chunk_size=1)
+print(' '.join(e.name for e in matches))
+"""
+
+
+@pytest.mark.parametrize('method', ['fork', 'spawn'])
+def test_processes_quiet(water_elements, method):
+    # The resource tracker reports blocks unlinked behind its back on
+    # its own stderr, so run in a process whose stderr is captured.
+    if method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f'no {method} start method')
+    done = subprocess.run([sys.executable, '-c', _FIND_IN_POOL, method],
+                          input=pickle.dumps(water_elements),
+                          capture_output=True, check=True, timeout=60)
+
+    assert done.stdout.decode().split() == ['Water']
+    assert done.stderr.decode() == ''
+
+
+@pytest.mark.parametrize('size', [None, 2])
+def test_find_error(water_elements, size):
+    with ThreadPoolExecutor(2) as pool:
+        with pytest.raises(PredicateError) as exc:
+            water_elements.find(_fails_on_steam, executor=pool,
+                                chunk_size=size)
+
+    assert exc.value.element is water_elements['Steam']
+    assert isinstance(exc.value.inner, ValueError)
+    assert isinstance(exc.value.__cause__, ValueError)
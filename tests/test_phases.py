@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from oniref.elements import State
+from oniref.phases import iter_phase_map, phase_map
+from oniref.predicates import stable_at
+from oniref.units import Q
+
+TEMPS = Q(np.array([-10.0, 0.0, 50.0, 100.0, 150.0]), '°C')
+
+
+def test_stable_matches_predicate(elements):
+    result = phase_map(elements, TEMPS)
+    assert result.shape == (3, 5)
+    for j, temp in enumerate(TEMPS):
+        pred = stable_at(temp)
+        assert result[:, j].tolist() == [bool(pred(e)) for e in elements]
+
+
+def test_states(elements):
+    result = phase_map(elements, TEMPS.to('K'), states=True)
+    solid, liquid, gas = (State.Solid.value, State.Liquid.value,
+                          State.Gas.value)
+
+    expected = [[solid, solid, liquid, liquid, gas],
+                [solid, liquid, liquid, liquid, gas],
+                [solid, liquid, liquid, gas, gas]]
+    assert result.tolist() == expected
+
+
+@pytest.mark.parametrize('states', [False, True])
+def test_chunks(elements, states):
+    whole = phase_map(elements, TEMPS, states=states)
+    assert (phase_map(elements, TEMPS, states, chunk_size=2) == whole).all()
+
+    chunks = list(iter_phase_map(elements, TEMPS, states, chunk_size=2))
+    assert ([chunk for chunk, _ in chunks]
+            == [slice(0, 2), slice(2, 4), slice(4, 5)])
+    assert (np.hstack([block for _, block in chunks]) == whole).all()
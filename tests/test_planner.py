@@ -0,0 +1,152 @@
+import pytest
+
+from oniref import expressions as ex
+from oniref import planner
+from oniref.predicates import (Element, Predicate, is_liquid, is_solid,
+                               low_temp, stable_at, stable_over)
+from oniref.units import Q
+
+
+def _slow(e):
+    return e.molar_mass > Q(1, 'g/mol')
+
+
+def test_sample():
+    assert planner.sample(range(3), 5) == [0, 1, 2]
+    assert planner.sample(range(100), 4) == [0, 25, 50, 75]
+
+
+def test_reorders_by_cost(water_elements):
+    pred = stable_over(Q(10, '°C'), Q(90, '°C')) & is_liquid()
+    optimized = pred.optimize(water_elements)
+
+    assert str(optimized).startswith('Element.state == State.Liquid and ')
+    for elem in water_elements:
+        assert bool(optimized(elem)) == bool(pred(elem))
+
+
+def test_reorders_by_selectivity(water_elements):
+    # Both operands cost the same; the one that rejects more goes first
+    # in an `and` and the one that accepts more goes first in an `or`.
+    common = Element.name.In('Ice', 'Water')
+    rare = is_solid()
+
+    assert str((common & rare).optimize(water_elements)) \
+        == str(rare & common)
+    assert str((rare | common).optimize(water_elements)) \
+        == str(common | rare)
+
+
+def test_keeps_order(water_elements):
+    pred = is_liquid() & stable_at(Q(50, '°C'))
+    assert pred.optimize(water_elements)._node is pred._node
+
+    leaf = is_liquid()
+    assert leaf.optimize(water_elements)._node is leaf._node
+
+
+def test_nested_reorder(water_elements):
+    pred = ~(is_solid() & (stable_at(Q(50, '°C')) | is_liquid()))
+    optimized = pred.optimize(water_elements)
+
+    assert isinstance(optimized._node, ex.Not)
+    assert str(optimized).startswith(
+        'not (Element.state == State.Solid and '
+        '(Element.state == State.Liquid or '
+    )
+    for elem in water_elements:
+        assert bool(optimized(elem)) == bool(pred(elem))
+
+
+def test_keeps_raising_operands(water_elements):
+    # The comparison raises for Ice, which has no low transition, before
+    # the state is checked. Checking the state first would hide that.
+    pred = (Element.low_transition.temperature < Q(50, '°C')) | is_solid()
+    assert pred.optimize(water_elements)._node is pred._node
+    with pytest.raises(AttributeError):
+        water_elements.find(pred)
+
+    # Opaque callables may raise too, so operands only move among those
+    # on the same side of them.
+    pred = Predicate(_slow) & stable_at(Q(50, '°C')) & is_liquid()
+    assert str(pred.optimize(water_elements)).startswith(
+        '<unknown attribute> and Element.state == State.Liquid and '
+    )
+
+
+def test_guarded_paths(water_elements):
+    # The comparison can't raise once the guard before it has passed,
+    # so the pair can move as a whole, but not apart.
+    guarded = low_temp().Is(None) | (low_temp() < Q(50, '°C'))
+    pred = guarded & is_liquid()
+    assert str(pred.optimize(water_elements)).startswith(
+        'Element.state == State.Liquid and '
+    )
+
+    swapped = (low_temp() < Q(50, '°C')) | low_temp().Is(None)
+    assert swapped.optimize(water_elements)._node is swapped._node
+
+
+def test_measures_once(water_elements):
+    calls = []
+
+    def slow(e):
+        calls.append(e.name)
+        return e.state.value > 1
+
+    pred = is_solid() | (is_liquid() & (Predicate(slow) | is_solid()))
+    elements = list(water_elements) * 10
+    pred.optimize(elements)
+    assert len(calls) == planner.OPAQUE_SAMPLE_SIZE
+
+    calls.clear()
+    pred.optimize(list(water_elements))
+    assert calls == ['Ice', 'Water', 'Steam']
+
+
+@pytest.mark.parametrize('pred', [
+    stable_at(Q(50, '°C')),
+    stable_over(Q(-273, '°C'), Q(-10, '°C')) & is_solid(),
+    Predicate(_slow) & stable_over(Q(10, '°C'), Q(90, '°C')) & is_liquid(),
+    ~is_liquid() | Predicate(_slow),
+])
+def test_same_results(water_elements, pred):
+    optimized = pred.optimize(water_elements)
+    for elem in water_elements:
+        assert bool(optimized(elem)) == bool(pred(elem))
+
+
+def test_find_caches_plan(water_elements):
+    pred = Predicate(_slow) & is_liquid()
+    assert water_elements.find(pred) == [water_elements['Water']]
+    assert pred._node in water_elements._plans  # pylint: disable=W0212
+
+    assert water_elements.find(is_liquid()) == [water_elements['Water']]
+    assert is_liquid()._node not in water_elements._plans  # noqa: E501 pylint: disable=W0212
+
+
+def test_plan_cache_bounded(water_elements, monkeypatch):
+    monkeypatch.setattr(planner, 'MAX_CACHED_PLANS', 2)
+    for i in range(5):
+        water_elements.find(is_liquid() & (Element.name == str(i)))
+
+    assert len(water_elements._plans) <= 2  # pylint: disable=W0212
+
+
+def test_explain(water_elements):
+    pred = stable_at(Q(50, '°C')) & is_liquid() & Predicate(_slow)
+    lines = pred.explain(water_elements).splitlines()
+
+    assert lines[0] == 'and  [evaluated 3, passed 1 (33%)]'
+    assert lines[1] == \
+        '  Element.state == State.Liquid  [evaluated 3, passed 1 (33%)]'
+    assert any('or' in line for line in lines)
+    assert lines[-1].startswith('  <unknown attribute>  [evaluated 1')
+
+
+def test_explain_errors(water_elements):
+    pred = ~(low_temp() < Q(50, '°C'))
+    lines = pred.explain(water_elements).splitlines()
+
+    assert 'raised 1' in lines[0]
+    assert 'raised 1' in lines[1]
@@ -1,12 +1,18 @@
+import pickle
+
+from pint import DimensionalityError
 import pytest
 
 from oniref import Quantity
+from oniref.elements import State
+from oniref.units import Q
 from oniref.predicates import (Predicate, Attribute, OptionalAttribute,
                                And, Or, Not,
                                optional,
                                is_solid, is_liquid, is_gas,
                                low_temp, high_temp,
                                stable_at, stable_over,
+                               from_data, from_json,
                                Element)
 
 
@@ -132,6 +138,22 @@ def test_attr_in(water):
     assert not pred(water)
 
 
+def test_attr_in_set(water_elements):
+    water, ice = water_elements['Water'], water_elements['Ice']
+    assert Element.name.In('Ice', 'Water')(water)
+    assert not Element.name.In({'Ice', 'Steam'})(water)
+    assert Attribute(lambda e: e).In([ice, water])(water)
+    assert optional(Element.low_transition).target.In(ice, None)(water)
+
+    # Containment in a single string, and unhashable values, still work.
+    assert Element.name.In('Waterfall')(water)
+    assert Attribute(lambda e: [1]).In([1], [2])(water)
+
+    # Quantities equal across units hash differently, so aren't hashed.
+    assert Element.mass_per_tile.In(Quantity(1000000, 'g'))(water)
+    assert Attribute(lambda e: Quantity(0, 'kg')).In(0, 1)(water)
+
+
 def test_attr_chain(water_elements):
     attr = Attribute(lambda e: e.low_transition)
 
@@ -287,10 +309,171 @@ def test_opt_call_expr(water):
     assert attr.to('pound').m(water) is None
 
 
-@pytest.mark.xfail(
-    reason='Predicate operators fail for null OptionalAttributes.'
-)
 def test_issue_1(water_elements):
     pred = (optional(Element.low_transition).target
             == water_elements['Water'])
     assert not pred(water_elements['Ice'])
+
+
+def test_pred_flatten():
+    a, b, c = is_solid(), is_liquid(), is_gas()
+    # pylint: disable=protected-access
+    assert len(((a & b) & c)._node.operands) == 3
+    assert len((a & (b & c))._node.operands) == 3
+    assert len(((a | b) & c)._node.operands) == 2
+
+
+def test_pred_str():
+    assert (str(is_liquid() & ~is_gas())
+            == 'Element.state == State.Liquid and '
+               'not Element.state == State.Gas')
+    assert (str((is_solid() | is_gas()) & (Element.name.In('Ice', 'Water')))
+            == "(Element.state == State.Solid or Element.state == State.Gas)"
+               " and Element.name in ('Ice', 'Water')")
+    assert (str(~(is_solid() | is_gas()))
+            == 'not (Element.state == State.Solid or '
+               'Element.state == State.Gas)')
+    assert (str(low_temp().to('K') > Quantity(10, '°C'))
+            == "Element.low_transition.?temperature.?to('K') > "
+               "10 degree_Celsius")
+    assert str(Element.name.Is(None)) == 'Element.name is None'
+
+
+def test_pred_structural_equality():
+    # pylint: disable=protected-access
+    at = Quantity(10, '°C')
+    assert (low_temp() < at)._node == (low_temp() < at)._node
+    assert hash((low_temp() < at)._node) == hash((low_temp() < at)._node)
+    assert (low_temp() < at)._node != (high_temp() < at)._node
+    assert Element.name.In([1])._node == Element.name.In([1])._node
+
+    first, second = _Counted(1), _Counted(1)
+    assert Element.name.Is(first)._node != Element.name.Is(second)._node
+
+
+def test_pred_junction_values(water):
+    assert (Predicate(lambda e: 0) & Predicate(lambda e: True))(water) == 0
+    assert (Predicate(lambda e: 5) | Predicate(lambda e: True))(water) == 5
+    assert (Predicate(lambda e: 1) & (lambda e: 2))(water) is True
+    assert (Predicate(lambda e: 0) | (lambda e: 0))(water) is False
+
+
+def test_attr_no_dunder():
+    with pytest.raises(AttributeError):
+        _ = Element.__deepcopy__
+
+    with pytest.raises(AttributeError):
+        _ = Element.name.__deepcopy__
+
+
+class _Counted:
+    def __init__(self, value):
+        self.value = value
+        self.calls = 0
+
+    def measure(self):
+        self.calls += 1
+        return self.value
+
+
+def test_pred_shared_subexpressions():
+    # pylint: disable=protected-access
+    from oniref.expressions import compile_shared
+    measure = Element.measure()
+    pred = ((measure > 5) & (measure < 10)) | (measure == 0)
+    evaluate = compile_shared(pred._node)
+
+    obj = _Counted(7)
+    assert evaluate(obj)
+    assert obj.calls == 1
+
+    obj.value = 0
+    assert evaluate(obj)
+    assert obj.calls == 2
+
+
+def test_pred_shared_stable_over(water_states):
+    _, water, _ = water_states
+    assert stable_over(Quantity(1, '°C'), Quantity(99, '°C'))(water)
+    assert not stable_over(Quantity(-10, '°C'), Quantity(10, '°C'))(water)
+
+
+def test_pred_convert(water_states):
+    ice, water, _ = water_states
+    to_kelvin = low_temp().to('K')
+    assert str(to_kelvin) == "Element.low_transition.?temperature.?to('K')"
+    assert to_kelvin(water) == Q(273.15, 'K')
+    assert to_kelvin(water).units == Q(1, 'K').units
+    assert to_kelvin(ice) is None
+    assert str(Element.molar_mass.to('kg/mol')) \
+        == "Element.molar_mass.to('kg/mol')"
+
+
+def test_pred_compare_units(water):
+    assert (Element.molar_mass == Q(18.01528, 'g/mol'))(water)
+    assert (Element.molar_mass > Q(0.018, 'kg/mol'))(water)
+    assert not (Element.molar_mass == Q(1, 'kg'))(water)
+    with pytest.raises(DimensionalityError):
+        (Element.molar_mass < Q(1, 'kg'))(water)
+
+
+@pytest.mark.parametrize('pred', [
+    stable_over(Quantity(30, 'degC'), Quantity(90, 'degC')),
+    Element.name.In('Ice', 'Water') & ~is_gas(),
+    Element.name.In({'Ice', 'Water'}),
+    Element.molar_mass.to('kg/mol') > Quantity(0.01, 'kg/mol'),
+    optional(Element.low_transition).target.name == 'Ice',
+    Element.ΔT(Quantity(1, 'DTU'), mass=Quantity(1, 'g')).m > 0,
+    Element.state.In([State.Solid, State.Gas]),
+])
+def test_pred_serialize(water_elements, pred):
+    restored = from_json(pred.to_json())
+    assert restored.to_json() == pred.to_json()
+
+    pickled = pickle.loads(pickle.dumps(pred))
+    assert pickled._node == pred._node  # pylint: disable=protected-access
+
+    for elem in water_elements:
+        assert restored(elem) == pred(elem)
+        assert pickled(elem) == pred(elem)
+
+
+def test_pred_data():
+    pred = (optional(Element.low_transition).temperature
+            < Quantity(30, '°C'))
+    assert pred.to_data() == {
+        'attr': 'low_transition.?temperature',
+        'op': '<',
+        'value': {'quantity': [30, 'degree_Celsius']},
+    }
+    assert from_data(pred.to_data())._node == pred._node
+    assert str(from_data(pred.to_data())) == str(pred)
+    assert (Element.name.In('Ice', 'Water').to_json()
+            == '{"attr":"name","op":"in",'
+               '"value":{"tuple":["Ice","Water"]}}')
+
+    with pytest.raises(TypeError):
+        Predicate(lambda e: True).to_data()
+    with pytest.raises(TypeError):
+        (Element.name == object()).to_data()
+
+
+@pytest.mark.parametrize('data', [
+    1, None, {}, {'attr': '_frozen', 'op': '==', 'value': 1},
+    {'attr': 'name', 'op': '!', 'value': 1},
+    {'attr': 'name', 'op': '==', 'value': {'enum': 'Color.Red'}},
+    {'attr': 'name', 'op': '==', 'value': {'quantity': [1, 'furlong^']}},
+    {'and': [{'attr': 'name', 'op': '==', 'value': 1}]},
+    {'getattr': '__class__', 'of': ''},
+])
+def test_pred_bad_data(data):
+    with pytest.raises(ValueError):
+        from_data(data)
+
+
+def test_pred_pickle_optimized(water_elements):
+    pred = (is_gas() | is_solid()).optimize(water_elements)
+    restored = pickle.loads(pickle.dumps(pred))
+
+    assert [restored(e) for e in water_elements] == [True, False, True]
+    assert from_json(pred.to_json())._node == (is_gas() | is_solid())._node
@@ -0,0 +1,75 @@
+import pytest
+
+from oniref import predicates as OP
+from oniref.elements import State
+from oniref.query import QuerySyntaxError, compile_query
+from oniref.units import Q
+
+
+def _names(elements, query):
+    return [e.name for e in elements.find(compile_query(query))]
+
+
+def test_same_as_predicates():
+    query = compile_query('state == Liquid and stable_over(30 degC, 90 degC)'
+                          ' and thermal_conductivity > 0.5 W/(m K)')
+    expected = ((OP.Element.state == State.Liquid)
+                & OP.stable_over(Q(30, 'degC'), Q(90, 'degC'))
+                & (OP.Element.thermal_conductivity > Q(0.5, 'W/(m K)')))
+    assert query.to_json() == expected.to_json()
+
+
+def test_cached():
+    text = 'state == Solid or state == Gas'
+    assert compile_query(text) is compile_query(text)
+
+
+@pytest.mark.parametrize('query, names', [
+    ('state == Liquid', ['Water']),
+    ('state != State.Liquid', ['Ice', 'Steam']),
+    ('state in (Solid, Gas)', ['Ice', 'Steam']),
+    ('not state not in (Solid, Gas)', ['Ice', 'Steam']),
+    ('name == "Water" or name == \'Ice\'', ['Ice', 'Water']),
+    ('stable_at(50 °C)', ['Water']),
+    ('stable_at(-10 degC)', ['Ice']),
+    ('low_transition is not None'
+     ' and low_transition.?temperature < 50 degC', ['Water']),
+    ('low_temp() is None', ['Ice']),
+    ('high_transition is not None and not is_solid()', ['Water']),
+    ('mass_per_tile is not None and mass_per_tile >= 1.05e3 kg', ['Ice']),
+    ('thermal_conductivity > 0.5 W/(m*K)', ['Ice', 'Water']),
+    ('specific_heat_capacity > 4 J/g/K and (is_gas() or is_liquid())',
+     ['Water', 'Steam']),
+    ('radiation_absorption < 0.5', ['Steam']),
+    ('molar_mass == 18.01528 g/mol', ['Ice', 'Water', 'Steam']),
+])
+def test_queries(elements, query, names):
+    assert _names(elements, query) == names
+
+
+@pytest.mark.parametrize('query, position', [
+    ('thermal_conductivity > 1 kg', 23),
+    ('thermal_conductivity > 1', 23),
+    ('stable_at(30 florps)', 13),
+    ('stable_at(30 m)', 10),
+    ('stable_at()', 0),
+    ('frobnicate(1)', 0),
+    ('state == Plasma', 9),
+    ('state ==', 8),
+    ('state', 0),
+    ('(state == Liquid', 16),
+    ('state == Liquid Gas', 16),
+    ('_defs == 1', 0),
+    ('state $ 1', 6),
+    ('name == "Water" and', 19),
+    ('is_liquid() < 3', 12),
+    ('is_liquid() is None', 12),
+    ('not stable_at(0 degC) in (1, 2)', 22),
+    (r"name == 'a\x'", 8),
+    ('molar_mass > 1 g/(mol', 15),
+])
+def test_errors(query, position):
+    with pytest.raises(QuerySyntaxError) as info:
+        compile_query(query)
+    assert info.value.position == position
+    assert isinstance(info.value, ValueError)
@@ -0,0 +1,166 @@
+import json
+import socket
+import threading
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+import pytest
+
+from oniref.server import (QueryEngine, QueryError, compile_where,
+                           make_http_server, make_unix_server)
+
+
+@pytest.fixture(name='engine')
+def engine_fixture(water_elements):
+    return QueryEngine(water_elements)
+
+
+def test_get(engine):
+    result = engine.handle({'op': 'get', 'id': 'Water'})['result']
+    assert result['name'] == 'Water'
+    assert result['pretty_name'] == 'Water (pretty)'
+    assert result['state'] == 'Liquid'
+    assert result['thermal_conductivity'] == pytest.approx(0.609)
+    assert result['low_transition.temperature'] == pytest.approx(0.0)
+    assert result['low_transition.target'] == 'Ice'
+
+
+def test_get_fields(engine):
+    result = engine.handle({'op': 'get', 'id': 'Ice',
+                            'fields': ['name', 'mass_per_tile:g',
+                                       'low_transition.temperature:degK',
+                                       'high_transition']})['result']
+    assert result == {'name': 'Ice',
+                      'mass_per_tile': pytest.approx(1100000),
+                      'low_transition.temperature': None,
+                      'high_transition': {'temperature': 0.0,
+                                          'target': 'Water',
+                                          'ore': None,
+                                          'ore_ratio': None}}
+
+
+def test_find(engine):
+    def names(request):
+        request = dict(request, op='find', fields=['name'])
+        return [r['name'] for r in engine.handle(request)['result']]
+
+    assert names({'text': 'Wat'}) == ['Water']
+    assert names({'regex': '^(Ice|Steam)$'}) == ['Ice', 'Steam']
+    assert names({'where': {'state': 'Gas'}}) == ['Steam']
+    assert names({'where': {'stable_at': '-10 degC'}}) == ['Ice']
+    assert names({'where': {'stable_over': ['10 °C', '90 °C']}}) == ['Water']
+    assert names({'where': {'not': {'state': 'Gas'}}}) == ['Ice', 'Water']
+    assert names({'where': {'or': [{'state': 'Gas'},
+                                   {'state': 'Solid'}]}}) == ['Ice', 'Steam']
+    assert names({'where': {'and': [
+        {'attr': 'thermal_conductivity', 'op': '<',
+         'value': '1 DTU/(m s)/degC'},
+        {'attr': 'name', 'op': '==', 'value': 1}
+    ]}}) == []
+    assert names({'where': {'expr': {
+        'attr': 'thermal_conductivity', 'op': '<',
+        'value': {'quantity': [0.5, 'DTU/(m s)/degC']}
+    }}}) == ['Steam']
+    assert names({'where': {'and': [
+        {'state': 'Liquid'},
+        {'expr': {'attr': 'name', 'op': 'in', 'value': ['Water']}},
+    ]}}) == ['Water']
+    assert names({'where': {'query': 'state in (Solid, Gas)'
+                            ' and thermal_conductivity < 1 W/(m K)'}}) \
+        == ['Steam']
+
+
+@pytest.mark.parametrize('where', [
+    [], {}, {'and': []}, {'state': 'Plasma'}, {'attr': 'name', 'op': '!'},
+    {'stable_at': 'warm'}, {'expr': {'attr': '_frozen', 'op': 'is',
+                                     'value': True}},
+    {'expr': {'attr': 'name', 'op': '!', 'value': 1}},
+    {'query': 'state == Plasma'}, {'query': ['state']},
+    {'attr': '_frozen', 'op': '==', 'value': True},
+    {'attr': ['name'], 'op': '==', 'value': 'Ice'},
+    {'attr': 'name', 'op': ['=='], 'value': 'Ice'},
+])
+def test_bad_where(where):
+    with pytest.raises(QueryError):
+        compile_where(where)
+
+
+@pytest.mark.parametrize('request_', [
+    b'[]', b'{', b'{"op": "nope"}', b'{"op": "find"}',
+    b'{"op": "get", "id": "Lava"}',
+    b'{"op": "find", "regex": "("}',
+    b'{"op": "get", "id": "Ice", "fields": ["name:furlongs"]}',
+    b'{"op": "get", "id": "Ice", "fields": ["bogus"]}',
+    b'{"op": "get", "id": "Ice", "fields": "name"}',
+    b'{"op": "get", "id": "Ice", "fields": [1]}',
+    b'{"op": "get", "id": 5}',
+    b'{"op": "get", "id": 0}',
+    b'{"op": "get", "id": ["Ice"]}',
+])
+def test_handle_json_errors(engine, request_):
+    ok, body = engine.handle_json(request_)
+    assert not ok
+    assert 'error' in json.loads(body)
+
+
+def test_http(water_elements):
+    server = make_http_server(water_elements)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+
+    def get(path):
+        with urlopen(base + path) as response:
+            return json.load(response)
+
+    try:
+        assert get('/element/Ice?fields=name')['result'] == {'name': 'Ice'}
+        assert get('/find?text=Ste&fields=name')['result'] == [
+            {'name': 'Steam'}
+        ]
+        where = quote(json.dumps({'state': 'Solid'}))
+        assert get(f'/find?where={where}&fields=name')['result'] == [
+            {'name': 'Ice'}
+        ]
+
+        post = Request(base + '/query', method='POST',
+                       data=b'{"op": "find", "regex": "^W", '
+                            b'"fields": ["name"]}')
+        with urlopen(post) as response:
+            assert json.load(response) == {'result': [{'name': 'Water'}]}
+
+        for path in ('/nope', '/find?where=%7B'):
+            with pytest.raises(HTTPError):
+                get(path)
+
+        with pytest.raises(HTTPError):
+            urlopen(Request(base + '/nope', method='POST', data=b'{}'))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_unix(water_elements, tmp_path):
+    path = str(tmp_path / 'oniref.sock')
+    server = make_unix_server(water_elements, path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        with socket.socket(socket.AF_UNIX) as sock, \
+                sock.makefile('rwb') as stream:
+            sock.connect(path)
+            stream.write(b'{"op": "get", "id": "Water", "fields": ["name"]}'
+                         b'\n\n{"op": "find", "text": "Ice", '
+                         b'"fields": ["name"]}\n')
+            stream.flush()
+            assert json.loads(stream.readline()) == {
+                'result': {'name': 'Water'}
+            }
+            assert json.loads(stream.readline()) == {
+                'result': [{'name': 'Ice'}]
+            }
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,45 @@
+import multiprocessing
+
+import pytest
+
+from oniref.shared import attach, publish
+from oniref.units import Q
+
+
+def _worker(name):
+    elements = attach(name)
+    return [(e.name, e.low_transition.target.name
+             if e.low_transition else None) for e in elements]
+
+
+def test_attach_same_process(water_elements):
+    with publish(water_elements) as table:
+        view = attach(table.name)
+
+        assert view.frozen
+        assert [e.name for e in view] == ['Ice', 'Water', 'Steam']
+        assert view['Water'].thermal_conductivity \
+            == water_elements['Water'].thermal_conductivity
+        assert view.columns['thermal_conductivity'].base is not None
+
+
+def test_publish_current(water_elements):
+    _ = water_elements.columns
+    water_elements['Water'].molar_mass = Q(20, 'g/mol')
+    with publish(water_elements) as table:
+        view = attach(table.name)
+        assert view['Water'].molar_mass.to('g/mol').m == pytest.approx(20)
+
+
+def test_attach_missing():
+    with pytest.raises(FileNotFoundError):
+        attach('oniref-test-does-not-exist')
+
+
+def test_attach_worker(water_elements):
+    context = multiprocessing.get_context('spawn')
+    with publish(water_elements) as table, context.Pool(2) as pool:
+        results = pool.map(_worker, [table.name] * 2)
+
+    assert results == [[('Ice', None), ('Water', 'Ice'),
+                        ('Steam', 'Water')]] * 2
@@ -0,0 +1,137 @@
+import re
+
+import pytest
+
+from oniref import predicates as OP
+from oniref.columns import FormatError
+from oniref.storage import open_elements, save_elements
+from oniref.units import Q
+
+
+@pytest.fixture(name='stored')
+def stored_fixture(water_elements, tmp_path):
+    path = tmp_path / 'elements.oniref'
+    save_elements(water_elements, path)
+    return open_elements(path)
+
+
+def _decoded(elements):
+    # pylint: disable=protected-access
+    return [i for i, e in enumerate(elements._defs._cache) if e is not None]
+
+
+def test_round_trip(stored, water_elements):
+    assert stored.frozen
+    assert len(stored) == 3
+    for elem in water_elements:
+        copy = stored[elem.name]
+        assert copy == elem
+        assert copy.pretty_name == elem.pretty_name
+        assert copy.state == elem.state
+        assert copy.specific_heat_capacity == elem.specific_heat_capacity
+        assert copy.molar_mass == elem.molar_mass
+        assert copy.low_transition == elem.low_transition
+        assert copy.high_transition == elem.high_transition
+
+
+def test_lazy_decoding(stored):
+    assert not _decoded(stored)
+
+    water = stored['Water']
+    assert _decoded(stored) == [1]
+
+    assert water.low_transition.target is stored['Ice']
+    assert water.low_transition.ore is None
+    assert _decoded(stored) == [0, 1]
+
+    assert stored.find('Steam') == [stored[2]]
+    assert stored.find(re.compile('^I')) == [stored['Ice']]
+    assert stored[-1] is stored['Steam']
+    assert stored._defs[1:] == (stored['Water'],  # pylint: disable=W0212
+                                stored['Steam'])
+
+
+def test_predicates(stored):
+    pred = OP.stable_at(Q(50, '°C'))
+    assert stored.find(pred) == [stored['Water']]
+
+
+def test_read_only(stored):
+    with pytest.raises(AttributeError):
+        stored['Water'].low_transition.target = stored['Steam']
+
+    with pytest.raises(AttributeError):
+        stored['Water'].name = 'Juice'
+
+    with pytest.raises(ValueError):
+        stored.columns['thermal_conductivity'][0] = 0
+
+
+def test_ore(water_elements, tmp_path):
+    water_elements['Water'].high_transition.ore = water_elements['Ice']
+    water_elements['Water'].high_transition.ore_ratio = 0.25
+    path = tmp_path / 'elements.oniref'
+    save_elements(water_elements, path)
+
+    transition = open_elements(path)['Water'].high_transition
+    assert transition.ore.name == 'Ice'
+    assert transition.ore_ratio == 0.25
+
+
+def test_names(stored):
+    names = stored.columns.names
+    assert list(names) == ['Ice', 'Water', 'Steam']
+    assert names[1:] == ['Water', 'Steam']
+    assert names[-1] == 'Steam'
+
+    with pytest.raises(IndexError):
+        _ = names[3]
+
+    assert list(stored._id_map) == list(names)  # pylint: disable=W0212
+    assert 'Juice' not in stored._id_map  # pylint: disable=W0212
+
+
+def test_not_a_table(tmp_path):
+    path = tmp_path / 'elements.oniref'
+    path.write_bytes(b'x' * 64)
+
+    with pytest.raises(FormatError):
+        open_elements(path)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / 'elements.oniref'
+    path.write_bytes(b'')
+
+    with pytest.raises(FormatError):
+        open_elements(path)
+
+
+def test_truncated(water_elements, tmp_path):
+    data = water_elements.columns.to_bytes()
+    path = tmp_path / 'elements.oniref'
+    for size in (24, 200, len(data) - 8):
+        path.write_bytes(data[:size])
+        with pytest.raises(FormatError):
+            open_elements(path)
+
+
+def test_missing_table(water_elements, tmp_path):
+    # Rename the first directory entry, the state column.
+    data = bytearray(water_elements.columns.to_bytes())
+    data[20:25] = b'stat_'
+    path = tmp_path / 'elements.oniref'
+    path.write_bytes(bytes(data))
+
+    with pytest.raises(FormatError):
+        open_elements(path)
+
+
+def test_save_current(water_elements, tmp_path):
+    _ = water_elements.columns
+    water_elements['Water'].molar_mass = Q(20, 'g/mol')
+    path = tmp_path / 'elements.oniref'
+    save_elements(water_elements, path)
+
+    assert open_elements(path)['Water'].molar_mass.to('g/mol').m == \
+        pytest.approx(20)
@@ -1,4 +1,9 @@
-from oniref.strings import KleiStrings
+import pickle
+
+from polib import POEntry, POFile
+import pytest
+
+from oniref.strings import KleiStrings, find_catalogs, load_strings
 
 
 def test_len():
@@ -26,3 +31,69 @@ def test_get_raw():
     assert KleiStrings({}).get_raw(key='foo', default='bar') == 'bar'
     assert (KleiStrings({'foo': '<xml>bar</xml>'}).get_raw('foo')
             == '<xml>bar</xml>')
+
+
+def test_freeze():
+    strings = KleiStrings({'foo': '<xml>bar</xml>', 'baz': 'quux'})
+    assert not strings.frozen
+
+    strings.freeze()
+    strings.freeze()
+    assert strings.frozen
+    assert dict(strings.items()) == {'foo': 'bar', 'baz': 'quux'}
+    assert strings.get('missing') is None
+
+    with pytest.raises(TypeError):
+        strings._raw['foo'] = 'x'  # pylint: disable=protected-access
+
+
+@pytest.mark.parametrize('frozen', [False, True])
+def test_pickle(frozen):
+    strings = KleiStrings({'foo': '<xml>bar</xml>', 'baz': 'quux'})
+    if frozen:
+        strings.freeze()
+
+    restored = pickle.loads(pickle.dumps(strings))
+    assert restored.frozen == frozen
+    assert dict(restored.items()) == {'foo': 'bar', 'baz': 'quux'}
+    assert restored.get_raw('foo') == '<xml>bar</xml>'
+
+
+def test_locales(tmp_path):
+    po = POFile()
+    po.append(POEntry(msgctxt='foo', msgid='', msgstr='<b>le</b> foo'))
+    po.append(POEntry(msgctxt='baz', msgid='', msgstr=''))
+    po.save(tmp_path / 'strings_preinstalled_fr_klei.po')
+    po.save(tmp_path / 'de.po')
+
+    catalogs = find_catalogs(tmp_path)
+    assert sorted(catalogs) == ['de', 'fr']
+
+    strings = KleiStrings({'foo': '<xml>bar</xml>', 'baz': 'quux'},
+                          catalogs)
+    assert strings.locales == ['de', 'fr']
+
+    french = strings.locale('fr')
+    assert french is strings.locale('fr')
+    assert french['foo'] == 'le foo'
+    assert french['baz'] == 'quux'
+    assert french.get('missing') is None
+    assert strings['foo'] == 'bar'
+
+    with pytest.raises(KeyError):
+        strings.locale('xx')
+
+
+def test_locale_keys_shared(tmp_path):
+    po = POFile()
+    po.append(POEntry(msgctxt='STRINGS.ELEMENTS.WATER.NAME', msgid='Water'))
+    po.save(tmp_path / 'strings_template.pot')
+    po[0].msgstr = 'Eau'
+    po.save(tmp_path / 'fr.po')
+
+    strings = load_strings(tmp_path / 'strings_template.pot',
+                           find_catalogs(tmp_path))
+    strings.freeze()
+    french = strings.locale('fr')
+    assert french.frozen
+    assert next(iter(french)) is next(iter(strings))
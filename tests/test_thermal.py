@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from oniref.elements import Element, Elements, State
+from oniref.thermal import ThermalGrid, simulate
+from oniref.units import Q
+
+
+@pytest.fixture(name='elements')
+def elements_fixture(water_states, water_strings, frozen):
+    vacuum = Element('Vacuum',
+                     'STRINGS.ELEMENTS.VACUUM.NAME',
+                     State.Vacuum,
+                     Q(0, 'DTU/g/°C'),
+                     Q(0, 'DTU/(m s)/°C'),
+                     Q(0, 'g/mol'),
+                     Q(0, 'dimensionless'),
+                     Q(0, 'rads/kg'),
+                     Q(0, 'kg'))
+    return Elements([*water_states, vacuum], water_strings,
+                    frozen=frozen)
+
+
+def test_equilibrium(elements):
+    grid = ThermalGrid(elements, [['Water', 'Water']],
+                       masses=[[1, 3]],
+                       temperatures=Q(np.array([[20.0, 60.0]]), '°C'),
+                       tick=Q(1, 'hour'))
+    grid.run(200)
+    assert np.allclose(grid.temperatures.to('°C').m, 50.0)
+
+
+def test_conserves_heat(elements):
+    rng = np.random.default_rng(0)
+    cells = [['Water', 'Ice', 'Water'], ['Ice', 'Water', 'Ice']]
+    temps = rng.uniform(20, 90, (2, 3))
+    temps[0, 1] = temps[1, 0] = temps[1, 2] = -20.0
+    grid = ThermalGrid(elements, cells, temperatures=temps)
+    before = grid.heat()
+    grid.run(5)
+    assert grid.names().tolist() == cells
+    assert grid.heat() == pytest.approx(before)
+
+
+def test_vacuum_insulates(elements):
+    grid = ThermalGrid(elements, [['Water', 'Vacuum', 'Water']],
+                       temperatures=[[10.0, 0.0, 90.0]])
+    grid.run(100)
+    assert grid.temperature.tolist() == [[10.0, 0.0, 90.0]]
+
+
+def test_lower_conductivity(elements):
+    # Ice conducts better than water, so the face between them passes
+    # heat at water's rate.
+    grid = ThermalGrid(elements, [['Water', 'Ice']],
+                       masses=1e6, temperatures=[[50.0, -50.0]], tick=1.0)
+    before = grid.heat_capacities()[0, 0] * grid.temperature[0, 0]
+    grid.step()
+    moved = before - grid.heat_capacities()[0, 0] * grid.temperature[0, 0]
+    assert moved == pytest.approx(0.609 * 100.0)
+
+
+def test_transitions(elements):
+    grid = ThermalGrid(elements, [['Water', 'Water']],
+                       masses=[[10, 1000]],
+                       temperatures=Q(np.array([[95.0, 200.0]]), '°C'),
+                       tick=100.0)
+    assert grid.names().tolist() == [['Water', 'Water']]
+    grid.step()
+    assert grid.names().tolist() == [['Water', 'Steam']]
+    grid.run(200)
+    assert grid.names().tolist() == [['Steam', 'Steam']]
+
+
+def test_positions_and_units(elements):
+    water = [e.name for e in elements].index('Water')
+    grid = ThermalGrid(elements, np.full((2, 2), water),
+                       temperatures=Q(293.15, 'K'))
+    assert np.allclose(grid.temperature, 20.0)
+    assert grid.masses.tolist() == [[1000.0, 1000.0], [1000.0, 1000.0]]
+
+    with pytest.raises(ValueError):
+        ThermalGrid(elements, ['Water'])
+    with pytest.raises(IndexError):
+        ThermalGrid(elements, [[len(elements)]])
+    with pytest.raises(KeyError):
+        ThermalGrid(elements, [['Unobtanium']])
+
+
+def test_deterministic(elements):
+    rng = np.random.default_rng(1)
+    names = np.array(['Ice', 'Water', 'Steam', 'Vacuum'])
+    cells = names[rng.integers(0, 4, (16, 16))]
+    temps = rng.uniform(-40, 140, (16, 16))
+    runs = [simulate(elements, cells, 50, masses=500.0,
+                     temperatures=temps) for _ in range(2)]
+    assert (runs[0].temperature == runs[1].temperature).all()
+    assert (runs[0].cells == runs[1].cells).all()
+    assert runs[0].ticks == 50
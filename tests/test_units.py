@@ -0,0 +1,67 @@
+import pickle
+
+import numpy as np
+import pint
+import pytest
+
+from oniref.units import (Q, Unit, conversion, convert, parse_quantity,
+                          parse_unit, registry, to_units)
+
+
+def test_parse_quantity():
+    assert parse_quantity('30 degC') == Q(30, 'degC')
+    assert parse_quantity('-5.5°C') == Q(-5.5, '°C')
+    assert parse_quantity('1e3 kg') == Q(1000, 'kg')
+    assert parse_quantity('2') == Q(2, 'dimensionless')
+    assert parse_quantity(' 1 W/(m K) ') == Q(1, 'W/(m K)')
+
+
+def test_parse_quantity_bad():
+    with pytest.raises(ValueError):
+        parse_quantity('warm')
+
+
+def test_parse_unit_cached():
+    assert parse_unit('kg') is parse_unit('kg')
+    assert parse_unit(Q(1, 'kg').units) == parse_unit('kg')
+
+
+@pytest.mark.parametrize('src,dst', [
+    ('K', '°C'),
+    ('°C', 'K'),
+    ('degC', 'degF'),
+    ('degF', 'degC'),
+    ('DTU/(m s)/°C', 'W/(m K)'),
+    ('kg', 'g'),
+    ('delta_degC', 'delta_degF'),
+])
+def test_conversion_matches_pint(src, dst):
+    for magnitude in (-40.0, 0.0, 1.5, 273.15, 1000.0):
+        assert convert(magnitude, src, dst) == pytest.approx(
+            Q(magnitude, src).to(dst).m, rel=1e-12, abs=1e-9
+        )
+
+    values = np.array([-40.0, 0.0, 1.5])
+    assert convert(values, src, dst) == pytest.approx(
+        Q(values, src).to(dst).m, rel=1e-12, abs=1e-9
+    )
+
+
+def test_conversion_exact_kelvin():
+    assert conversion('K', '°C') == (1.0, -273.15)
+    assert to_units(Q(273.15, 'K'), '°C') == Q(0, '°C')
+
+
+def test_conversion_incompatible():
+    with pytest.raises(pint.DimensionalityError):
+        convert(1.0, 'kg', 'm')
+
+
+def test_pickle_own_registry():
+    quantity = pickle.loads(pickle.dumps(Q(3, 'DTU/g/°C')))
+    assert quantity == Q(3, 'DTU/g/°C')
+    assert quantity.units == Unit('DTU/g/°C')
+    assert pickle.loads(pickle.dumps(Unit('DTU'))) == Unit('DTU')
+
+    # Other users of pint keep their own application registry.
+    assert pint.get_application_registry().get() is not registry
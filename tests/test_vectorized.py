@@ -0,0 +1,79 @@
+import pytest
+
+from oniref.columns import ColumnarElements, ElementColumns
+from oniref.elements import State
+from oniref.predicates import (Element, Predicate, high_temp, is_liquid,
+                               is_solid, low_temp, stable_at,
+                               stable_over)
+from oniref.units import Q
+from oniref.vectorized import mask
+
+
+@pytest.mark.parametrize('pred', [
+    is_liquid(),
+    ~is_solid(),
+    Element.state.Is(State.Gas),
+    Element.state.In(State.Solid, State.Gas),
+    Element.name == 'Water',
+    Element.name.In(['Ice', 'Steam', 'Mercury']),
+    Element.molar_mass > Q(1, 'g/mol'),
+    Element.molar_mass == Q(0.01801528, 'kg/mol'),
+    Element.mass_per_tile.Is(None),
+    low_temp().Is(None),
+    low_temp().Is(None) | (low_temp().to('K') > Q(200, 'K')),
+    stable_at(Q(50, '°C')),
+    stable_over(Q(-10, '°C'), Q(10, '°C')),
+    Element.state.Is(State.Gas) | (high_temp() > Q(50, '°C')),
+    is_liquid() & Element.low_transition.ore_ratio.Is(None),
+])
+def test_mask_matches_elements(frozen_elements, pred):
+    result = mask(pred._node, frozen_elements.columns)  # pylint: disable=W0212
+    assert result is not None
+    assert list(result) == [bool(pred(elem)) for elem in frozen_elements]
+
+
+@pytest.mark.parametrize('pred', [
+    Predicate(lambda e: True),
+    Element.name.In('Water'),
+    # Steam has no high transition, so these raise element by element.
+    high_temp() > Q(50, '°C'),
+    is_solid() | (high_temp() > Q(50, '°C')),
+    Element.high_transition.temperature.Is(None),
+    Element.state > State.Solid,
+])
+def test_mask_unsupported(frozen_elements, pred):
+    assert mask(pred._node, frozen_elements.columns) is None  # noqa: E501 pylint: disable=W0212
+
+
+def test_count_without_decoding(water_elements):
+    view = ColumnarElements(
+        ElementColumns.from_buffer(water_elements.columns.to_bytes())
+    )
+
+    assert view.count(stable_at(Q(50, '°C'))) == 1
+    assert view.any(low_temp().Is(None))
+    assert not any(view._defs._cache)  # pylint: disable=W0212
+    assert view.first(is_liquid()) is view['Water']
+
+
+ALL = ['Ice', 'Water', 'Steam']
+
+
+# Pint compares quantities with a plain zero by magnitude, whatever
+# their units, and frozen sets must match it.
+@pytest.mark.parametrize('pred, expected', [
+    (Element.radioactivity == 0, ALL),
+    (~(Element.radioactivity == 0), []),
+    (Element.radioactivity.In([0]), ALL),
+    (Element.molar_mass == 18, []),
+    (~(Element.mass_per_tile == 0), ALL),
+    (Element.mass_per_tile.In(0, 1000), []),
+    (Element.radiation_absorption == 0.8, ['Ice', 'Water']),
+])
+def test_plain_numbers(elements, pred, expected):
+    assert [e.name for e in elements.find(pred)] == expected
+
+
+def test_unfrozen_not_vectorized(water_elements):
+    water_elements['Water'].mass_per_tile = None
+    assert water_elements.count(Element.mass_per_tile.Is(None)) == 2